@@ -3,18 +3,37 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.const import Platform
 
-from .const import DOMAIN
+from .const import CONF_DEVICE_ID, DEFAULT_DEVICE_ID, DOMAIN, LOGGER
+from .services import async_setup_services, async_unload_services
 
 PLATFORMS = [Platform.SENSOR]
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up froeling integration from a config entry."""
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    await async_setup_services(hass)
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
     return True
 
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Migrate an old config entry."""
+    if entry.version == 1:
+        # entries of version 1 used a fixed device id, keep it for the existing unique ids
+        hass.config_entries.async_update_entry(
+            entry, data={**entry.data, CONF_DEVICE_ID: DEFAULT_DEVICE_ID}, version=2
+        )
+        LOGGER.debug("Migrated config entry " + entry.entry_id + " to version 2")
+    return True
+
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry):
+    """Reload the entry when the options changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        await hass.data[DOMAIN].can_stop_update()
+        await hass.data[DOMAIN].pop(entry.entry_id).can_stop_update()
+        if not hass.data[DOMAIN]:
+            async_unload_services(hass)
 
     return unload_ok
@@ -0,0 +1,190 @@
+"""Recording and replay of the Fröling CAN traffic."""
+import asyncio
+import contextlib
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+
+from .const import LOGGER
+
+CAPTURE_MAGIC = b"FRLNGCAP"
+CAPTURE_VERSION = 1
+# magic, version, record size
+CAPTURE_HEADER = struct.Struct("<8sHH")
+# timestamp, arbitration id, dlc, data (padded to 8 bytes)
+CAPTURE_RECORD = struct.Struct("<dIB3x8s")
+# records replayed before giving the event loop a chance to run
+REPLAY_BATCH = 256
+# size of the capture file in bytes before it is rotated to path + ".1", about 2 million frames
+CAPTURE_MAX_BYTES = 64 * 1024 * 1024
+# records waiting for the writer thread, more are dropped
+CAPTURE_QUEUE_SIZE = 16384
+
+
+class FrlngCaptureWriter:
+    """Append-only capture file of fixed size CAN frame records.
+
+    write() only queues the record, a thread of its own writes the file, so
+    neither the event loop nor the receive thread block on the disk. When the
+    file reaches max_bytes it is renamed to path + ".1", replacing the one
+    before, and recording continues in a new file.
+    """
+
+    def __init__(self, path: str, max_bytes: int = CAPTURE_MAX_BYTES) -> None:
+        """Initialize the writer, the file is opened with open()."""
+        self.path = path
+        self.max_bytes = max_bytes
+        self.records = 0
+        self.dropped = 0
+        self.rotations = 0
+        self._queue: queue.Queue[bytes | None] = queue.Queue(CAPTURE_QUEUE_SIZE)
+        self._thread = None
+        self._file = None
+        self._size = 0
+
+    def open(self) -> None:
+        """Open the capture file and start the writer thread, blocking"""
+        self._open_file()
+        self._thread = threading.Thread(target=self._run, name="froeling_capture", daemon=True)
+        self._thread.start()
+        LOGGER.info("Recording CAN frames to " + self.path)
+
+    def _open_file(self) -> None:
+        """Open the capture file, a new one gets the header"""
+        self._file = open(self.path, "ab", buffering=64 * 1024)
+        if self._file.tell() == 0:
+            self._file.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, CAPTURE_RECORD.size))
+        self._size = self._file.tell()
+
+    @property
+    def opened(self) -> bool:
+        """True while the capture file is open"""
+        return self._thread is not None
+
+    def write(self, timestamp: float, arbitration_id: int, dlc: int, data) -> None:
+        """Queue one frame, it is dropped when the writer thread lags behind"""
+        try:
+            self._queue.put_nowait(CAPTURE_RECORD.pack(timestamp, arbitration_id, dlc, bytes(data)))
+        except queue.Full:
+            self.dropped += 1
+            return
+        self.records += 1
+
+    def _run(self) -> None:
+        """Writer thread, writes the queued records until close() queues None"""
+        while (record := self._queue.get()) is not None:
+            if self._file is None:
+                # recording failed, the queue is drained until close()
+                self.dropped += 1
+                continue
+            try:
+                if self._size + CAPTURE_RECORD.size > self.max_bytes:
+                    self._rotate()
+                self._file.write(record)
+                self._size += CAPTURE_RECORD.size
+            except OSError as error:
+                LOGGER.error("Failed to record to " + self.path + " Error:" + str(error))
+                self._close_file()
+        self._close_file()
+
+    def _close_file(self) -> None:
+        """Close the capture file, errors were logged when writing"""
+        if self._file is not None:
+            with contextlib.suppress(OSError):
+                self._file.close()
+            self._file = None
+
+    def _rotate(self) -> None:
+        """Keep the full capture file as path + ".1" and start a new one"""
+        self._file.close()
+        os.replace(self.path, self.path + ".1")
+        self.rotations += 1
+        self._open_file()
+
+    def close(self) -> None:
+        """Write the queued frames and close the capture file, blocking"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+class FrlngCaptureReader:
+    """Memory mapped reader for capture files."""
+
+    def __init__(self, path: str) -> None:
+        """Open and map the capture file, blocking."""
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file can not be mapped
+            self._file.close()
+            raise ValueError("Empty capture file: " + path) from None
+        magic, version, record_size = CAPTURE_HEADER.unpack_from(self._mmap)
+        if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION or record_size != CAPTURE_RECORD.size:
+            self.close()
+            raise ValueError("Not a capture file: " + path)
+        # a record cut off by a crash while recording is ignored
+        self._end = CAPTURE_HEADER.size + len(self) * CAPTURE_RECORD.size
+
+    def __len__(self) -> int:
+        """Number of complete records"""
+        return (len(self._mmap) - CAPTURE_HEADER.size) // CAPTURE_RECORD.size
+
+    def __iter__(self):
+        """Iterate over (timestamp, arbitration id, dlc, data)"""
+        unpack_from = CAPTURE_RECORD.unpack_from
+        for offset in range(CAPTURE_HEADER.size, self._end, CAPTURE_RECORD.size):
+            timestamp, arbitration_id, dlc, data = unpack_from(self._mmap, offset)
+            yield timestamp, arbitration_id, dlc, data[:dlc]
+
+    def close(self) -> None:
+        """Unmap and close the capture file"""
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+async def async_replay_capture(frlng_com, path: str, speed: float | None = 1.0) -> int:
+    """Feed a capture through the receive and parse path of frlng_com
+
+    frlng_com must not receive from a bus at the same time, the frames are
+    parsed in the event loop in both decode modes.
+    speed scales the recorded timing, None replays as fast as possible.
+    Returns the number of replayed frames.
+    """
+    reader = await asyncio.get_running_loop().run_in_executor(None, FrlngCaptureReader, path)
+    LOGGER.debug("Replaying " + str(len(reader)) + " frames from " + path)
+    replayed = 0
+    try:
+        start = time.monotonic()
+        first_timestamp = None
+        for timestamp, arbitration_id, dlc, data in reader:
+            if speed is not None:
+                if first_timestamp is None:
+                    first_timestamp = timestamp
+                delay = (timestamp - first_timestamp) / speed - (time.monotonic() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif replayed % REPLAY_BATCH == 0:
+                await asyncio.sleep(0)
+            frlng_com.can_frame_receive(arbitration_id, dlc, data, timestamp)
+            if dlc == 2:
+                # probably a new display address, parse what is complete so far
+                frlng_com.parse_replayed()
+            replayed += 1
+        frlng_com.parse_replayed()
+    finally:
+        reader.close()
+    return replayed
+
@@ -3,9 +3,38 @@
 import voluptuous as vol
 
 from homeassistant import config_entries
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 
-from .const import CONF_CAN_BUS, DEFAULT_TITLE, DOMAIN
+from .const import (
+    CONF_ADAPTIVE_PACING,
+    CONF_BUFFER_MIN_TEMP,
+    CONF_BUFFER_VOLUME,
+    CONF_CAN_BUS,
+    CONF_CAPTURE,
+    CONF_DEADBAND,
+    CONF_DECODE_IN_THREAD,
+    CONF_DEVICE_ID,
+    CONF_MIN_INTERVAL,
+    CONF_PASSIVE,
+    CONF_RAW_SOCKET,
+    CONF_SENSOR_FILTERS,
+    CONF_USER_IDLE,
+    DEFAULT_ADAPTIVE_PACING,
+    DEFAULT_BUFFER_MIN_TEMP,
+    DEFAULT_BUFFER_VOLUME,
+    DEFAULT_CAPTURE,
+    DEFAULT_DECODE_IN_THREAD,
+    DEFAULT_DEVICE_ID,
+    DEFAULT_PASSIVE,
+    DEFAULT_RAW_SOCKET,
+    DEFAULT_TITLE,
+    DEFAULT_USER_IDLE,
+    DOMAIN,
+)
+from .menu import SENSOR_KEYS
+
+CONF_SENSOR = "sensor"
 
 DATA_SCHEMA = vol.Schema(
     {
@@ -13,11 +42,48 @@ DATA_SCHEMA = vol.Schema(
     }
 )
 
+OPTIONS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_ADAPTIVE_PACING, default=DEFAULT_ADAPTIVE_PACING): bool,
+        vol.Optional(CONF_CAPTURE, default=DEFAULT_CAPTURE): bool,
+        vol.Optional(CONF_RAW_SOCKET, default=DEFAULT_RAW_SOCKET): bool,
+        vol.Optional(CONF_DECODE_IN_THREAD, default=DEFAULT_DECODE_IN_THREAD): bool,
+        vol.Optional(CONF_PASSIVE, default=DEFAULT_PASSIVE): bool,
+        vol.Optional(CONF_USER_IDLE, default=DEFAULT_USER_IDLE): vol.All(
+            vol.Coerce(int), vol.Range(min=10, max=3600)
+        ),
+        vol.Optional(CONF_BUFFER_VOLUME, default=DEFAULT_BUFFER_VOLUME): vol.All(
+            vol.Coerce(int), vol.Range(min=100, max=50000)
+        ),
+        vol.Optional(CONF_BUFFER_MIN_TEMP, default=DEFAULT_BUFFER_MIN_TEMP): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=90)
+        ),
+        # set the write filter of this sensor in the next step
+        vol.Optional(CONF_SENSOR): vol.In(SENSOR_KEYS),
+    }
+)
+
+# empty fields reset the sensor to the defaults of its description
+SENSOR_FILTER_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_DEADBAND): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_MIN_INTERVAL): vol.All(vol.Coerce(int), vol.Range(min=0)),
+    }
+)
+
 
 class FrlngConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """froeling euroturbo 40 config flow."""
 
-    VERSION = 1
+    VERSION = 2
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        """Get the options flow for this handler."""
+        return FrlngOptionsFlow(config_entry)
 
     async def async_step_user(
         self, user_input: dict[str, str] | None = None
@@ -28,10 +94,76 @@ class FrlngConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 {CONF_CAN_BUS: user_input[CONF_CAN_BUS]}
             )
 
+            device_id = self._next_device_id()
+            title = DEFAULT_TITLE
+            if device_id != DEFAULT_DEVICE_ID:
+                title += " " + user_input[CONF_CAN_BUS]
             return self.async_create_entry(
-                title=DEFAULT_TITLE,
-                data=user_input,
+                title=title,
+                data={**user_input, CONF_DEVICE_ID: device_id},
             )
 
         data_schema = self.add_suggested_values_to_schema(DATA_SCHEMA, user_input)
-        return self.async_show_form(step_id="user", data_schema=data_schema)
\ No newline at end of file
+        return self.async_show_form(step_id="user", data_schema=data_schema)
+
+    def _next_device_id(self) -> str:
+        """Return the first free device id Froeling1, Froeling2, ..."""
+        used = {entry.data.get(CONF_DEVICE_ID) for entry in self._async_current_entries()}
+        number = 1
+        while "Froeling" + str(number) in used:
+            number += 1
+        return "Froeling" + str(number)
+
+
+class FrlngOptionsFlow(config_entries.OptionsFlow):
+    """froeling euroturbo 40 options flow."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self.config_entry = config_entry
+        self._options: dict[str, object] = {}
+        self._sensor: str | None = None
+
+    async def async_step_init(
+        self, user_input: dict[str, object] | None = None
+    ) -> FlowResult:
+        """Handle the options step."""
+        if user_input is not None:
+            self._options = dict(user_input)
+            self._sensor = self._options.pop(CONF_SENSOR, None)
+            if self._sensor is not None:
+                return await self.async_step_sensor()
+            return self._async_create_options()
+
+        data_schema = self.add_suggested_values_to_schema(
+            OPTIONS_SCHEMA, self.config_entry.options
+        )
+        return self.async_show_form(step_id="init", data_schema=data_schema)
+
+    async def async_step_sensor(
+        self, user_input: dict[str, object] | None = None
+    ) -> FlowResult:
+        """Handle the write filter step of a sensor."""
+        filters = dict(self.config_entry.options.get(CONF_SENSOR_FILTERS, {}))
+        if user_input is not None:
+            if user_input:
+                filters[self._sensor] = user_input
+            else:
+                filters.pop(self._sensor, None)
+            return self._async_create_options(filters)
+
+        data_schema = self.add_suggested_values_to_schema(
+            SENSOR_FILTER_SCHEMA, filters.get(self._sensor, {})
+        )
+        return self.async_show_form(
+            step_id="sensor",
+            data_schema=data_schema,
+            description_placeholders={CONF_SENSOR: self._sensor},
+        )
+
+    @callback
+    def _async_create_options(self, filters: dict | None = None) -> FlowResult:
+        """Create the options entry, keeping the sensor filters"""
+        if filters is None:
+            filters = self.config_entry.options.get(CONF_SENSOR_FILTERS, {})
+        return self.async_create_entry(title="", data={**self._options, CONF_SENSOR_FILTERS: filters})
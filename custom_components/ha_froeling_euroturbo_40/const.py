@@ -4,6 +4,32 @@ import logging
 LOGGER = logging.getLogger(__package__)
 DOMAIN = "froeling"
 CONF_CAN_BUS = "can_bus"
+CONF_DEVICE_ID = "device_id"
+DEFAULT_DEVICE_ID = "Froeling1"
+CONF_ADAPTIVE_PACING = "adaptive_pacing"
+DEFAULT_ADAPTIVE_PACING = False
+CONF_CAPTURE = "capture"
+DEFAULT_CAPTURE = False
+CONF_RAW_SOCKET = "raw_socket"
+DEFAULT_RAW_SOCKET = False
+# decode the display frames in the receive thread, only parsed values are posted to the event loop
+CONF_DECODE_IN_THREAD = "decode_in_thread"
+DEFAULT_DECODE_IN_THREAD = False
+# seconds without user button press before polling resumes
+CONF_USER_IDLE = "user_idle"
+DEFAULT_USER_IDLE = 120
+# buffer volume in l and the temperature in °C the buffer is empty at, for the stored energy
+CONF_BUFFER_VOLUME = "buffer_volume"
+DEFAULT_BUFFER_VOLUME = 2000
+CONF_BUFFER_MIN_TEMP = "buffer_min_temp"
+DEFAULT_BUFFER_MIN_TEMP = 30
+# read the mapped sensors from the main board to addon board frames, the display is scraped for the others
+CONF_PASSIVE = "passive"
+DEFAULT_PASSIVE = False
+# per sensor key: {CONF_DEADBAND: change written at once, CONF_MIN_INTERVAL: seconds between writes}
+CONF_SENSOR_FILTERS = "sensor_filters"
+CONF_DEADBAND = "deadband"
+CONF_MIN_INTERVAL = "min_interval"
 DEFAULT_TITLE = "Fröling Euroturbo40"
 DEFAULT_DEVICE_NAME = "Fröling Euroturbo40"
-SIGNAL_FRLNG_TELEGRAM = "froeling_telegram"
\ No newline at end of file
+DATA_READER = "froeling_reader"
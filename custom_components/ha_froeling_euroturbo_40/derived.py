@@ -0,0 +1,113 @@
+"""Metrics derived from the values read from the Fröling display."""
+import math
+
+# heat capacity of water in kWh per litre and kelvin
+WATER_HEAT_CAPACITY = 1.163e-3
+# sensors giving the buffer temperature, the layers are taken as equally sized
+BUFFER_KEYS = ("puffertmp_oben", "puffertmp_mitte", "puffertmp_unten")
+# time constant in s of the smoothed buffer charge rate
+CHARGE_RATE_TIME_CONSTANT = 900
+
+# keys of the derived metrics
+BUFFER_ENERGY = "puffer_energie"
+BUFFER_CHARGE_RATE = "puffer_ladeleistung"
+STATUS_DURATION = "kessel_status_dauer"
+
+
+class FrlngDerivedMetrics:
+    """Metrics updated with each parsed reading, O(1) per reading.
+
+    update() takes the numeric values as parsed, nothing is parsed again.
+    """
+
+    __slots__ = (
+        "_volume", "_min_temp", "_handlers", "_buffer_temps", "_buffer_sum", "_buffer_known",
+        "energy", "charge_rate", "_energy_time", "status", "_status_since", "_status_time", "_status_totals",
+    )
+
+    def __init__(self, buffer_volume: float, buffer_min_temp: float) -> None:
+        """Initialize the metrics of a buffer of buffer_volume l, empty at buffer_min_temp °C."""
+        self._volume = buffer_volume
+        self._min_temp = buffer_min_temp
+        self._handlers = {key: self._update_buffer for key in BUFFER_KEYS}
+        self._handlers["kessel_status"] = self._update_status
+        self._buffer_temps = dict.fromkeys(BUFFER_KEYS)
+        self._buffer_sum = 0
+        self._buffer_known = 0
+        # stored energy in kWh and its rate of change in kW, charging is positive
+        self.energy = None
+        self.charge_rate = None
+        self._energy_time = None
+        # kessel_status, the time it was entered, the time of its last reading and the time spent in earlier states
+        self.status = None
+        self._status_since = None
+        self._status_time = None
+        self._status_totals = {}
+
+    def update(self, name: str, value, now: float) -> tuple[str, ...]:
+        """Add a reading of sensor name at monotonic time now, returns the keys of the updated metrics"""
+        handler = self._handlers.get(name)
+        if handler is None:
+            return ()
+        return handler(name, value, now)
+
+    def _update_buffer(self, name, value, now) -> tuple[str, ...]:
+        """Update the stored energy and the smoothed charge rate"""
+        if not isinstance(value, (int, float)):
+            return ()
+        last = self._buffer_temps[name]
+        if last is None:
+            self._buffer_known += 1
+            last = 0
+        # running sum, the other layers are not added up again
+        self._buffer_sum += value - last
+        self._buffer_temps[name] = value
+        if self._buffer_known < len(BUFFER_KEYS):
+            return ()
+        mean_temp = self._buffer_sum / len(BUFFER_KEYS)
+        energy = max(mean_temp - self._min_temp, 0) * self._volume * WATER_HEAT_CAPACITY
+        if self.energy is None:
+            self.energy = energy
+            self._energy_time = now
+            return (BUFFER_ENERGY,)
+        elapsed = now - self._energy_time
+        change = energy - self.energy
+        rate = self.charge_rate or 0.0
+        if elapsed > 0:
+            # exponential smoothing of the rate between two readings
+            rate += (change * 3600 / elapsed - rate) * -math.expm1(-elapsed / CHARGE_RATE_TIME_CONSTANT)
+        else:
+            # readings of the same screen, the limit of the above
+            rate += change * 3600 / CHARGE_RATE_TIME_CONSTANT
+        self.charge_rate = rate
+        self.energy = energy
+        self._energy_time = now
+        return (BUFFER_ENERGY, BUFFER_CHARGE_RATE)
+
+    def _update_status(self, name, status, now) -> tuple[str, ...]:
+        """Add the time since the last reading to the current kessel_status"""
+        if status != self.status:
+            if self.status is not None:
+                self._status_totals[self.status] = self.status_total(self.status) + now - self._status_since
+            self.status = status
+            self._status_since = now
+        self._status_time = now
+        return (STATUS_DURATION,)
+
+    def status_total(self, status) -> float:
+        """Time in s spent in status before it was entered the last time"""
+        return self._status_totals.get(status, 0.0)
+
+    @property
+    def status_duration(self) -> float | None:
+        """Time in s in the current kessel_status up to its last reading"""
+        if self.status is None:
+            return None
+        return self._status_time - self._status_since
+
+    def status_durations(self) -> dict[str, float]:
+        """Total time in s spent in each kessel_status up to the last reading"""
+        durations = dict(self._status_totals)
+        if self.status is not None:
+            durations[self.status] = self.status_total(self.status) + self.status_duration
+        return durations
@@ -0,0 +1,33 @@
+"""Diagnostics support for the froeling integration."""
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .menu import SENSOR_KEYS
+from .sensor import DIAGNOSTIC_SENSOR_TYPES
+
+# sampling the frame rate would reset the sample of the diagnostic sensor
+SKIPPED_DIAGNOSTICS = ("display_frame_rate",)
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return the state of the CAN communication, the display and the last profiling run."""
+    frlng_com = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "entry": {"data": dict(entry.data), "options": dict(entry.options)},
+        "communication": {
+            description.key: {
+                "value": description.value_fn(frlng_com),
+                "attributes": description.attr_fn(frlng_com) if description.attr_fn else None,
+            }
+            for description in DIAGNOSTIC_SENSOR_TYPES
+            if description.key not in SKIPPED_DIAGNOSTICS
+        },
+        "values": {key: frlng_com.get_value(key) for key in SENSOR_KEYS},
+        "data_ages": frlng_com.data_ages(),
+        "lcd": frlng_com.lcd_snapshot(),
+        "profile": frlng_com.last_profile,
+        "passive": frlng_com.passive_statistics(),
+    }
@@ -0,0 +1,76 @@
+"""In-memory history of the raw Fröling display readings."""
+from array import array
+from bisect import bisect_left, bisect_right
+import math
+
+# readings kept per sensor, more than two hours with a reading every two seconds
+HISTORY_SIZE = 4096
+
+
+class FrlngHistory:
+    """Ring buffer of (timestamp, value) readings of one sensor.
+
+    Timestamps and values live in two preallocated double arrays, the
+    oldest reading is overwritten when the buffer is full.
+    """
+
+    __slots__ = ("_times", "_values", "_next", "_count")
+
+    def __init__(self, size: int = HISTORY_SIZE) -> None:
+        """Allocate the buffer for size readings."""
+        self._times = array("d", bytes(8 * size))
+        self._values = array("d", bytes(8 * size))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Number of readings kept"""
+        return self._count
+
+    @property
+    def size(self) -> int:
+        """Max number of readings kept"""
+        return len(self._times)
+
+    def append(self, timestamp: float, value: float) -> None:
+        """Add a reading, timestamps are expected in ascending order"""
+        pos = self._next
+        self._times[pos] = timestamp
+        self._values[pos] = value
+        pos += 1
+        self._next = 0 if pos == len(self._times) else pos
+        if self._count < len(self._times):
+            self._count += 1
+
+    def _ordered(self, data: array) -> array:
+        """Copy of the kept readings of data, oldest first"""
+        first = self._next - self._count
+        if first >= 0:
+            return data[first:self._next]
+        return data[first:] + data[:self._next]
+
+    def window(self, start: float | None = None, end: float | None = None) -> tuple[array, array]:
+        """Timestamps and values of the readings from start to end, both inclusive"""
+        times = self._ordered(self._times)
+        first = 0 if start is None else bisect_left(times, start)
+        last = len(times) if end is None else bisect_right(times, end)
+        return times[first:last], self._ordered(self._values)[first:last]
+
+
+def downsample(times, values, points: int) -> dict[str, list[float]]:
+    """Reduce the readings to at most points buckets of equal count
+
+    Each bucket is given by the timestamp of its first reading and the
+    mean, min and max of its values.
+    """
+    step = math.ceil(len(times) / points) if points else 0
+    if step <= 1:
+        return {"timestamps": list(times), "values": list(values)}
+    result = {"timestamps": [], "values": [], "min": [], "max": []}
+    for first in range(0, len(times), step):
+        bucket = values[first:first + step]
+        result["timestamps"].append(times[first])
+        result["values"].append(math.fsum(bucket) / len(bucket))
+        result["min"].append(min(bucket))
+        result["max"].append(max(bucket))
+    return result
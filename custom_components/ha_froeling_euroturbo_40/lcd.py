@@ -0,0 +1,167 @@
+"""Decoding and parsing of the Fröling lcd display."""
+from functools import lru_cache
+import re
+
+LCD_ROWS = 4
+LCD_COLUMNS = 20
+LCD_SIZE = LCD_ROWS * LCD_COLUMNS
+# the last column is not part of the parsed line text
+LCD_PARSE_COLUMNS = LCD_COLUMNS - 1
+# HD44780 "set DDRAM address" command bit, display addresses are sent with it
+LCD_CMD_SET_DDRAM = 0x80
+# DDRAM address of the first char of each row of the 20x4 display
+LCD_ROW_DDRAM = (0x00, 0x40, 0x14, 0x54)
+
+# DDRAM address -> framebuffer index (row * LCD_COLUMNS + column), -1 for addresses not shown
+LCD_DDRAM_INDEX: tuple[int, ...] = tuple(
+    next(
+        (row * LCD_COLUMNS + addr - start
+         for row, start in enumerate(LCD_ROW_DDRAM)
+         if start <= addr < start + LCD_COLUMNS),
+        -1,
+    )
+    for addr in range(0x80)
+)
+
+# The ROM of the display has no Ä, Ö and Ü, they are taken from the user defined
+# characters (CGRAM, codes 0x00-0x07 mirrored at 0x08-0x0f) in this order.
+LCD_CGRAM_CHARS = "ÄÖÜ"
+
+# HD44780 A00 character ROM codes 0xe0 - 0xff, 0xe2 (β) is used as ß on the Fröling display
+_LCD_ROM_HIGH = (
+    "α", "ä", "ß", "ε", "μ", "σ", "ρ", "g", "√", "⁻¹", "j", "ˣ", "¢", "£", "ñ", "ö",
+    "p", "q", "θ", "∞", "Ω", "ü", "Σ", "π", "x̄", "y", "千", "万", "円", "÷", " ", "█",
+)
+
+
+def _build_charset() -> tuple[str, ...]:
+    """Build the code -> char table for all 256 display codes"""
+    charset = [" "] * 256
+    for code in range(16):
+        slot = code % 8
+        if slot < len(LCD_CGRAM_CHARS):
+            charset[code] = LCD_CGRAM_CHARS[slot]
+    for code in range(0x20, 0x80):
+        charset[code] = chr(code)
+    charset[0x5c] = "¥"
+    charset[0x7e] = "→"
+    charset[0x7f] = "←"
+    for code in range(0xa1, 0xe0):
+        # half width katakana
+        charset[code] = chr(0xff61 + code - 0xa1)
+    charset[0xdf] = "°"
+    charset[0xe0:] = _LCD_ROM_HIGH
+    return tuple(charset)
+
+
+LCD_CHARSET = _build_charset()
+# str.translate table for text decoded as latin-1, only chars which differ
+LCD_TRANSLATION = str.maketrans(
+    {code: char for code, char in enumerate(LCD_CHARSET) if char != chr(code)}
+)
+
+
+def lcd_decode(raw: bytes | bytearray) -> str:
+    """Decode raw display codes to text"""
+    return raw.decode("latin-1").translate(LCD_TRANSLATION)
+
+
+# Kind of a line template
+LINE_VALUE = "value"  # label followed by a number and a unit, e.g. "Puffertmp. oben 82°"
+LINE_STATE = "state"  # label followed by a state text, e.g. "Heizungspumpe 1 Ein"
+LINE_TEXT = "text"    # whole line is the value, e.g. "Kessel in Betrieb"
+
+# key, label as shown on the display, kind
+# The label must be written like on the display, blanks and dots between words are optional.
+LCD_LINE_TEMPLATES: tuple[tuple[str, str, str], ...] = (
+    ("abgastemp_ist", "Abgastemp. ist", LINE_VALUE),
+    ("abgastemp_soll", "Abgastemp. soll", LINE_VALUE),
+    ("aussentemperatur", "Außentemperatur", LINE_VALUE),
+    ("puffertmp_oben", "Puffertmp. oben", LINE_VALUE),
+    ("puffertmp_mitte", "Puffertmp. mitte", LINE_VALUE),
+    ("puffertmp_unten", "Puffertmp. unten", LINE_VALUE),
+    ("kesselrucklauft", "Kesselrücklauft.", LINE_VALUE),
+    ("kesseltemp_ist", "Kesseltemp. ist", LINE_VALUE),
+    ("kesseltempsoll", "Kesseltempsoll", LINE_VALUE),
+    ("pufferladezust", "Pufferladezust.", LINE_VALUE),
+    ("betriebsstd", "Betriebsstd.", LINE_VALUE),
+    ("geblase_ist", "Gebläse IST", LINE_VALUE),
+    ("stellmot_u_ist", "Stellmot. u ist", LINE_VALUE),
+    ("stellmot_o_ist", "Stellmot. o ist", LINE_VALUE),
+    ("sauerstoffwert", "Sauerstoffwert", LINE_VALUE),
+    ("heizungspumpe1", "Heizungspumpe 1", LINE_STATE),
+    ("heizungspumpe2", "Heizungspumpe 2", LINE_STATE),
+    ("rucklaufmischer", "Rücklaufmischer", LINE_VALUE),
+    ("vorlauftmp2_ist", "Vorlauftmp2 ist", LINE_VALUE),
+    ("vorlauftmp2soll", "Vorlauftmp2soll", LINE_VALUE),
+    # status text without any number, has to be the last template
+    ("kessel_status", "Kessel", LINE_TEXT),
+)
+
+# lines which are shown on the visited pages but carry no value
+LCD_IGNORED_LINES: tuple[str, ...] = (
+    r"",
+    r"HEIZZEITEN.*",
+)
+
+LCD_LINE_CACHE_SIZE = 256
+
+# returned by parse_lcd_line for lines without a value
+LCD_LINE_IGNORED = ()
+
+_LINE_PATTERNS = {
+    LINE_VALUE: r"(?P<label>{label})\s*(?P<value>-?\d+[.\d]*)\s*(?P<unit>\S*)",
+    LINE_STATE: r"(?P<label>{label})\s*(?P<value>\S.*?)",
+    LINE_TEXT: r"(?P<value>{label}\D*?)",
+}
+
+
+def parse_number(value: str) -> int | float | str:
+    """Convert a displayed number, int without a decimal point, the text if it is no number"""
+    try:
+        if "." in value:
+            return float(value)
+        return int(value)
+    except ValueError:
+        return value
+
+
+def _compile_label(label: str) -> str:
+    """Create the regex for a display label"""
+    words = re.split(r"[\s.]+", label)
+    return r"[\s.\-_]*".join(re.escape(word) for word in words if word) + r"\.?"
+
+
+def _compile_template(key: str, label: str, kind: str) -> tuple[str, str, re.Pattern]:
+    """Create the matcher for a line template"""
+    pattern = _LINE_PATTERNS[kind].format(label=_compile_label(label))
+    return key, kind, re.compile(r"\s*" + pattern + r"\s*", re.IGNORECASE)
+
+
+_COMPILED_TEMPLATES = tuple(
+    _compile_template(key, label, kind) for key, label, kind in LCD_LINE_TEMPLATES
+)
+_COMPILED_IGNORED = tuple(
+    re.compile(r"\s*" + pattern + r"\s*", re.IGNORECASE) for pattern in LCD_IGNORED_LINES
+)
+
+
+@lru_cache(maxsize=LCD_LINE_CACHE_SIZE)
+def parse_lcd_line(line: str) -> tuple[str, int | float | str, str] | None:
+    """Resolve a display line to (key, value, unit)
+
+    Values of value lines are converted to numbers, as the result is cached this
+    is done once per distinct line.
+    Returns LCD_LINE_IGNORED for lines without a value and None for unknown lines.
+    """
+    for key, kind, pattern in _COMPILED_TEMPLATES:
+        match = pattern.fullmatch(line)
+        if match is None:
+            continue
+        if kind == LINE_VALUE:
+            return key, parse_number(match["value"]), match["unit"] or "None"
+        return key, match["value"], "None"
+    for pattern in _COMPILED_IGNORED:
+        if pattern.fullmatch(line):
+            return LCD_LINE_IGNORED
+    return None
@@ -0,0 +1,247 @@
+"""Menu pages of the Fröling display and the polling schedule."""
+from collections import deque
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import lru_cache
+import enum
+
+
+class FrlngButtonCodes(enum.IntEnum):
+    BUTTON_UP     = 0x01
+    BUTTON_LEFT   = 0x02
+    BUTTON_DOWN   = 0x04
+    BUTTON_RIGHT  = 0x08
+    BUTTON_CHANGE = 0x10
+    BUTTON_BURNUP = 0x20
+    BUTTON_INFO   = 0x40
+    BUTTON_ON_OFF = 0x80
+    BUTTON_NO_BUT = 0x00
+    REFRESH_DISPLAY = 0xff
+
+
+@dataclass(frozen=True)
+class FrlngMenuPage:
+    """A display page reached from the main menu."""
+
+    name: str
+    # cursor position in the main menu, 0 is "Pufferladezust.", negative positions are above it
+    position: int
+    # page is opened with BUTTON_RIGHT on the menu entry, otherwise the main menu itself is read
+    details: bool
+    # sensors shown on the page
+    sensors: tuple[str, ...]
+    # target refresh interval
+    interval: timedelta
+    # shorter refresh interval while the boiler burns, e.g. during burn-up
+    burn_interval: timedelta | None = None
+
+    def refresh_interval(self, burning: bool) -> timedelta:
+        """Return the target refresh interval, burning when the boiler burns"""
+        if burning and self.burn_interval is not None:
+            return self.burn_interval
+        return self.interval
+
+
+MENU_PAGES: tuple[FrlngMenuPage, ...] = (
+    FrlngMenuPage("hauptmenue", 0, False, ("kessel_status", "pufferladezust"), timedelta(seconds=30)),
+    FrlngMenuPage("abgastemps", -1, True, ("abgastemp_ist", "abgastemp_soll"), timedelta(minutes=5), timedelta(seconds=10)),
+    FrlngMenuPage("kesseltemps", -2, True, ("kesseltemp_ist", "kesseltempsoll"), timedelta(seconds=30)),
+    FrlngMenuPage("puffertemps", 0, True, ("puffertmp_oben", "puffertmp_mitte", "puffertmp_unten"), timedelta(seconds=60)),
+    FrlngMenuPage("kesselruecklauf", 1, True, ("kesselrucklauft", "rucklaufmischer"), timedelta(seconds=60)),
+    FrlngMenuPage("heizungspumpen", 3, False, ("heizungspumpe1", "heizungspumpe2"), timedelta(seconds=60)),
+    FrlngMenuPage("vorlauf", 3, True, ("vorlauftmp2_ist", "vorlauftmp2soll"), timedelta(seconds=60)),
+    FrlngMenuPage("geblaese_menue", 5, False, ("aussentemperatur",), timedelta(minutes=5)),
+    FrlngMenuPage("geblaese", 5, True, ("geblase_ist",), timedelta(minutes=5), timedelta(seconds=10)),
+    FrlngMenuPage("stellmotor_oben", 6, True, ("stellmot_o_ist",), timedelta(minutes=5), timedelta(seconds=30)),
+    FrlngMenuPage("stellmotor_unten", 7, True, ("stellmot_u_ist",), timedelta(minutes=5), timedelta(seconds=30)),
+    FrlngMenuPage("sauerstoffwert", 8, True, ("sauerstoffwert",), timedelta(minutes=5), timedelta(seconds=10)),
+    FrlngMenuPage("sauerstoff_menue", 8, False, ("betriebsstd",), timedelta(minutes=5)),
+)
+
+# parts of the kessel_status texts shown while the boiler burns, lower case
+BURNING_STATUS = ("anheizen", "heizen", "in betrieb")
+
+# keys of all sensors read from the menu pages
+SENSOR_KEYS = [sensor for page in MENU_PAGES for sensor in page.sensors]
+
+# brings the display back to the main menu from any sub menu or error screen,
+# the cursor is then on "Pufferladezust."
+MENU_RESYNC = (FrlngButtonCodes.BUTTON_LEFT,) * 4
+MENU_RESYNC_INTERVAL = timedelta(seconds=60)
+
+# A node of the menu graph is (cursor position, details page open)
+FrlngMenuNode = tuple[int, bool]
+MENU_HOME: FrlngMenuNode = (0, False)
+MENU_PAGES_BY_NAME = {page.name: page for page in MENU_PAGES}
+
+
+def page_node(page: FrlngMenuPage) -> FrlngMenuNode:
+    """Return the menu graph node showing the page"""
+    return (page.position, page.details)
+
+
+def _build_menu_graph(pages: tuple[FrlngMenuPage, ...]) -> dict[FrlngMenuNode, dict[FrlngButtonCodes, FrlngMenuNode]]:
+    """Build node -> {button: next node} for the main menu and its detail pages"""
+    first = min(page.position for page in pages)
+    last = max(page.position for page in pages)
+    details = {page.position for page in pages if page.details}
+    graph: dict[FrlngMenuNode, dict[FrlngButtonCodes, FrlngMenuNode]] = {}
+    for position in range(first, last + 1):
+        edges = {FrlngButtonCodes.BUTTON_LEFT: MENU_HOME}
+        if position > first:
+            edges[FrlngButtonCodes.BUTTON_UP] = (position - 1, False)
+        if position < last:
+            edges[FrlngButtonCodes.BUTTON_DOWN] = (position + 1, False)
+        if position in details:
+            edges[FrlngButtonCodes.BUTTON_RIGHT] = (position, True)
+            graph[(position, True)] = {FrlngButtonCodes.BUTTON_LEFT: (position, False)}
+        graph[(position, False)] = edges
+    return graph
+
+
+MENU_GRAPH = _build_menu_graph(MENU_PAGES)
+
+
+@lru_cache(maxsize=None)
+def menu_path(start: FrlngMenuNode, goal: FrlngMenuNode) -> tuple[FrlngButtonCodes, ...]:
+    """Shortest button sequence from start to goal (breadth first search)"""
+    previous: dict[FrlngMenuNode, tuple[FrlngMenuNode, FrlngButtonCodes] | None] = {start: None}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        if node == goal:
+            break
+        for button, next_node in MENU_GRAPH[node].items():
+            if next_node not in previous:
+                previous[next_node] = (node, button)
+                queue.append(next_node)
+    else:
+        raise ValueError("No menu path from " + str(start) + " to " + str(goal))
+    path = []
+    while previous[goal] is not None:
+        goal, button = previous[goal]
+        path.append(button)
+    return tuple(reversed(path))
+
+
+def pages_for_sensors(sensors) -> list[FrlngMenuPage]:
+    """Return the pages showing the sensors, raises KeyError for unknown sensors"""
+    pages = []
+    for sensor in sensors:
+        page = next((page for page in MENU_PAGES if sensor in page.sensors), None)
+        if page is None:
+            raise KeyError(sensor)
+        if page not in pages:
+            pages.append(page)
+    return pages
+
+
+def page_from_sensors(sensors) -> FrlngMenuPage | None:
+    """Return the page showing all of its sensors in sensors, None when no page matches
+
+    The page with the most sensors wins, e.g. the details of a menu entry over the menu itself.
+    """
+    shown = set(sensors)
+    pages = [page for page in MENU_PAGES if shown.issuperset(page.sensors)]
+    if not pages:
+        return None
+    return max(pages, key=lambda page: len(page.sensors))
+
+
+def is_burning(status: str | None) -> bool:
+    """Return True if the kessel_status text means the boiler burns"""
+    if not status:
+        return False
+    status = status.lower()
+    return any(burning in status for burning in BURNING_STATUS)
+
+
+def _page_order(page: FrlngMenuPage) -> tuple[bool, int, bool]:
+    """Visit order for pages in the same distance: main menu side first"""
+    return (page.position > 0 or page.details and page.position == 0, abs(page.position), page.details)
+
+
+class FrlngPollScheduler:
+    """Decide which page is read next and find the button path to it."""
+
+    def __init__(self, pages: tuple[FrlngMenuPage, ...] = MENU_PAGES) -> None:
+        """Initialize the scheduler, all pages are due at start."""
+        self._pages = pages
+        self._last_visit: dict[str, float | None] = {page.name: None for page in pages}
+        self._last_resync: float | None = None
+        self._requested: list[FrlngMenuPage] = []
+        self._passive: frozenset[str] = frozenset()
+        self._burning = False
+        self.node: FrlngMenuNode = MENU_HOME
+
+    def due_pages(self, now: float) -> list[FrlngMenuPage]:
+        """Return the pages whose refresh interval is over, pages with only passive sensors are never due"""
+        return [
+            page for page in self._pages
+            if (self._last_visit[page.name] is None
+                or now - self._last_visit[page.name] >= page.refresh_interval(self._burning).total_seconds())
+            and not self._passive.issuperset(page.sensors)
+        ]
+
+    def set_burning(self, burning: bool) -> None:
+        """The boiler burns, the pages with a burn interval are read more often"""
+        self._burning = burning
+
+    def set_passive_sensors(self, sensors: frozenset[str]) -> None:
+        """The sensors are read without the display"""
+        self._passive = sensors
+
+    def request_pages(self, pages: list[FrlngMenuPage]) -> None:
+        """Read the pages next, before any page which is only due"""
+        for page in pages:
+            if page not in self._requested:
+                self._requested.append(page)
+
+    def page_visited(self, page: FrlngMenuPage, now: float) -> None:
+        """Remember when a page was read"""
+        self._last_visit[page.name] = now
+        self.node = page_node(page)
+        if page in self._requested:
+            self._requested.remove(page)
+
+    def page_detected(self, page: FrlngMenuPage, now: float) -> None:
+        """The display shows page, e.g. where a user left it, no resync is needed"""
+        self.node = page_node(page)
+        self._last_resync = now
+
+    def invalidate_menu(self) -> None:
+        """The menu position is unknown, e.g. after a user pressed a button"""
+        self._last_resync = None
+
+    def next_visit(self, now: float) -> tuple[list[FrlngButtonCodes], FrlngMenuPage] | None:
+        """Return the buttons to the next page to read, None when no page is due
+
+        Requested pages come first, otherwise the closest due page is read.
+        """
+        pages = self._requested or self.due_pages(now)
+        if not pages:
+            return None
+        path = self._resync_path(now)
+        page = min(pages, key=lambda page: (len(menu_path(self.node, page_node(page))), _page_order(page)))
+        path.extend(menu_path(self.node, page_node(page)))
+        return path, page
+
+    def path_to(self, page: FrlngMenuPage, now: float) -> list[FrlngButtonCodes]:
+        """Return the buttons to page, resyncing the menu first when needed"""
+        path = self._resync_path(now)
+        path.extend(menu_path(self.node, page_node(page)))
+        return path
+
+    def _resync_path(self, now: float) -> list[FrlngButtonCodes]:
+        """Return the resync buttons when the menu position is unknown or old"""
+        if self._last_resync is None or now - self._last_resync >= MENU_RESYNC_INTERVAL.total_seconds():
+            self._last_resync = now
+            self.node = MENU_HOME
+            return list(MENU_RESYNC)
+        return []
+
+    def path_home(self) -> list[FrlngButtonCodes]:
+        """Return the buttons back to the main menu"""
+        path = list(menu_path(self.node, MENU_HOME))
+        self.node = MENU_HOME
+        return path
@@ -0,0 +1,134 @@
+"""Passive decoding of the traffic between the main board and the addon boards.
+
+The main board sends 0x0c0, 0x040 and 0x022 frames the display does not need.
+The statistics of these frames show which bytes change and may carry measured
+values, mapped fields are read without pressing any button.
+"""
+from dataclasses import dataclass
+
+# frames from the main board to the addon boards
+PASSIVE_ARB_IDS = (0x0c0, 0x040, 0x022)
+# distinct payloads counted per arbitration id
+PASSIVE_MAX_PAYLOADS = 256
+
+
+@dataclass(frozen=True)
+class FrlngPassiveField:
+    """A sensor value carried in the frames of an arbitration id."""
+
+    # key of the sensor in SENSOR_TYPES
+    key: str
+    arb_id: int
+    # first byte and number of bytes of the big endian value
+    offset: int
+    length: int = 1
+    signed: bool = False
+    scale: float = 1
+
+    def decode(self, data: bytes) -> int | float | None:
+        """Return the value in data, None when the frame is too short"""
+        if self.offset + self.length > len(data):
+            return None
+        raw = int.from_bytes(data[self.offset:self.offset + self.length], "big", signed=self.signed)
+        if self.scale == 1:
+            return raw
+        return round(raw * self.scale, 3)
+
+
+# fields read in passive mode, the sensors not listed are read from the display
+PASSIVE_FIELDS: tuple[FrlngPassiveField, ...] = ()
+
+
+class FrlngFrameStats:
+    """Statistics of the frames of one arbitration id."""
+
+    __slots__ = ("frames", "changes", "byte_changes", "last", "payloads", "first_time", "last_time")
+
+    def __init__(self) -> None:
+        """Initialize empty statistics."""
+        self.frames = 0
+        # frames with a payload different from the frame before
+        self.changes = 0
+        self.byte_changes = [0] * 8
+        self.last = None
+        self.payloads = set()
+        self.first_time = None
+        self.last_time = None
+
+    def add(self, data: bytes, now: float) -> None:
+        """Count a frame received at monotonic time now"""
+        self.frames += 1
+        if self.first_time is None:
+            self.first_time = now
+        self.last_time = now
+        last = self.last
+        if last is not None and data != last:
+            self.changes += 1
+            for index in range(min(len(data), len(last))):
+                if data[index] != last[index]:
+                    self.byte_changes[index] += 1
+        self.last = data
+        if len(self.payloads) < PASSIVE_MAX_PAYLOADS:
+            self.payloads.add(data)
+
+    @property
+    def change_ratio(self) -> float:
+        """Part of the frames which changed the payload"""
+        if self.frames < 2:
+            return 0.0
+        return self.changes / (self.frames - 1)
+
+    def summary(self) -> dict:
+        """Counters and the last payload"""
+        duration = self.last_time - self.first_time if self.frames > 1 else None
+        return {
+            "frames": self.frames,
+            "frame_rate": round((self.frames - 1) / duration, 2) if duration else None,
+            "change_ratio": round(self.change_ratio, 3),
+            "byte_changes": self.byte_changes,
+            "payloads": len(self.payloads),
+            "last": None if self.last is None else self.last.hex(),
+        }
+
+
+class FrlngPassiveDecoder:
+    """Collect the frame statistics and decode the mapped fields."""
+
+    def __init__(self, fields: tuple[FrlngPassiveField, ...] | None = None) -> None:
+        """Initialize the decoder of fields, PASSIVE_FIELDS by default."""
+        if fields is None:
+            fields = PASSIVE_FIELDS
+        self.stats = {arb_id: FrlngFrameStats() for arb_id in PASSIVE_ARB_IDS}
+        self._fields: dict[int, list[FrlngPassiveField]] = {}
+        for field in fields:
+            self._fields.setdefault(field.arb_id, []).append(field)
+        self.keys = frozenset(field.key for field in fields)
+        self._values = {}
+        # sensor key -> monotonic time it was last decoded
+        self._decoded = {}
+
+    def frame(self, arb_id: int, data: bytes, now: float) -> list[tuple[str, int | float]]:
+        """Count a frame and return the changed values of its fields"""
+        stats = self.stats.get(arb_id)
+        if stats is None:
+            return []
+        stats.add(data, now)
+        changed = []
+        for field in self._fields.get(arb_id, ()):
+            value = field.decode(data)
+            if value is None:
+                continue
+            self._decoded[field.key] = now
+            if self._values.get(field.key) != value:
+                self._values[field.key] = value
+                changed.append((field.key, value))
+        return changed
+
+    def sensors(self, now: float, timeout: float) -> set[str]:
+        """Return the sensors decoded within timeout s before now"""
+        return {key for key, decoded in self._decoded.items() if now - decoded < timeout}
+
+    def ranking(self) -> list[dict]:
+        """Statistics of the arbitration ids, the most often changing payload first"""
+        ranked = sorted(self.stats.items(), key=lambda item: (item[1].change_ratio, item[1].frames), reverse=True)
+        return [{"arb_id": hex(arb_id), **stats.summary()} for arb_id, stats in ranked]
@@ -0,0 +1,117 @@
+"""Opt-in profiling of the Fröling receive and parse pipeline."""
+import cProfile
+import functools
+import inspect
+import io
+import pstats
+import time
+
+# methods of FrlngCANCom whose calls are timed while profiling
+PROFILED_METHODS = (
+    "can_frame_receive",
+    "handle_display_data",
+    "parse_lcd_lines",
+    "apply_screen_updates",
+    "send_button",
+)
+# functions listed in the summary file
+PROFILE_TOP_FUNCTIONS = 30
+
+
+class FrlngProfiler:
+    """Profile the CAN communication of one boiler for a while.
+
+    The timed methods are wrapped on the instance only while profiling, the
+    class is not touched, so nothing is left in the call paths when profiling
+    is off. cProfile sees the event loop thread, the call timings also cover
+    the receive thread.
+    """
+
+    def __init__(self, target, methods=PROFILED_METHODS) -> None:
+        """Initialize the profiler of target."""
+        self._target = target
+        self._methods = methods
+        self._profile = cProfile.Profile()
+        # method name -> [calls, total time, max time] in s
+        self.timings = {name: [0, 0.0, 0.0] for name in methods}
+        self._started = None
+        self.duration = None
+
+    def start(self) -> None:
+        """Start profiling, raises ValueError when another profiler is active"""
+        self._profile.enable()
+        for name in self._methods:
+            setattr(self._target, name, self._wrap(getattr(self._target, name), self.timings[name]))
+        self._started = time.monotonic()
+
+    def stop(self) -> None:
+        """Stop profiling and remove the wrappers"""
+        self._profile.disable()
+        for name in self._methods:
+            # the instance attribute hides the method of the class
+            delattr(self._target, name)
+        self.duration = time.monotonic() - self._started
+
+    @staticmethod
+    def _wrap(method, timing):
+        """Return method recording its call time in timing"""
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def timed_coroutine(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await method(*args, **kwargs)
+                finally:
+                    _record(timing, time.perf_counter() - start)
+            return timed_coroutine
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                _record(timing, time.perf_counter() - start)
+        return timed
+
+    def summary(self) -> dict:
+        """Duration and call timings of the profiled methods"""
+        return {
+            "duration": round(self.duration, 1),
+            "timings": {
+                name: {
+                    "calls": calls,
+                    "total_ms": round(total * 1e3, 3),
+                    "mean_us": round(total / calls * 1e6, 1) if calls else None,
+                    "max_us": round(maximum * 1e6, 1),
+                }
+                for name, (calls, total, maximum) in self.timings.items()
+            },
+        }
+
+    def write(self, path_prefix: str) -> dict[str, str]:
+        """Write the pstats dump and a text summary, blocking. Returns the paths"""
+        stats_path = path_prefix + ".prof"
+        summary_path = path_prefix + ".txt"
+        self._profile.dump_stats(stats_path)
+        stream = io.StringIO()
+        stream.write("Profiled for " + str(round(self.duration, 1)) + "s\n\n")
+        stream.write("{:<24}{:>10}{:>14}{:>12}{:>12}\n".format("method", "calls", "total ms", "mean µs", "max µs"))
+        for name, timing in self.summary()["timings"].items():
+            stream.write("{:<24}{:>10}{:>14}{:>12}{:>12}\n".format(
+                name, timing["calls"], timing["total_ms"], str(timing["mean_us"]), timing["max_us"]
+            ))
+        stream.write("\n")
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_FUNCTIONS)
+        with open(summary_path, "w", encoding="utf-8") as file:
+            file.write(stream.getvalue())
+        return {"stats": stats_path, "summary": summary_path}
+
+
+def _record(timing, elapsed) -> None:
+    """Add one call to timing"""
+    timing[0] += 1
+    timing[1] += elapsed
+    if elapsed > timing[2]:
+        timing[2] = elapsed
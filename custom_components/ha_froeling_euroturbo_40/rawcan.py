@@ -0,0 +1,81 @@
+"""Raw SocketCAN receive engine for the Fröling CAN bus."""
+import socket
+import struct
+
+import can
+
+from .const import LOGGER
+
+# struct can_frame of linux/can.h: can_id, len, padding, data
+CAN_FRAME = struct.Struct("=IB3x8s")
+# struct can_filter of linux/can.h: can_id, can_mask
+CAN_FILTER = struct.Struct("=II")
+# only standard (11 bit) data frames match a filter
+CAN_FILTER_MASK = socket.CAN_SFF_MASK | socket.CAN_EFF_FLAG | socket.CAN_RTR_FLAG
+# max frames read from the socket into one batch
+RAW_MAX_BATCH = 128
+
+
+def pack_can_filters(arbitration_ids) -> bytes:
+    """Pack a CAN_RAW_FILTER option passing only the given standard ids"""
+    return b"".join(CAN_FILTER.pack(arb_id, CAN_FILTER_MASK) for arb_id in arbitration_ids)
+
+
+def iter_can_frames(frames: bytes):
+    """Iterate over (arbitration id, dlc, data) of packed can_frame structs, data is padded to 8 bytes"""
+    for can_id, dlc, data in CAN_FRAME.iter_unpack(frames):
+        yield can_id & socket.CAN_SFF_MASK, dlc, data
+
+
+class FrlngRawCANSocket:
+    """CAN_RAW socket reading can_frame structs into a preallocated buffer.
+
+    Only the parts of can.BusABC used for the Fröling bus are provided:
+    send, fileno and shutdown. Receiving is done by read_frames.
+    """
+
+    def __init__(self, channel: str, arbitration_ids, sock: socket.socket | None = None) -> None:
+        """Open and bind the socket, blocking. sock replaces the CAN socket in tests."""
+        self.channel_info = "Raw SocketCAN channel " + channel
+        if sock is None:
+            sock = socket.socket(socket.AF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
+            sock.setsockopt(socket.SOL_CAN_RAW, socket.CAN_RAW_FILTER, pack_can_filters(arbitration_ids))
+            sock.bind((channel,))
+        sock.setblocking(False)
+        self._sock = sock
+        self._buf = bytearray(RAW_MAX_BATCH * CAN_FRAME.size)
+        self._frames = [
+            memoryview(self._buf)[offset:offset + CAN_FRAME.size]
+            for offset in range(0, len(self._buf), CAN_FRAME.size)
+        ]
+        LOGGER.debug("Opened " + self.channel_info)
+
+    def fileno(self) -> int:
+        """File descriptor of the socket"""
+        return self._sock.fileno()
+
+    def read_frames(self) -> bytes:
+        """Read the frames waiting on the socket without blocking, returns packed can_frame structs"""
+        count = 0
+        while count < RAW_MAX_BATCH:
+            try:
+                size = self._sock.recv_into(self._frames[count])
+            except BlockingIOError:
+                break
+            except OSError as error:
+                raise can.CanOperationError("Failed to receive: " + str(error)) from error
+            # anything else than a classic can_frame is not used on the Fröling bus
+            if size == CAN_FRAME.size:
+                count += 1
+        return bytes(self._buf[:count * CAN_FRAME.size])
+
+    def send(self, msg: can.Message, timeout: float | None = None) -> None:
+        """Send a standard data frame"""
+        try:
+            self._sock.send(CAN_FRAME.pack(msg.arbitration_id, msg.dlc, bytes(msg.data)))
+        except OSError as error:
+            raise can.CanOperationError("Failed to send: " + str(error)) from error
+
+    def shutdown(self) -> None:
+        """Close the socket"""
+        self._sock.close()
@@ -0,0 +1,146 @@
+"""Receive thread shared by all Fröling CAN buses."""
+from collections.abc import Callable
+import select
+import threading
+import time
+
+import can
+
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_READER, LOGGER
+from .rawcan import FrlngRawCANSocket
+
+# max time the thread blocks in select, also the time a removed bus may still be polled
+READER_SELECT_TIMEOUT = 0.1
+# poll interval for buses without a file descriptor, e.g. the virtual bus
+READER_POLL_INTERVAL = 0.005
+# max frames read from one bus before the batch is posted to the event loop
+READER_MAX_BATCH = 128
+
+
+class FrlngCANReader:
+    """Read all configured buses in one thread and post the frames in batches.
+
+    Instead of a Notifier thread per bus and a loop callback per frame, the
+    frames of each bus are collected and handed to the event loop with one
+    callback per batch.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the reader, the thread is started with the first bus."""
+        self._hass = hass
+        self._buses: dict[can.BusABC, tuple[int | None, Callable, Callable | None]] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = None
+
+    def add_bus(
+        self,
+        bus: can.BusABC | FrlngRawCANSocket,
+        callback: Callable[[list[can.Message] | bytes], None],
+        error_callback: Callable[[Exception], None] | None = None,
+        in_thread: bool = False,
+    ) -> None:
+        """Receive from bus, callback is run in the event loop with each batch of frames
+
+        With in_thread callback is run in the receive thread instead, it has to
+        post its results to the event loop itself.
+        After a receive error the bus is not read anymore and error_callback is
+        run in the event loop with the error.
+        """
+        try:
+            fileno = bus.fileno()
+        except NotImplementedError:
+            fileno = None
+        with self._lock:
+            self._buses[bus] = (fileno, callback, error_callback, in_thread)
+            if self._thread is None:
+                self._stop = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._stop,), name="froeling_can_reader", daemon=True
+                )
+                self._thread.start()
+
+    def remove_bus(self, bus: can.BusABC) -> None:
+        """Stop receiving from bus, blocking until the thread does not use it anymore"""
+        with self._lock:
+            self._buses.pop(bus, None)
+            thread = None
+            if not self._buses and self._thread is not None:
+                # the last bus is gone, a new thread is started with the next bus
+                self._stop.set()
+                thread = self._thread
+                self._thread = None
+        if thread is not None:
+            thread.join(2 * READER_SELECT_TIMEOUT)
+
+    @property
+    def bus_count(self) -> int:
+        """Number of buses read"""
+        return len(self._buses)
+
+    def _run(self, stop: threading.Event) -> None:
+        """The receive thread"""
+        LOGGER.debug("Started CAN reader thread")
+        loop = self._hass.loop
+        while not stop.is_set():
+            received = False
+            failed = []
+            with self._lock:
+                for bus, (fileno, callback, error_callback, in_thread) in self._buses.items():
+                    try:
+                        batch = self._read_batch(bus)
+                    except can.CanError as error:
+                        LOGGER.error("Failed to receive from " + str(bus.channel_info) + " Error:" + str(error))
+                        failed.append(bus)
+                        if error_callback is not None:
+                            loop.call_soon_threadsafe(error_callback, error)
+                        continue
+                    if not batch:
+                        continue
+                    received = True
+                    if in_thread:
+                        try:
+                            callback(batch)
+                        except Exception:  # pylint: disable=broad-except
+                            LOGGER.exception("Error decoding frames from " + str(bus.channel_info))
+                    else:
+                        loop.call_soon_threadsafe(callback, batch)
+                for bus in failed:
+                    # a broken bus would fail on every poll, it is added again when reopened
+                    del self._buses[bus]
+                filenos = [fileno for fileno, _, _, _ in self._buses.values()]
+            if received:
+                continue
+            if filenos and None not in filenos:
+                try:
+                    select.select(filenos, [], [], READER_SELECT_TIMEOUT)
+                except (OSError, ValueError):
+                    # a bus was closed while waiting
+                    pass
+            else:
+                time.sleep(READER_POLL_INTERVAL)
+        LOGGER.debug("Stopped CAN reader thread")
+
+    def _read_batch(self, bus: can.BusABC | FrlngRawCANSocket) -> list[can.Message] | bytes:
+        """Read the frames waiting on bus without blocking
+
+        Raw sockets return packed can_frame structs instead of messages.
+        """
+        if isinstance(bus, FrlngRawCANSocket):
+            return bus.read_frames()
+        batch = []
+        while len(batch) < READER_MAX_BATCH:
+            msg = bus.recv(timeout=0)
+            if msg is None:
+                break
+            batch.append(msg)
+        return batch
+
+
+def get_reader(hass: HomeAssistant) -> FrlngCANReader:
+    """Return the reader shared by all config entries"""
+    if DATA_READER not in hass.data:
+        hass.data[DATA_READER] = FrlngCANReader(hass)
+    return hass.data[DATA_READER]
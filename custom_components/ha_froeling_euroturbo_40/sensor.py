@@ -2,14 +2,13 @@
 from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.device_registry import DeviceInfo
-from homeassistant.helpers.dispatcher import (
-    async_dispatcher_connect,
-    async_dispatcher_send,
-)
-from homeassistant.const import UnitOfTemperature, UnitOfTime
+from homeassistant.helpers.event import async_call_later
+from homeassistant.const import UnitOfEnergy, UnitOfFrequency, UnitOfPower, UnitOfTemperature, UnitOfTime
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.util.dt import utcnow
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
 from homeassistant.components.sensor import (
+    RestoreSensor,
     SensorDeviceClass,
     SensorEntity,
     SensorEntityDescription,
@@ -23,24 +22,64 @@ from homeassistant.const import (
     EVENT_HOMEASSISTANT_STOP,
 )
 
-from collections.abc import Mapping
+from collections import deque
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
 import can
-from can.notifier import MessageRecipient
-import re
 import enum
 from typing import (List,Any)
 import binascii
 import asyncio
-import time
-import slugify 
+import contextlib
 from datetime import timedelta
+import time
 
 from .const import (
     LOGGER,
     DEFAULT_DEVICE_NAME,
     CONF_CAN_BUS,
-    SIGNAL_FRLNG_TELEGRAM,
-    DOMAIN
+    DOMAIN,
+    CONF_ADAPTIVE_PACING,
+    DEFAULT_ADAPTIVE_PACING,
+    CONF_CAPTURE,
+    DEFAULT_CAPTURE,
+    CONF_DEVICE_ID,
+    DEFAULT_DEVICE_ID,
+    CONF_RAW_SOCKET,
+    DEFAULT_RAW_SOCKET,
+    CONF_USER_IDLE,
+    DEFAULT_USER_IDLE,
+    CONF_BUFFER_VOLUME,
+    DEFAULT_BUFFER_VOLUME,
+    CONF_BUFFER_MIN_TEMP,
+    DEFAULT_BUFFER_MIN_TEMP,
+    CONF_PASSIVE,
+    DEFAULT_PASSIVE,
+    CONF_DECODE_IN_THREAD,
+    DEFAULT_DECODE_IN_THREAD,
+    CONF_SENSOR_FILTERS,
+    CONF_DEADBAND,
+    CONF_MIN_INTERVAL,
+)
+from .capture import FrlngCaptureWriter
+from .derived import BUFFER_CHARGE_RATE, BUFFER_ENERGY, STATUS_DURATION, FrlngDerivedMetrics
+from .history import FrlngHistory, downsample
+from .passive import PASSIVE_ARB_IDS, FrlngPassiveDecoder
+from .profiler import FrlngProfiler
+from .rawcan import FrlngRawCANSocket, iter_can_frames
+from .reader import get_reader
+from .tx import FrlngCANTransmitter
+from .menu import FrlngButtonCodes, FrlngPollScheduler, is_burning, page_from_sensors, pages_for_sensors
+from .lcd import (
+    LCD_CHARSET,
+    LCD_CMD_SET_DDRAM,
+    LCD_COLUMNS,
+    LCD_DDRAM_INDEX,
+    LCD_PARSE_COLUMNS,
+    LCD_ROWS,
+    LCD_SIZE,
+    lcd_decode,
+    parse_lcd_line,
 )
 
 
@@ -54,231 +93,412 @@ SENSOR_UNIT_MAPPING = {
     "h" : UnitOfTime.HOURS
 }
 
-SENSOR_TYPES: tuple[SensorEntityDescription, ...] = (
-    SensorEntityDescription(
+@dataclass(frozen=True, kw_only=True)
+class FrlngSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor read from the display."""
+
+    # unit as shown on the display, a key of SENSOR_UNIT_MAPPING
+    display_unit: str = "None"
+    # a change of at least deadband is written at once, smaller changes after min_interval
+    deadband: float = 0
+    # min time between two state writes, the latest value is written when it is over
+    min_interval: timedelta = timedelta(0)
+
+
+SENSOR_TYPES: tuple[FrlngSensorEntityDescription, ...] = (
+    FrlngSensorEntityDescription(
         key="abgastemp_ist",
         translation_key="abgas_temperatur",
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
+        display_unit="°",
+        deadband=2,
+        min_interval=timedelta(seconds=30),
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="abgastemp_soll",
         translation_key="abgas_soll_temperatur",
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
+        display_unit="°",
+        deadband=2,
+        min_interval=timedelta(seconds=30),
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="aussentemperatur",
         translation_key="ausen_temperatur",
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
+        display_unit="°",
+        deadband=1,
+        min_interval=timedelta(seconds=60),
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="puffertmp_oben",
         translation_key="puffer_temperatur_oben",
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
+        display_unit="°",
+        deadband=2,
+        min_interval=timedelta(seconds=30),
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="puffertmp_mitte",
         translation_key="puffer_temperatur_mitte",
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
+        display_unit="°",
+        deadband=2,
+        min_interval=timedelta(seconds=30),
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="puffertmp_unten",
         translation_key="puffer_temperatur_unten",
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
+        display_unit="°",
+        deadband=2,
+        min_interval=timedelta(seconds=30),
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="kesselrucklauft",
         translation_key="kessel_rucklauf_temperatur",
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
+        display_unit="°",
+        deadband=2,
+        min_interval=timedelta(seconds=30),
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="kesseltemp_ist",
         translation_key="kessel_temperatur",
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
+        display_unit="°",
+        deadband=2,
+        min_interval=timedelta(seconds=30),
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="kesseltempsoll",
         translation_key="kessel_soll_temperatur",
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
+        display_unit="°",
+        deadband=2,
+        min_interval=timedelta(seconds=30),
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="pufferladezust",
         icon="mdi:water-boiler",
         translation_key="puffer_ladezustand",
         state_class=SensorStateClass.MEASUREMENT,
         native_unit_of_measurement=PERCENTAGE,
+        display_unit="%",
+        deadband=1,
+        min_interval=timedelta(seconds=60),
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="betriebsstd",
         translation_key="betriebsstunden",
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.DURATION,
         native_unit_of_measurement=UnitOfTime.HOURS,
+        display_unit="h",
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="geblase_ist",
         translation_key="geblase_drehzahl",
         icon="mdi:fan",
         state_class=SensorStateClass.MEASUREMENT,
         native_unit_of_measurement=REVOLUTIONS_PER_MINUTE,
+        display_unit="U",
+        deadband=50,
+        min_interval=timedelta(seconds=30),
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="stellmot_u_ist",
         translation_key="stellmotor_unten",
         icon="mdi:arrow-oscillating",
         state_class=SensorStateClass.MEASUREMENT,
         native_unit_of_measurement=PERCENTAGE,
+        display_unit="%",
+        deadband=5,
+        min_interval=timedelta(seconds=30),
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="stellmot_o_ist",
         translation_key="stellmotor_oben",
         icon="mdi:arrow-oscillating",
         state_class=SensorStateClass.MEASUREMENT,
         native_unit_of_measurement=PERCENTAGE,
+        display_unit="%",
+        deadband=5,
+        min_interval=timedelta(seconds=30),
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="sauerstoffwert",
         translation_key="sauerstoffwert",
         icon="mdi:engine-outline",
         state_class=SensorStateClass.MEASUREMENT,
         native_unit_of_measurement=PERCENTAGE,
+        display_unit="%",
+        deadband=0.5,
+        min_interval=timedelta(seconds=30),
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="kessel_status",
         translation_key="kessel_status",
         icon="mdi:list-status",
         device_class=SensorDeviceClass.ENUM,
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="heizungspumpe1",
         translation_key="heizungspumpe1",
         icon="mdi:pump",
         device_class=SensorDeviceClass.ENUM,
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="heizungspumpe2",
         translation_key="heizungspumpe2",
         icon="mdi:pump",
         device_class=SensorDeviceClass.ENUM,
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="rucklaufmischer",
         translation_key="ruecklaufmischer",
         icon="mdi:pump",
-        device_class=SensorDeviceClass.ENUM,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        display_unit="%",
+        deadband=5,
+        min_interval=timedelta(seconds=30),
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="vorlauftmp2_ist",
         translation_key="vorlauf_ist_temperatur_2",
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
+        display_unit="°",
+        deadband=2,
+        min_interval=timedelta(seconds=30),
     ),
-    SensorEntityDescription(
+    FrlngSensorEntityDescription(
         key="vorlauftmp2soll",
         translation_key="vorlauf_soll_temperatur_2",
         state_class=SensorStateClass.MEASUREMENT,
         device_class=SensorDeviceClass.TEMPERATURE,
+        display_unit="°",
+        deadband=2,
+        min_interval=timedelta(seconds=30),
     ),
 
 )
 
 SENSORS = {desc.key: desc for desc in SENSOR_TYPES}
 
+# time the value was last read from the display, restored values keep the time of their reading
+ATTR_LAST_READ = "last_read"
+
+
+@dataclass(frozen=True, kw_only=True)
+class FrlngDiagnosticEntityDescription(SensorEntityDescription):
+    """Describes a diagnostic sensor of the CAN communication."""
+
+    value_fn: Callable[["FrlngCANCom"], Any]
+    attr_fn: Callable[["FrlngCANCom"], dict[str, Any]] | None = None
+
+
+DIAGNOSTIC_SENSOR_TYPES: tuple[FrlngDiagnosticEntityDescription, ...] = (
+    FrlngDiagnosticEntityDescription(
+        key="sweep_duration",
+        translation_key="sweep_duration",
+        icon="mdi:timer-sync-outline",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        value_fn=lambda com: com.sweep_duration,
+        attr_fn=lambda com: {"parked_page": com.parked_page},
+    ),
+    FrlngDiagnosticEntityDescription(
+        key="display_frame_rate",
+        translation_key="display_frame_rate",
+        icon="mdi:speedometer",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfFrequency.HERTZ,
+        entity_registry_enabled_default=False,
+        value_fn=lambda com: com.sample_display_frame_rate(),
+    ),
+    FrlngDiagnosticEntityDescription(
+        key="unknown_frames",
+        translation_key="unknown_frames",
+        icon="mdi:help-network-outline",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda com: com.unknown_frames,
+        attr_fn=lambda com: {"arbitration_ids": sorted(hex(arb_id) for arb_id in com.unknown_arb_ids)},
+    ),
+    FrlngDiagnosticEntityDescription(
+        key="parse_failures",
+        translation_key="parse_failures",
+        icon="mdi:text-box-remove-outline",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda com: com.parse_failures,
+        attr_fn=lambda com: {"last_unknown_line": com.last_unknown_line},
+    ),
+    FrlngDiagnosticEntityDescription(
+        key="data_age",
+        translation_key="data_age",
+        icon="mdi:clock-alert-outline",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        entity_registry_enabled_default=False,
+        value_fn=lambda com: max(com.data_ages().values(), default=None),
+        attr_fn=lambda com: com.data_ages(),
+    ),
+    FrlngDiagnosticEntityDescription(
+        key="receive_callback_time",
+        translation_key="receive_callback_time",
+        icon="mdi:timer-outline",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MICROSECONDS,
+        entity_registry_enabled_default=False,
+        value_fn=lambda com: com.receive_callback_time,
+        attr_fn=lambda com: {
+            "frames": com.received_frames,
+            "total_time": round(com.receive_total_time, 3),
+            "max_time": com.receive_max_time,
+            "loop_callbacks": com.loop_callbacks,
+        },
+    ),
+    FrlngDiagnosticEntityDescription(
+        key="button_round_trip",
+        translation_key="button_round_trip",
+        icon="mdi:gesture-tap-button",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        value_fn=lambda com: com.button_round_trip,
+        attr_fn=lambda com: {"timeouts": com.button_echo_timeouts},
+    ),
+    FrlngDiagnosticEntityDescription(
+        key="user_presses",
+        translation_key="user_presses",
+        icon="mdi:gesture-tap",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda com: com.user_presses,
+        attr_fn=lambda com: {"last_press": com.last_user_activity},
+    ),
+    FrlngDiagnosticEntityDescription(
+        key="bus_reconnects",
+        translation_key="bus_reconnects",
+        icon="mdi:lan-connect",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda com: com.bus_reconnects,
+        attr_fn=lambda com: {"bus_alive": com.bus_alive, "last_error": com.last_bus_error},
+    ),
+    FrlngDiagnosticEntityDescription(
+        key="tx_errors",
+        translation_key="tx_errors",
+        icon="mdi:upload-network-outline",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_registry_enabled_default=False,
+        value_fn=lambda com: com.transmitter.errors + com.transmitter.timeouts,
+        attr_fn=lambda com: {
+            "sent": com.transmitter.sent,
+            "retries": com.transmitter.retries,
+            "timeouts": com.transmitter.timeouts,
+            "failed": com.transmitter.failed,
+            "max_queued": com.transmitter.max_queued,
+            "last_error": com.transmitter.last_error,
+        },
+    ),
+)
+
 class FrlngCANArbID(enum.IntEnum):
     CMD_TIME = 0x018
     CMD_DISPLAY = 0x021
     CMD_BUTTON = 0x02f
-    # 0x0c0, 0x040 and 0x022 are note used, seems to be used from main to addon board
-
-class FrlngButtonCodes(enum.IntEnum):
-    BUTTON_UP     = 0x01
-    BUTTON_LEFT   = 0x02
-    BUTTON_DOWN   = 0x04
-    BUTTON_RIGHT  = 0x08
-    BUTTON_CHANGE = 0x10
-    BUTTON_BURNUP = 0x20
-    BUTTON_INFO   = 0x40
-    BUTTON_ON_OFF = 0x80
-    BUTTON_NO_BUT = 0x00
-    REFRESH_DISPLAY = 0xff
-
-lcd_line_addr = [0x80,0xc0,0x94,0xd4]
-
-update_send_seq = [
-            FrlngButtonCodes.BUTTON_LEFT,
-            FrlngButtonCodes.BUTTON_LEFT,
-            FrlngButtonCodes.BUTTON_LEFT,
-            FrlngButtonCodes.BUTTON_LEFT, # now we are in the main menu (when we have been in a submenu or a error was there)
-            # cursor is now on "pufferladezust."
-            FrlngButtonCodes.REFRESH_DISPLAY,
-            FrlngButtonCodes.BUTTON_UP,
-            FrlngButtonCodes.BUTTON_RIGHT, # "abgastemps"
-            FrlngButtonCodes.REFRESH_DISPLAY,
-            FrlngButtonCodes.BUTTON_LEFT,
-            FrlngButtonCodes.BUTTON_UP,
-            FrlngButtonCodes.BUTTON_RIGHT, # "kesseltemps"
-            FrlngButtonCodes.REFRESH_DISPLAY,
-            FrlngButtonCodes.BUTTON_LEFT,
-            FrlngButtonCodes.BUTTON_LEFT, # back to main menu
-            FrlngButtonCodes.BUTTON_RIGHT, # "puffertemps"
-            FrlngButtonCodes.REFRESH_DISPLAY,
-            FrlngButtonCodes.BUTTON_LEFT,  # back on pufferladezust.
-            FrlngButtonCodes.BUTTON_DOWN,  # kesselrücklauf
-            FrlngButtonCodes.BUTTON_RIGHT, # Kesselrücklauf details
-            FrlngButtonCodes.REFRESH_DISPLAY,
-            FrlngButtonCodes.BUTTON_LEFT,  # kesselrücklauf
-            FrlngButtonCodes.BUTTON_DOWN,  # Heizungspumpe1
-            FrlngButtonCodes.BUTTON_DOWN,  # Heizungspumpe2
-            FrlngButtonCodes.REFRESH_DISPLAY,
-            FrlngButtonCodes.BUTTON_RIGHT, # Vorlauftemp
-            FrlngButtonCodes.REFRESH_DISPLAY,
-            FrlngButtonCodes.BUTTON_LEFT,  # Heizungspumpe2
-            FrlngButtonCodes.BUTTON_DOWN,  # Außentemperatur
-            FrlngButtonCodes.BUTTON_DOWN,  # Gebläse
-            FrlngButtonCodes.REFRESH_DISPLAY,
-            FrlngButtonCodes.BUTTON_RIGHT, # Gebläse soll/ist
-            FrlngButtonCodes.REFRESH_DISPLAY,
-            FrlngButtonCodes.BUTTON_LEFT,  # Gebläse
-            FrlngButtonCodes.BUTTON_DOWN,  # Stellmotor oben
-            FrlngButtonCodes.BUTTON_RIGHT, # Stellmotor oben details
-            FrlngButtonCodes.REFRESH_DISPLAY,
-            FrlngButtonCodes.BUTTON_LEFT,  # Stellmotor oben
-            FrlngButtonCodes.BUTTON_DOWN,  # Stellmotor unten
-            FrlngButtonCodes.BUTTON_RIGHT, # Stellmotor unten details
-            FrlngButtonCodes.REFRESH_DISPLAY,
-            FrlngButtonCodes.BUTTON_LEFT,  # Stellmotor unten
-            FrlngButtonCodes.BUTTON_DOWN,  # Sauerstoffwert
-            FrlngButtonCodes.BUTTON_RIGHT,  # Sauerstoffwert details
-            FrlngButtonCodes.REFRESH_DISPLAY,
-            FrlngButtonCodes.BUTTON_LEFT,  # Sauerstoffwert
-            FrlngButtonCodes.REFRESH_DISPLAY,
-            FrlngButtonCodes.BUTTON_LEFT,  # Pufferladezustand
-            FrlngButtonCodes.BUTTON_LEFT,  # Pufferladezustand
-            FrlngButtonCodes.BUTTON_LEFT,  # Pufferladezustand
+    # 0x0c0, 0x040 and 0x022 are not needed for the display, seems to be used from main to addon board, see passive.py
+
+# seen on the bus but only used in passive mode, not counted as unknown
+UNUSED_ARB_IDS = frozenset(PASSIVE_ARB_IDS)
+# receive filters installed in the kernel, the unused traffic does not wake up the reader
+CAN_FILTERS = [{"can_id": arb_id, "can_mask": 0x7ff, "extended": False} for arb_id in FrlngCANArbID]
+PASSIVE_CAN_FILTERS = CAN_FILTERS + [
+    {"can_id": arb_id, "can_mask": 0x7ff, "extended": False} for arb_id in PASSIVE_ARB_IDS
 ]
 
+DISPLAY_REFRESH_TIMEOUT = 0.75 # max time to wait for a redraw after a button
+DISPLAY_SETTLE_TIME = 0.1 # display is considered drawn when quiet for this time
+BUTTON_PRESS_TIME = 0.15 # max time a button is hold down
+BUTTON_RELEASE_TIME = 0.25 # max pause after a button release
+BUTTON_MIN_PRESS_TIME = 0.05 # min time a button is hold down in adaptive mode
+BUTTON_MIN_RELEASE_TIME = 0.05 # min pause after a button release in adaptive mode
+BUTTON_RTT_SMOOTHING = 0.2 # weight of a new button round-trip measurement
+REFRESH_TIMEOUT = 60 # max time a refresh request waits for its pages
+TX_ERROR_BACKOFF = 5 # pause of the button sequences after a button could not be sent
+OWN_BUTTON_ECHO_TIME = 0.1 # a button frame equal to one sent within this time is our own echo
+BUS_TIMEOUT = 10 # the bus is reopened when no frame arrived for this time, the controller sends its time every few seconds
+WATCHDOG_INTERVAL = 1 # time between two bus watchdog checks
+RECONNECT_BACKOFF_MIN = 1 # pause after the first reopen of the bus, doubled with each failed reopen
+RECONNECT_BACKOFF_MAX = 60
+PARK_POLL_INTERVAL = 0.5 # max time between two checks whether parking is over
+PASSIVE_TIMEOUT = 60 # a passive sensor is read from the display again when not decoded for this time
+LAST_READ_INTERVAL = 60 # min time between two writes of an unchanged value which only refresh last_read
+
+@dataclass(frozen=True, kw_only=True)
+class FrlngDerivedEntityDescription(SensorEntityDescription):
+    """Describes a sensor derived from the values read from the display."""
+
+    value_fn: Callable[[FrlngDerivedMetrics], Any]
+    attr_fn: Callable[[FrlngDerivedMetrics], dict[str, Any]] | None = None
+
+
+DERIVED_SENSOR_TYPES: tuple[FrlngDerivedEntityDescription, ...] = (
+    FrlngDerivedEntityDescription(
+        key=BUFFER_ENERGY,
+        translation_key=BUFFER_ENERGY,
+        device_class=SensorDeviceClass.ENERGY_STORAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        value_fn=lambda metrics: None if metrics.energy is None else round(metrics.energy, 1),
+    ),
+    FrlngDerivedEntityDescription(
+        key=BUFFER_CHARGE_RATE,
+        translation_key=BUFFER_CHARGE_RATE,
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.KILO_WATT,
+        value_fn=lambda metrics: None if metrics.charge_rate is None else round(metrics.charge_rate, 2),
+    ),
+    FrlngDerivedEntityDescription(
+        key=STATUS_DURATION,
+        translation_key=STATUS_DURATION,
+        icon="mdi:timer-outline",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MINUTES,
+        value_fn=lambda metrics: None if metrics.status is None else round(metrics.status_duration / 60, 1),
+        # hours spent in each state since the start
+        attr_fn=lambda metrics: {
+            status: round(duration / 3600, 2) for status, duration in metrics.status_durations().items()
+        },
+    ),
+)
+
+
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up entry."""
 
     canbus=config_entry.data.get(CONF_CAN_BUS)
     LOGGER.debug("Opening " + str(canbus))
-    hass.data[DOMAIN] = FrlngCANCom( hass, config_entry.data, async_add_entities)
-    def _init_can():
-        hass.data[DOMAIN].init_can()
-    await hass.async_add_executor_job(_init_can)
-
-    await hass.data[DOMAIN].can_start_update()
+    frlng_com = FrlngCANCom( hass, {**config_entry.data, **config_entry.options}, async_add_entities)
+    hass.data.setdefault(DOMAIN, {})[config_entry.entry_id] = frlng_com
+    # all sensors are there right away with their restored values, the display is read later
+    async_add_entities(
+        frlng_com.create_sensor_entities()
+        + frlng_com.create_derived_entities()
+        + [FrlngDiagnosticEntity(frlng_com, description) for description in DIAGNOSTIC_SENSOR_TYPES]
+    )
+    await hass.async_add_executor_job(frlng_com.init_can)
 
-async def async_remove_entry(hass, config_entry):
-    hass.data[DOMAIN].can_stop_update()
+    await frlng_com.can_start_update()
 
 class FrlngCANCom():
     """Handle the can communication."""
@@ -293,239 +513,1178 @@ class FrlngCANCom():
         self._hass = hass
         self._async_add_entities = async_add_entities
         self._can_net_dev = config[CONF_CAN_BUS]
-        self._dev_id =  "Froeling1" #config[CONF_DEVICE_NAME] todo get this from config flow
-        self._lcd_buf = [' ' for i in range(500)] # 0xd4+20 would be big enough
-        self._lcd_offs = None
-        self._lcd_addr = None
-        self._last_line = 0
-        self._registered_values = dict()
+        self._dev_id = config.get(CONF_DEVICE_ID, DEFAULT_DEVICE_ID)
+        if self._dev_id == DEFAULT_DEVICE_ID:
+            self._dev_name = DEFAULT_DEVICE_NAME
+        else:
+            self._dev_name = DEFAULT_DEVICE_NAME + " " + self._can_net_dev
+        self._can = None
+        self._raw_socket = config.get(CONF_RAW_SOCKET, DEFAULT_RAW_SOCKET)
+        self._button_send_task = None
+        self._watchdog_task = None
+        self._last_frame = time.monotonic()
+        self._bus_alive = True
+        self._bus_error = asyncio.Event()
+        self._last_bus_error = None
+        self._bus_reconnects = 0
+        self._tx = FrlngCANTransmitter(hass, self._can_net_dev, lambda: self._can)
+        self._lcd_buf = bytearray(b' ' * LCD_SIZE) # raw display codes, row by row
+        self._lcd_addr = None # DDRAM address of the next char
+        self._lcd_invalid_addr = 0
+        self._lcd_dirty = [True] * LCD_ROWS
+        self._lcd_last_raw = [None] * LCD_ROWS
+        self._lcd_redrawn = [False] * LCD_ROWS # lines drawn up to the last column since the last button
+        self._lcd_row_complete = [False] * LCD_ROWS # last column written after the first one
+        self._last_display_frame = None
+        self._display_echo_time = None # start of the first redraw after the last button
+        self._display_complete = asyncio.Event()
+        self._display_echo = asyncio.Event()
+        self._decode_in_thread = config.get(CONF_DECODE_IN_THREAD, DEFAULT_DECODE_IN_THREAD)
+        self._refresh_requested = 0 # buttons pressed, the receive thread resets its redraw state for each
+        self._refresh_seen = 0
+        self._echo_posted = None
+        self._complete_posted = None
+        self._pending_buttons = [] # button frames received in the receive thread
+        self._loop_callbacks = 0
+        self._adaptive_pacing = config.get(CONF_ADAPTIVE_PACING, DEFAULT_ADAPTIVE_PACING)
+        self._button_press_time = None
+        self._button_rtt_last = None
+        self._button_rtt_avg = None
+        self._button_echo_timeouts = 0
+        self._registered_values = dict() # sensor key -> entity, routes the parsed values
+        self._values = dict() # sensor key -> last value read from the display
+        self._sensor_filters = config.get(CONF_SENSOR_FILTERS, {})
+        self._last_refresh = dict() # sensor key -> time it was last read from the display
+        self._history = dict() # sensor key -> ring buffer of the numeric readings
+        self._derived = FrlngDerivedMetrics(
+            config.get(CONF_BUFFER_VOLUME, DEFAULT_BUFFER_VOLUME),
+            config.get(CONF_BUFFER_MIN_TEMP, DEFAULT_BUFFER_MIN_TEMP),
+        )
+        self._derived_entities = dict() # derived metric key -> entity
+        self._passive = FrlngPassiveDecoder() if config.get(CONF_PASSIVE, DEFAULT_PASSIVE) else None
+        self._passive_sensors = frozenset() # sensors decoded from the frames lately, not scraped
+        self._pending_passive = [] # decoded readings not applied yet
+        self._lcd_last_key = [None] * LCD_ROWS # sensor key shown in each line
+        self._parse_failures = 0
+        self._last_unknown_line = None
         self._pause_buttonsseq = False
+        self._user_idle = config.get(CONF_USER_IDLE, DEFAULT_USER_IDLE)
+        self._user_presses = 0
+        self._last_user_press = None # monotonic time of the last user button frame
+        self._last_user_activity = None # same as datetime
+        self._own_buttons = deque(maxlen=8) # (button, time) sent recently, told apart from user presses
+        self._scheduler = FrlngPollScheduler()
+        self._park_page = None # page requested by the park service
+        self._park_duration = None
+        self._parked_page = None # page the display is parked on, every redraw is parsed
+        self._park_redraws = 0
+        self._sweep_duration = None
+        self._refresh_waiters = []
+        self._display_frames = 0
+        self._frame_rate_sample = (time.monotonic(), 0)
+        self._unknown_frames = 0
+        self._unknown_arb_ids = set()
+        self._received_frames = 0
+        self._receive_time = 0.0
+        self._receive_max_time = 0.0
+        self._profiler = None
+        self._last_profile = None
+        self._capture = None
+        if config.get(CONF_CAPTURE, DEFAULT_CAPTURE):
+            self._capture = FrlngCaptureWriter(hass.config.path("froeling_" + self._can_net_dev + ".cap"))
 
     def init_can(self):
         """ Init the CAN bus """
+        can_filters = CAN_FILTERS if self._passive is None else PASSIVE_CAN_FILTERS
         try:
-            if self._can_net_dev == "unittesting":
-                self._can = can.Bus('test_can', interface='virtual')
-            self._can = can.Bus(interface='socketcan', channel=self._can_net_dev, receive_own_messages=False)
-            self._can_listeners: List[MessageRecipient] = [self.can_msg_receive,]
+            if self._can_net_dev.startswith("unittesting"):
+                # "unittesting2" is the virtual channel "test_can2"
+                self._can = can.Bus('test_can' + self._can_net_dev[len("unittesting"):], interface='virtual',
+                                    can_filters=can_filters)
+            elif self._raw_socket:
+                self._can = FrlngRawCANSocket(self._can_net_dev, [can_filter["can_id"] for can_filter in can_filters])
+            else:
+                self._can = can.Bus(interface='socketcan', channel=self._can_net_dev, receive_own_messages=False,
+                                    can_filters=can_filters)
         except Exception as error:
+            self._can = None
+            self._last_bus_error = str(error)
             LOGGER.error("Failed to init: " + str(self._can_net_dev) + " Error:" + str(error))
+            return
+        if self._capture is not None and not self._capture.opened:
+            self._capture.open()
 
     async def send_button(self,button):
+        """Press and release a button, returns False when it could not be sent"""
         msg = can.Message(arbitration_id=FrlngCANArbID.CMD_BUTTON,is_extended_id=False,data=[button])
-        self._can.send(msg)
-        await asyncio.sleep(0.15)
-        msg.data[0] = FrlngButtonCodes.BUTTON_NO_BUT
-        self._can.send(msg)
-        await asyncio.sleep(0.25)
+        self.start_display_refresh()
+        self._own_buttons.append((button, time.monotonic()))
+        if not await self._tx.async_send(msg):
+            return False
+        # the round-trip starts when the frame is on the bus, not while it waits in the TX queue
+        self._button_press_time = time.monotonic()
+        if self._adaptive_pacing:
+            await self.wait_button_echo()
+        else:
+            await asyncio.sleep(BUTTON_PRESS_TIME)
+        msg = can.Message(arbitration_id=FrlngCANArbID.CMD_BUTTON,is_extended_id=False,data=[FrlngButtonCodes.BUTTON_NO_BUT])
+        self._own_buttons.append((FrlngButtonCodes.BUTTON_NO_BUT, time.monotonic()))
+        if not await self._tx.async_send(msg):
+            return False
+        if self._adaptive_pacing and self._button_rtt_avg is not None:
+            # the controller answers within its button polling cycle, give it that long to see the release
+            await asyncio.sleep(min(max(2 * self._button_rtt_avg, BUTTON_MIN_RELEASE_TIME), BUTTON_RELEASE_TIME))
+        else:
+            await asyncio.sleep(BUTTON_RELEASE_TIME)
+        return True
+
+    async def wait_button_echo(self):
+        """Wait for the redraw answering the pressed button, the button is hold down at least BUTTON_MIN_PRESS_TIME"""
+        try:
+            await asyncio.wait_for(self._display_echo.wait(), BUTTON_PRESS_TIME)
+        except asyncio.TimeoutError:
+            self._button_echo_timeouts += 1
+            LOGGER.debug("No display answer to button within " + str(BUTTON_PRESS_TIME) + "s")
+            return
+        rtt = self._display_echo_time - self._button_press_time
+        if rtt < 0:
+            # the redraw started while the button was queued, it can not be the answer
+            LOGGER.debug("Redraw started before the button was sent, holding it " + str(BUTTON_PRESS_TIME) + "s")
+            hold = BUTTON_PRESS_TIME
+        else:
+            self._button_rtt_last = rtt
+            if self._button_rtt_avg is None:
+                self._button_rtt_avg = rtt
+            else:
+                self._button_rtt_avg += BUTTON_RTT_SMOOTHING * (rtt - self._button_rtt_avg)
+            LOGGER.debug("Button round-trip: " + str(round(rtt * 1000)) + "ms")
+            hold = BUTTON_MIN_PRESS_TIME
+        remaining = self._button_press_time + hold - time.monotonic()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+    async def send_buttons(self, buttons):
+        """Send a button sequence, returns False when it was interrupted"""
+        for button in buttons:
+            if self._send_running == False:
+                return False
+            if self._pause_buttonsseq == True:
+                LOGGER.info("User pressed button, pausing refresh until the display is idle for " +
+                            str(self._user_idle) + "s")
+                await self.wait_user_idle()
+                self.detect_menu_page()
+                return False
+            if not await self.send_button(button):
+                # a button may be pressed, the display is somewhere
+                LOGGER.warning("Could not send button, pausing refresh for " + str(TX_ERROR_BACKOFF) + "s")
+                self._scheduler.invalidate_menu()
+                await asyncio.sleep(TX_ERROR_BACKOFF)
+                return False
+        return True
 
     async def send_loop(self):
         """ The send loop thread """
         LOGGER.debug("Entering CAN send loop")
-        min_time = timedelta(seconds=60)
-        last_update_time = utcnow()-min_time # set update time to directly start updating the display
+        sweep_start = None
+        sweep_pages = []
         while self._send_running:
-            now = utcnow()
-            if now - last_update_time > min_time:
-                for curr_send_seq in update_send_seq:
-                    if self._send_running == False:
-                        return
-                    if curr_send_seq == FrlngButtonCodes.REFRESH_DISPLAY:
-                        await asyncio.sleep(0.75)
-                        self.parse_lcd()
-                    else:
-                        if self._pause_buttonsseq == True:
-                            # block updating for 10minutes
-                            LOGGER.info("User pressed button, stopping refresh for 10 minutes")
-                            self._pause_buttonsseq = False
-                            await asyncio.sleep(10*60)                           
-                            # start the sequence from beginnign
-                            break
-                        await self.send_button(curr_send_seq)
-                last_update_time = now
-            else:
+            if self._passive is not None:
+                self._passive_sensors = frozenset(self._passive.sensors(time.monotonic(), PASSIVE_TIMEOUT))
+                self._scheduler.set_passive_sensors(self._passive_sensors)
+            self._scheduler.set_burning(is_burning(self._values.get("kessel_status")))
+            if self._park_page is not None:
+                await self.park()
+                sweep_start = None
+                continue
+            visit = self._scheduler.next_visit(time.monotonic())
+            if visit is None:
+                if sweep_start is not None:
+                    # all due pages are read, wait in the main menu
+                    if not await self.send_buttons(self._scheduler.path_home()):
+                        sweep_start = None
+                        continue
+                    self._sweep_duration = time.monotonic() - sweep_start
+                    LOGGER.debug("Refreshed " + ", ".join(sweep_pages) +
+                                 " in " + str(round(self._sweep_duration, 2)) + "s" +
+                                 ", avg button round-trip: " + str(self.button_round_trip) + "ms" +
+                                 ", timeouts: " + str(self._button_echo_timeouts))
+                    sweep_start = None
                 await asyncio.sleep(0.5) # idle time
                 self.parse_lcd() # always update default values
+                continue
+            buttons, page = visit
+            if sweep_start is None:
+                sweep_start = time.monotonic()
+                sweep_pages = []
+            if not await self.send_buttons(buttons):
+                sweep_start = None
+                continue
+            await self.wait_display_refresh()
+            self.parse_lcd()
+            self.page_read(page)
+            sweep_pages.append(page.name)
         LOGGER.debug("Exit CAN send taks")
 
+    async def park(self):
+        """Go to the requested page and parse each redraw of the controller until parking is over
+
+        No button is sent while parked, the redraws come at the controller's own rate.
+        """
+        page = self._park_page
+        if not await self.send_buttons(self._scheduler.path_to(page, time.monotonic())):
+            if self._park_page is page:
+                self._park_page = None
+            return
+        await self.wait_display_refresh()
+        self.parse_lcd()
+        self.page_read(page)
+        self._parked_page = page
+        LOGGER.info("Parked on page " + page.name + " for " + str(self._park_duration) + "s")
+        park_until = time.monotonic() + self._park_duration
+        while (remaining := park_until - time.monotonic()) > 0:
+            if not self._send_running or self._park_page is not page or self._pause_buttonsseq:
+                break
+            self.start_display_refresh()
+            try:
+                await asyncio.wait_for(self._display_echo.wait(), min(remaining, PARK_POLL_INTERVAL))
+            except asyncio.TimeoutError:
+                continue
+            await self.wait_display_refresh()
+            self.parse_lcd()
+            self.page_read(page)
+            self._park_redraws += 1
+        self._parked_page = None
+        if self._park_page is page:
+            self._park_page = None
+        LOGGER.info("Parking on page " + page.name + " is over after " + str(self._park_redraws) + " redraws")
+
+    @callback
+    def async_park(self, page, duration):
+        """Park the display on page for duration s from reaching it, replaces an earlier park request"""
+        self._park_page = page
+        self._park_duration = duration
+        self._park_redraws = 0
+
+    @callback
+    def async_unpark(self):
+        """End parking, the button sequence continues from the parked page"""
+        self._park_page = None
+
+    @property
+    def parked_page(self):
+        """Name of the page the display is parked on"""
+        return None if self._parked_page is None else self._parked_page.name
+
+    @property
+    def user_active(self):
+        """True while polling is paused for a user at the display"""
+        return self._pause_buttonsseq and time.monotonic() - self._last_user_press < self._user_idle
+
+    async def wait_user_idle(self):
+        """Wait until the user did not press a button for the idle time"""
+        while (remaining := self._last_user_press + self._user_idle - time.monotonic()) > 0:
+            await asyncio.sleep(remaining)
+        self._pause_buttonsseq = False
+
+    def detect_menu_page(self):
+        """Find the page the user left the display on, the menu is resynced if it is unknown"""
+        self.parse_lcd()
+        page = page_from_sensors(key for key in self._lcd_last_key if key is not None)
+        if page is None:
+            LOGGER.debug("Display page unknown after user input, resyncing the menu")
+            self._scheduler.invalidate_menu()
+            return
+        LOGGER.debug("Display left on page " + page.name + ", continuing from there")
+        self._scheduler.page_detected(page, time.monotonic())
+        self.page_read(page)
+
+    def page_read(self, page):
+        """The display of a page was parsed"""
+        self._scheduler.page_visited(page, time.monotonic())
+        for pending, future in self._refresh_waiters:
+            pending.discard(page.name)
+            if not pending and not future.done():
+                future.set_result(None)
+        self._refresh_waiters = [waiter for waiter in self._refresh_waiters if not waiter[1].done()]
+
+    async def async_refresh(self, sensors):
+        """Read the pages showing the sensors next and return their values"""
+        # the passive sensors are up to date
+        pages = pages_for_sensors([sensor for sensor in sensors if sensor not in self._passive_sensors])
+        if not pages:
+            return {sensor: self.get_value(sensor) for sensor in sensors}
+        if self.user_active:
+            # the request would only wait for the user and time out
+            raise HomeAssistantError("Display in use, polling paused until no button was pressed for " +
+                                     str(self._user_idle) + "s")
+        future = self._hass.loop.create_future()
+        self._refresh_waiters.append(({page.name for page in pages}, future))
+        self._scheduler.request_pages(pages)
+        try:
+            await asyncio.wait_for(future, REFRESH_TIMEOUT)
+        finally:
+            self._refresh_waiters = [waiter for waiter in self._refresh_waiters if not waiter[1].done()]
+        return {sensor: self.get_value(sensor) for sensor in sensors}
+
+    def sensor_filter(self, entity_description):
+        """Return deadband and min write interval in s of a sensor, the options override the description"""
+        options = self._sensor_filters.get(entity_description.key, {})
+        return (
+            options.get(CONF_DEADBAND, entity_description.deadband),
+            options.get(CONF_MIN_INTERVAL, entity_description.min_interval.total_seconds()),
+        )
+
+    def create_sensor_entities(self):
+        """Create the entities of all sensors, they are updated when their display line is parsed"""
+        for entity_description in SENSOR_TYPES:
+            self._registered_values[entity_description.key] = FrlngEntity(
+                self._dev_id, entity_description, entity_description.key, entity_description.display_unit,
+                None, self._dev_name, *self.sensor_filter(entity_description)
+            )
+        return list(self._registered_values.values())
+
+    def create_derived_entities(self):
+        """Create the entities of the derived metrics, they are updated with the values they depend on"""
+        for entity_description in DERIVED_SENSOR_TYPES:
+            self._derived_entities[entity_description.key] = FrlngDerivedEntity(
+                self, self._derived, entity_description
+            )
+        return list(self._derived_entities.values())
+
+    @property
+    def derived(self):
+        """Metrics derived from the parsed values"""
+        return self._derived
+
+    def get_value(self, name):
+        """Return the last value of a sensor read from the display"""
+        return self._values.get(name)
+
+    def record_reading(self, name, value):
+        """Add a numeric reading to the history of the sensor"""
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return
+        history = self._history.get(name)
+        if history is None:
+            history = self._history[name] = FrlngHistory()
+        history.append(time.time(), value)
+
+    def get_history(self, name, start=None, end=None, points=None):
+        """Return the readings of a sensor from start to end as timestamps and values
+
+        With points the readings are downsampled to at most that many buckets.
+        """
+        history = self._history.get(name)
+        if history is None:
+            return {"timestamps": [], "values": []}
+        times, values = history.window(start, end)
+        if points is None:
+            return {"timestamps": list(times), "values": list(values)}
+        return downsample(times, values, points)
+
+    async def async_profile(self, duration):
+        """Profile the receive, parse and send paths for duration s, returns the summary
+
+        The pstats dump and a text summary are written to the config directory.
+        Raises RuntimeError when profiling is already running and ValueError when
+        another profiler is active.
+        """
+        if self._profiler is not None:
+            raise RuntimeError("Profiling of " + self._can_net_dev + " is already running")
+        profiler = FrlngProfiler(self)
+        profiler.start()
+        self._profiler = profiler
+        LOGGER.info("Profiling " + self._can_net_dev + " for " + str(duration) + "s")
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            profiler.stop()
+            self._profiler = None
+        path_prefix = self._hass.config.path(
+            "froeling_profile_" + self._can_net_dev + "_" + dt_util.now().strftime("%Y%m%d_%H%M%S")
+        )
+        files = await self._hass.async_add_executor_job(profiler.write, path_prefix)
+        self._last_profile = {**profiler.summary(), "files": files}
+        return self._last_profile
+
+    def passive_statistics(self):
+        """Statistics of the main board to addon board frames, None without passive mode"""
+        if self._passive is None:
+            return None
+        return {"ranking": self._passive.ranking(), "sensors": sorted(self._passive_sensors)}
+
+    @property
+    def last_profile(self):
+        """Summary of the last profiling run"""
+        return self._last_profile
+
+    def lcd_snapshot(self):
+        """Raw display codes and decoded text of each line"""
+        return {
+            "raw": [self._lcd_buf[row * LCD_COLUMNS:(row + 1) * LCD_COLUMNS].hex() for row in range(LCD_ROWS)],
+            "lines": [lcd_decode(self._lcd_buf[row * LCD_COLUMNS:(row + 1) * LCD_COLUMNS]) for row in range(LCD_ROWS)],
+        }
+
+    @property
+    def button_round_trip(self):
+        """Averaged time in ms from a button press to the first display answer"""
+        if self._button_rtt_avg is None:
+            return None
+        return round(self._button_rtt_avg * 1000)
+
+    @property
+    def can_bus(self):
+        """Name of the CAN interface"""
+        return self._can_net_dev
+
+    @property
+    def user_presses(self):
+        """Number of button frames sent by a user at the boiler"""
+        return self._user_presses
+
+    @property
+    def last_user_activity(self):
+        """Time of the last button frame sent by a user"""
+        return self._last_user_activity
+
+    @property
+    def bus_alive(self):
+        """False while no frames arrive from the bus"""
+        return self._bus_alive
+
+    @property
+    def bus_reconnects(self):
+        """Number of times the bus was reopened"""
+        return self._bus_reconnects
+
+    @property
+    def last_bus_error(self):
+        """Last error opening or reading the bus"""
+        return self._last_bus_error
+
+    @property
+    def transmitter(self):
+        """The transmit queue"""
+        return self._tx
+
+    @property
+    def button_echo_timeouts(self):
+        """Number of buttons without display answer"""
+        return self._button_echo_timeouts
+
+    @property
+    def sweep_duration(self):
+        """Time in s the last sweep over all due pages took"""
+        if self._sweep_duration is None:
+            return None
+        return round(self._sweep_duration, 2)
+
+    def sample_display_frame_rate(self):
+        """Display frames per second since the last call"""
+        now = time.monotonic()
+        last_time, last_frames = self._frame_rate_sample
+        self._frame_rate_sample = (now, self._display_frames)
+        if now <= last_time:
+            return None
+        return round((self._display_frames - last_frames) / (now - last_time), 1)
+
+    @property
+    def unknown_frames(self):
+        """Number of received frames with an unknown arbitration id"""
+        return self._unknown_frames
+
+    @property
+    def unknown_arb_ids(self):
+        """Unknown arbitration ids seen on the bus"""
+        return self._unknown_arb_ids
+
+    @property
+    def parse_failures(self):
+        """Number of display lines which did not match any template"""
+        return self._parse_failures
+
+    @property
+    def last_unknown_line(self):
+        """Last display line which did not match any template"""
+        return self._last_unknown_line
+
+    def data_ages(self):
+        """Time in s since each sensor was last read from the display"""
+        now = time.monotonic()
+        return {key: round(now - refreshed, 1) for key, refreshed in self._last_refresh.items()}
+
+    @property
+    def received_frames(self):
+        """Number of received frames"""
+        return self._received_frames
+
+    @property
+    def receive_total_time(self):
+        """Time in s spent in can_frame_receive"""
+        return self._receive_time
+
+    @property
+    def receive_max_time(self):
+        """Longest can_frame_receive call in µs"""
+        return round(self._receive_max_time * 1e6, 1)
+
+    @property
+    def loop_callbacks(self):
+        """Number of receive callbacks run in the event loop"""
+        return self._loop_callbacks
+
+    @property
+    def receive_callback_time(self):
+        """Average time in µs of a can_frame_receive call"""
+        if not self._received_frames:
+            return None
+        return round(self._receive_time / self._received_frames * 1e6, 1)
+
+    def start_display_refresh(self):
+        """Forget the redraw state, the display will be redrawn after a button"""
+        self._display_complete.clear()
+        self._display_echo.clear()
+        if self._decode_in_thread:
+            # the receive thread resets the redraw state with its next batch
+            self._refresh_requested += 1
+            return
+        self.reset_redraw_state()
+
+    def reset_redraw_state(self):
+        """Forget which lines were drawn"""
+        self._lcd_redrawn = [False] * LCD_ROWS
+        self._last_display_frame = None
+        self._display_echo_time = None
+
+    async def wait_display_refresh(self):
+        """Wait until all lcd lines are redrawn or the display has settled"""
+        deadline = time.monotonic() + DISPLAY_REFRESH_TIMEOUT
+        while not self._display_complete.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                LOGGER.debug("Timeout waiting for display refresh")
+                return
+            try:
+                await asyncio.wait_for(self._display_complete.wait(), min(remaining, DISPLAY_SETTLE_TIME))
+            except asyncio.TimeoutError:
+                # only a quiet bus after some display frames means the display is drawn,
+                # before the first frame the controller may still be busy with the button
+                if (self._display_echo.is_set() and
+                        time.monotonic() - self._last_display_frame >= DISPLAY_SETTLE_TIME):
+                    return
+
     async def can_start_update(self):
         """Start receiving"""
         LOGGER.debug("Starting CAN bus")
-        try:
-            self._notifier = can.Notifier(self._can, self._can_listeners, loop=self._hass.loop)
-        except Exception as error:
-            LOGGER.error("Failed to init can bus notifier. Error:" + str(error) + str(type(self._hass)))
-            return
+        if self._can is None:
+            LOGGER.error("CAN bus " + str(self._can_net_dev) + " is not open, retrying")
+        else:
+            self.add_bus_to_reader()
+        self._last_frame = time.monotonic()
         self._send_running = True
         self._button_send_task = self._hass.async_create_background_task(self.send_loop(),"send_button_sequence_task")
+        self._watchdog_task = self._hass.async_create_background_task(
+            self.watchdog_loop(), "froeling_watchdog_" + self._can_net_dev
+        )
         LOGGER.debug("Started CAN bus background task")
 
+    def add_bus_to_reader(self):
+        """Hand the open bus to the receive thread"""
+        if self._decode_in_thread:
+            get_reader(self._hass).add_bus(self._can, self.can_batch_decode, self.can_receive_error, in_thread=True)
+        elif isinstance(self._can, FrlngRawCANSocket):
+            get_reader(self._hass).add_bus(self._can, self.can_frames_receive, self.can_receive_error)
+        else:
+            get_reader(self._hass).add_bus(self._can, self.can_msgs_receive, self.can_receive_error)
+
+    async def async_close_bus(self):
+        """Stop receiving from the bus and close it"""
+        bus, self._can = self._can, None
+        if bus is None:
+            return
+        await self._hass.async_add_executor_job(get_reader(self._hass).remove_bus, bus)
+        try:
+            await self._hass.async_add_executor_job(bus.shutdown)
+        except Exception as error:  # pylint: disable=broad-except
+            LOGGER.debug("Failed to close " + self._can_net_dev + " Error:" + str(error))
+
+    async def watchdog_loop(self):
+        """Reopen the bus when no frames arrive or receiving failed"""
+        backoff = RECONNECT_BACKOFF_MIN
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._bus_error.wait(), WATCHDOG_INTERVAL)
+            if (not self._bus_error.is_set() and self._can is not None and
+                    time.monotonic() - self._last_frame < BUS_TIMEOUT):
+                if self._bus_alive:
+                    backoff = RECONNECT_BACKOFF_MIN
+                continue
+            self.set_bus_alive(False)
+            LOGGER.warning("No frames from " + self._can_net_dev + ", reopening the bus")
+            self._bus_error.clear()
+            await self.async_close_bus()
+            self._bus_reconnects += 1
+            await self._hass.async_add_executor_job(self.init_can)
+            # the reopened bus gets BUS_TIMEOUT to deliver frames
+            self._last_frame = time.monotonic()
+            if self._can is not None:
+                self.add_bus_to_reader()
+                # the menu may have changed while the bus was down
+                self._scheduler.invalidate_menu()
+            await asyncio.sleep(backoff)
+            backoff = min(2 * backoff, RECONNECT_BACKOFF_MAX)
+
+    @callback
+    def can_receive_error(self, error):
+        """Callback of the receive thread after it stopped reading the broken bus"""
+        self._last_bus_error = str(error)
+        self._bus_error.set()
+
+    @callback
+    def set_bus_alive(self, alive):
+        """Mark the sensors available or unavailable"""
+        if alive == self._bus_alive:
+            return
+        self._bus_alive = alive
+        if alive:
+            LOGGER.info("Receiving from " + self._can_net_dev + " again")
+        for entity in self._registered_values.values():
+            entity.set_available(alive)
+
     async def can_stop_update(self):
         """Stop receiving"""
         LOGGER.debug("Stopping CAN bus")
-        self._notifier.stop()
-        await asyncio.sleep(0.1)
         self._send_running = False
+        if self._watchdog_task is not None:
+            self._watchdog_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._watchdog_task
+            self._watchdog_task = None
+        if self._button_send_task is not None:
+            # do not send to a closed bus, e.g. while paused after a user button
+            self._button_send_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._button_send_task
+            self._button_send_task = None
+        await self._tx.async_stop()
+        await self.async_close_bus()
+        if self._capture is not None:
+            await self._hass.async_add_executor_job(self._capture.close)
+
+    def can_msgs_receive(self, msgs: list[can.Message]) -> None:
+        """Callback on a batch of new CAN messages"""
+        self.bus_frames_received()
+        for msg in msgs:
+            self.can_frame_receive(msg.arbitration_id, msg.dlc, msg.data, msg.timestamp)
+        self.notify_display()
+        self.apply_passive_readings()
+
+    def can_frames_receive(self, frames: bytes) -> None:
+        """Callback on a batch of packed can_frame structs from the raw socket"""
+        self.bus_frames_received()
+        timestamp = time.time()
+        for arb_id, dlc, data in iter_can_frames(frames):
+            self.can_frame_receive(arb_id, dlc, data, timestamp)
+        self.notify_display()
+        self.apply_passive_readings()
 
     def can_msg_receive(self, msg: can.Message) -> None:
         """Callback on new CAN message"""
-        if msg.arbitration_id == FrlngCANArbID.CMD_DISPLAY:
-            self.handle_display_data(msg)
-        elif msg.arbitration_id == FrlngCANArbID.CMD_BUTTON:
-            self.handle_button_data(msg)
-        elif msg.arbitration_id == FrlngCANArbID.CMD_TIME:
-            self.handle_time_data(msg)           
-
-    def handle_display_data(self, msg):
+        self.bus_frames_received()
+        self.can_frame_receive(msg.arbitration_id, msg.dlc, msg.data, msg.timestamp)
+        self.notify_display()
+        self.apply_passive_readings()
+
+    def bus_frames_received(self):
+        """Feed the bus watchdog, every frame including the time counts"""
+        self._loop_callbacks += 1
+        self._last_frame = time.monotonic()
+        if not self._bus_alive:
+            self.set_bus_alive(True)
+
+    def notify_display(self):
+        """Wake up the button sequence waiting for the display"""
+        if self._display_echo_time is not None and not self._display_echo.is_set():
+            self._display_echo.set()
+        if all(self._lcd_redrawn) and not self._display_complete.is_set():
+            self._display_complete.set()
+
+    def can_batch_decode(self, batch: list[can.Message] | bytes) -> None:
+        """Receive thread callback of the decode_in_thread mode
+
+        The lines are assembled and parsed right here, the event loop is only
+        called with the readings and display events of the whole batch.
+        """
+        if self._refresh_seen != self._refresh_requested:
+            # a button was pressed since the last batch
+            self._refresh_seen = self._refresh_requested
+            self.reset_redraw_state()
+        self._last_frame = time.monotonic()
+        if isinstance(batch, bytes):
+            timestamp = time.time()
+            for arb_id, dlc, data in iter_can_frames(batch):
+                self.can_frame_receive(arb_id, dlc, data, timestamp)
+        else:
+            for msg in batch:
+                self.can_frame_receive(msg.arbitration_id, msg.dlc, msg.data, msg.timestamp)
+        readings, redrawn = self.parse_lcd_lines(
+            [row for row in range(LCD_ROWS) if self._lcd_row_complete[row]]
+        )
+        if self._pending_passive:
+            readings += self._pending_passive
+            self._pending_passive = []
+        generation = self._refresh_seen
+        echo = self._display_echo_time is not None and self._echo_posted != generation
+        if echo:
+            self._echo_posted = generation
+        complete = all(self._lcd_redrawn) and self._complete_posted != generation
+        if complete:
+            self._complete_posted = generation
+        buttons, self._pending_buttons = self._pending_buttons, []
+        if readings or redrawn or buttons or echo or complete or not self._bus_alive:
+            self._hass.loop.call_soon_threadsafe(
+                self.apply_decoded, generation, echo, complete, readings, redrawn, buttons
+            )
+
+    @callback
+    def apply_decoded(self, generation, echo, complete, readings, redrawn, buttons):
+        """Event loop part of the decode_in_thread mode, applies the results of one batch"""
+        self._loop_callbacks += 1
+        if not self._bus_alive:
+            self.set_bus_alive(True)
+        for dlc, data in buttons:
+            self.button_received(dlc, data)
+        if generation == self._refresh_requested:
+            # not from before the last button
+            if echo:
+                self._display_echo.set()
+            if complete:
+                self._display_complete.set()
+        self.apply_readings(readings, redrawn)
+
+    def can_frame_receive(self, arb_id, dlc, data, timestamp=None) -> None:
+        """Handle a CAN frame, data may be longer than dlc"""
+        start = time.perf_counter()
+        if self._capture is not None:
+            self._capture.write(time.time() if timestamp is None else timestamp, arb_id, dlc, data[:dlc])
+        if arb_id == FrlngCANArbID.CMD_DISPLAY:
+            self.handle_display_data(dlc, data)
+        elif arb_id == FrlngCANArbID.CMD_BUTTON:
+            self.handle_button_data(dlc, data)
+        elif arb_id == FrlngCANArbID.CMD_TIME:
+            self.handle_time_data(dlc, data)
+        elif arb_id in UNUSED_ARB_IDS:
+            if self._passive is not None:
+                self.handle_passive_data(arb_id, dlc, data)
+        else:
+            self._unknown_frames += 1
+            self._unknown_arb_ids.add(arb_id)
+        elapsed = time.perf_counter() - start
+        self._received_frames += 1
+        self._receive_time += elapsed
+        if elapsed > self._receive_max_time:
+            self._receive_max_time = elapsed
+
+    def handle_passive_data(self, arb_id, dlc, data):
+        """Callback for main board to addon board messages in passive mode"""
+        for name, value in self._passive.frame(arb_id, bytes(data[:dlc]), time.monotonic()):
+            self._pending_passive.append((name, value, SENSORS[name].display_unit))
+
+    @callback
+    def apply_passive_readings(self):
+        """Apply the values decoded from the frames of the last batch"""
+        if self._pending_passive:
+            readings, self._pending_passive = self._pending_passive, []
+            self.apply_readings(readings, [])
+
+    def handle_display_data(self, dlc, data):
         """Callback for display messages"""
-        if msg.dlc == 1:
+        now = time.monotonic()
+        self._last_display_frame = now
+        self._display_frames += 1
+        if dlc == 1:
             # 1 byte message: display char
-            if self._lcd_addr == None or self._lcd_offs == None:
-                LOGGER.debug("LCD offset or address not set")
+            if self._lcd_addr is None:
+                LOGGER.debug("LCD address not set")
                 return
-            try:
-                self._lcd_buf[self._lcd_addr + self._lcd_offs] = self.conv_lcd_chars(msg.data[0])
-            except:
-                LOGGER.error("Could not write to resulting display address:" + str(self._lcd_addr) + " Offset:" + str(self._lcd_offs))
-                assert False
-            self._lcd_offs += 1
-        elif msg.dlc == 2:
+            index = LCD_DDRAM_INDEX[self._lcd_addr]
+            # like on the display controller the address runs on after each char
+            self._lcd_addr = (self._lcd_addr + 1) & 0x7f
+            if index < 0:
+                # char is written to a part of the DDRAM which is not shown
+                return
+            self._lcd_buf[index] = data[0]
+            line, column = divmod(index, LCD_COLUMNS)
+            self._lcd_dirty[line] = True
+            if column == LCD_COLUMNS - 1:
+                self._lcd_redrawn[line] = True
+                self._lcd_row_complete[line] = True
+            elif column == 0:
+                self._lcd_row_complete[line] = False
+        elif dlc == 2:
             # 2 byte message: display address
-            try:
-                self._lcd_offs = 0
-                self._lcd_addr = int.from_bytes(bytearray([msg.data[0],msg.data[1]]))             
-            except Exception as error:
-                LOGGER.warning("Fail to set display address: " +  str(error))
-                self._lcd_addr = 0x80
+            addr = (data[0] << 8) | data[1]
+            if (addr & ~0x7f) != LCD_CMD_SET_DDRAM or LCD_DDRAM_INDEX[addr & 0x7f] < 0:
+                LOGGER.debug("Display address out of range: " + hex(addr))
+                self._lcd_invalid_addr += 1
+                self._lcd_addr = None
+                return
+            self._lcd_addr = addr & 0x7f
+            if self._display_echo_time is None and LCD_DDRAM_INDEX[self._lcd_addr] == 0:
+                # a redraw starts at the first row, a frame of a redraw in flight is no answer to a button
+                self._display_echo_time = now
         else:
-            LOGGER.warning("Wrong display message length: " + str(msg.dlc))
+            LOGGER.warning("Wrong display message length: " + str(dlc))
 
     def parse_lcd(self):
         """"Try to find name, value unit pairs in current display line"""
-        for cur_line in range(4):
-            try:
-                # get the current lcd line and create string of it
-                cur_lcd_line = ''.join(self._lcd_buf[lcd_line_addr[cur_line]:lcd_line_addr[cur_line]+19])
-            except:
-                LOGGER.error("Fail to join lcd line: " + str(error) + " Current-LCDline:" + str(cur_line) +  " Address: " + str(self._lcd_addr))
+        if self._decode_in_thread:
+            # the receive thread parses each line when it is drawn
+            return
+        self.apply_readings(*self.parse_lcd_lines(range(LCD_ROWS)))
+
+    @callback
+    def parse_replayed(self):
+        """Parse and apply the frames of a replayed capture, in either decode mode"""
+        readings, redrawn = self.parse_lcd_lines(range(LCD_ROWS))
+        if self._pending_passive:
+            readings += self._pending_passive
+            self._pending_passive = []
+        buttons, self._pending_buttons = self._pending_buttons, []
+        for dlc, data in buttons:
+            self.button_received(dlc, data)
+        self.apply_readings(readings, redrawn)
+
+    def parse_lcd_lines(self, rows):
+        """Parse the dirty lines of rows
+
+        Returns (name, value, unit) of the changed lines and the names shown in
+        lines which were rewritten with the same content.
+        """
+        readings = []
+        redrawn = []
+        for cur_line in rows:
+            if not self._lcd_dirty[cur_line]:
                 continue
+            self._lcd_dirty[cur_line] = False
+            start = cur_line * LCD_COLUMNS
+            raw_line = bytes(self._lcd_buf[start:start + LCD_PARSE_COLUMNS])
+            if raw_line == self._lcd_last_raw[cur_line]:
+                # line was rewritten with the same content, nothing to update
+                if self._lcd_last_key[cur_line] is not None:
+                    redrawn.append(self._lcd_last_key[cur_line])
+                continue
+            self._lcd_last_raw[cur_line] = raw_line
+            self._lcd_last_key[cur_line] = None
+            cur_lcd_line = lcd_decode(raw_line)
+            parsed = parse_lcd_line(cur_lcd_line)
+            if parsed is None:
+                # line does not match any template
+                self._parse_failures += 1
+                self._last_unknown_line = cur_lcd_line
+                continue
+            if not parsed:
+                continue
+            name, value, unit = parsed
+            self._lcd_last_key[cur_line] = name
+            if name in self._passive_sensors:
+                # read from the frames, the display may show it rounded, parsed again once it is not
+                self._lcd_last_raw[cur_line] = None
+                continue
+            LOGGER.debug("Name: " + str(name) + " Value: " + str(value) + " Unit: " + str(unit) + " LCD Line: " + cur_lcd_line)
+            readings.append(parsed)
+        return readings, redrawn
+
+    @callback
+    def apply_readings(self, readings, redrawn):
+        """Store the readings of one screen and update the entities of the changed values"""
+        now = time.monotonic()
+        derived = set()
+        for name in redrawn:
+            self._last_refresh[name] = now
+            self.record_reading(name, self._values[name])
+            derived.update(self._derived.update(name, self._values[name], now))
+            if (sensor_entry := self._registered_values.get(name)) is not None:
+                try:
+                    sensor_entry.handle_reread()
+                except Exception:  # pylint: disable=broad-except
+                    LOGGER.exception("Error writing " + name)
+        updates = []
+        for name, value, unit in readings:
+            self._last_refresh[name] = now
+            self._values[name] = value
+            self.record_reading(name, value)
+            derived.update(self._derived.update(name, value, now))
+            sensor_entry = self._registered_values.get(name)
+            if sensor_entry is None:
+                LOGGER.debug("No entity available for: " +  name)
+            else:
+                updates.append((sensor_entry, value, unit))
+        if updates:
+            self.apply_screen_updates(updates)
+        for key in derived:
+            # written once per screen, also when several of its inputs changed
+            if (derived_entity := self._derived_entities.get(key)) is not None:
+                try:
+                    derived_entity.handle_update()
+                except Exception:  # pylint: disable=broad-except
+                    LOGGER.exception("Error writing " + key)
+
+    @callback
+    def apply_screen_updates(self, updates):
+        """Hand the values parsed from one screen to their entities in one pass"""
+        # the values of a parked page are written unfiltered, each redraw counts
+        parked = () if self._parked_page is None else self._parked_page.sensors
+        for sensor_entry, value, unit in updates:
+            # one failing entity must not stop the others of the screen or the polling
             try:
-                splitted = re.split(r'([-]?\d+[.\d]*)', cur_lcd_line)
-                name = ''.join(splitted[0:(len(splitted)-2)]).strip()
-                value = splitted[-2].strip()
-                unit = splitted[-1].strip()
-                # Handle some special names:
-                if name == "Heizungspumpe":
-                    name = name+value
-                    value = unit
-                    unit = "None"
-                if name == "HEIZZEITEN":
-                    # ignore
-                    continue
-                name = slugify.slugify(name, separator="_")
-                LOGGER.debug("Name: " + str(name) + " Value: " + str(value) + " Unit: " + str(unit) + " LCD Line: " + cur_lcd_line)
-            # create or update the sensor
-            except Exception as error:
-                # could happen for generic display text without a value
-                if cur_lcd_line.find("Kessel") == 0:
-                    name = "kessel_status"
-                    value = cur_lcd_line
-                    unit = "None"
-                else:
-                    LOGGER.debug("Exception during parsing lcd line " + str(cur_line) + " :" + str(error) + " Current-LCDline:" + cur_lcd_line)
-                    continue
-            try:
-                sensor_entry = self._registered_values[name]
-            except:
-                # instantiate the sensor
-                entity_description = SENSORS.get(name)
-                if entity_description:
-                    LOGGER.debug("Adding sensor: Name: " + str(name) + " Value: " + str(value) + " Unit: " + str(unit))
-                    frlng_sens = FrlngEntity(self._dev_id, entity_description, name, unit, value)
-                    self._registered_values[name] = frlng_sens
-                    self._async_add_entities([frlng_sens], update_before_add=True)
+                if sensor_entry.my_name in parked:
+                    sensor_entry.handle_new_value(value, unit, unfiltered=True)
                 else:
-                    LOGGER.debug("No entity description available for: " +  name)    
-            else:
-                # update the sensor
-                LOGGER.debug("Update sensor: Name: " + str(name) + " Value: " + str(value) + " Unit: " + str(unit))
-                async_dispatcher_send(
-                    self._hass, SIGNAL_FRLNG_TELEGRAM+sensor_entry.get_unique_id(), name, value, unit
-                )
+                    sensor_entry.handle_new_value(value, unit)
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception("Error writing " + sensor_entry.my_name + ": " + str(value))
 
     def conv_lcd_chars(self, char):
         """Convert special lcd characters codes"""
-        if char == 0xdf:
-            return "°"
-        if char == 0xe1:
-            return "ä"
-        if char == 0xe2:
-            return "ß"
-        if char == 0xf5:
-            return "ü"
-        # todo ÄÖÜö
-        return chr(char)
-
-    def handle_button_data(self, msg):
+        return LCD_CHARSET[char]
+
+    def handle_button_data(self, dlc, data):
         """Callback for button messages"""
+        if self._decode_in_thread:
+            # our own buttons are known in the event loop
+            self._pending_buttons.append((dlc, bytes(data[:dlc])))
+            return
+        self.button_received(dlc, data)
+
+    def button_received(self, dlc, data):
+        """Count a user button press, the echo of our own buttons is ignored"""
+        if dlc < 1:
+            return
+        button = data[0]
+        now = time.monotonic()
+        own = self._own_buttons
+        while own and now - own[0][1] > OWN_BUTTON_ECHO_TIME:
+            own.popleft()
+        for index, (sent, _) in enumerate(own):
+            if sent == button:
+                del own[index]
+                return
+        self._user_presses += 1
+        self._last_user_press = now
+        self._last_user_activity = dt_util.utcnow()
         self._pause_buttonsseq = True
-        return
 
-    def handle_time_data(self, msg):
-        """Callback for time messages"""
+    def handle_time_data(self, dlc, data):
+        """Callback for time messages, they keep the bus watchdog fed while the display is idle"""
         return
 
-class FrlngEntity(SensorEntity):
+class FrlngDiagnosticEntity(SensorEntity):
+    """Diagnostic sensor of the CAN communication, polled."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    # the ages of the sensors and the counters change with every poll, they are not recorded
+    _unrecorded_attributes = frozenset(SENSORS) | frozenset({
+        "frames", "total_time", "max_time", "loop_callbacks",
+        "sent", "retries", "timeouts", "failed", "max_queued",
+    })
+    entity_description: FrlngDiagnosticEntityDescription
+
+    def __init__(self, frlng_com, entity_description):
+        """Initialize a diagnostic Entity."""
+        self._frlng_com = frlng_com
+        self.entity_description = entity_description
+        self._attr_unique_id = f"{frlng_com._dev_id}_{entity_description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, frlng_com._dev_id)},
+            name=frlng_com._dev_name,
+        )
+
+    async def async_update(self) -> None:
+        """Read the counters from the CAN communication."""
+        self._attr_native_value = self.entity_description.value_fn(self._frlng_com)
+        if self.entity_description.attr_fn is not None:
+            self._attr_extra_state_attributes = self.entity_description.attr_fn(self._frlng_com)
+
+class FrlngDerivedEntity(SensorEntity):
+    """Sensor derived from the values read from the display, written when they are parsed."""
+
+    _attr_should_poll = False
+    _attr_has_entity_name = True
+    entity_description: FrlngDerivedEntityDescription
+
+    def __init__(self, frlng_com, metrics, entity_description):
+        """Initialize a derived Entity."""
+        self._metrics = metrics
+        self.entity_description = entity_description
+        self._attr_unique_id = f"{frlng_com._dev_id}_{entity_description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, frlng_com._dev_id)},
+            name=frlng_com._dev_name,
+        )
+
+    @callback
+    def handle_update(self):
+        """Read the metric and write the state if it changed"""
+        value = self.entity_description.value_fn(self._metrics)
+        attributes = None
+        if self.entity_description.attr_fn is not None:
+            attributes = self.entity_description.attr_fn(self._metrics)
+        if value == self._attr_native_value and attributes == self._attr_extra_state_attributes:
+            return
+        self._attr_native_value = value
+        self._attr_extra_state_attributes = attributes
+        if self.hass is not None:
+            self.async_write_ha_state()
+
+class FrlngEntity(RestoreSensor):
     """Entity reading values from fröling can lcd display message."""
 
     _attr_should_poll = False
     _attr_has_entity_name = True
     
-    def __init__(self, dev_id, entity_description, name, unit, value):
+    def __init__(self, dev_id, entity_description, name, unit, value, dev_name=DEFAULT_DEVICE_NAME,
+                 deadband=0, min_interval=0):
         """Initialize a Fröling Entity."""
         self._dev_id = dev_id
         self.my_name = name
         self.my_unit = unit
         self.my_value = value
-        self._async_remove_dispatcher = None
+        self._deadband = deadband
+        self._min_interval = min_interval
+        self._written_value = value
+        self._last_write = time.monotonic()
+        self._last_read = None
+        self._display_read = False
+        self._flush_at = None
+        self._flush_unsub = None
         self.entity_description = entity_description
         self._attr_unique_id = f"{dev_id}_{name}"
         #self._attr_name = f"{name}"
         self._attr_device_info = DeviceInfo(
             identifiers={(DOMAIN, dev_id)},
-            name=DEFAULT_DEVICE_NAME,
+            name=dev_name,
         )
 
     def get_unique_id(self):
         return self._attr_unique_id
 
+    @callback
+    def set_available(self, available):
+        """Mark the entity unavailable while the bus is down"""
+        self._attr_available = available
+        if self.hass is not None:
+            self.async_write_ha_state()
+
     async def async_added_to_hass(self) -> None:
         """Run when entity about to be added to hass."""
+        await super().async_added_to_hass()
+        if self.my_value is None and (last_data := await self.async_get_last_sensor_data()) is not None:
+            # show the last value until the display page is read
+            self.my_value = self._written_value = last_data.native_value
+            if (last_state := await self.async_get_last_state()) is not None:
+                last_read = last_state.attributes.get(ATTR_LAST_READ)
+                self._last_read = dt_util.parse_datetime(last_read) if isinstance(last_read, str) else last_read
 
-        @callback
-        def handle_new_value(name, value, unit):
-            """Update value and update stat if changed"""
-            assert self.my_name == name
-            assert self.my_unit == unit
-            if self.my_value == value:
-                return
-            self.my_value = value
+        self._last_write = time.monotonic()
+        if self._display_read:
+            # read before the entity was added
             self.async_write_ha_state()
 
-        self._async_remove_dispatcher = async_dispatcher_connect(
-            self.hass, SIGNAL_FRLNG_TELEGRAM+self._attr_unique_id, handle_new_value
-        )
-
     async def async_will_remove_from_hass(self) -> None:
         """Run when entity will be removed from hass."""
-        if self._async_remove_dispatcher:
-            self._async_remove_dispatcher()
+        self._cancel_flush()
+
+    @callback
+    def handle_new_value(self, value, unit, unfiltered=False):
+        """Update value and update stat if changed, unfiltered skips the deadband and min interval"""
+        self.my_value = value
+        self._last_read = dt_util.utcnow()
+        if self.hass is None:
+            # not added yet, the value is written when it is
+            self._display_read = True
+            self.my_unit = unit
+            return
+        if not self._display_read or self.my_unit != unit:
+            # the first value read replaces the restored one at once
+            self._display_read = True
+            self.my_unit = unit
+            self._write_value()
+            return
+        if value == self._written_value:
+            # back to the shown value, nothing to flush
+            self._cancel_flush()
+            self._refresh_last_read()
+            return
+        if unfiltered:
+            self._write_value()
+            return
+        now = time.monotonic()
+        if self._is_significant(value):
+            flush_at = self._last_write + self._min_interval
+        else:
+            # small changes are held for an interval, flickering values are not written at all
+            flush_at = now + self._min_interval
+        if flush_at <= now:
+            self._write_value()
+        elif self._flush_at is None or flush_at < self._flush_at:
+            self._cancel_flush()
+            self._flush_at = flush_at
+            self._flush_unsub = async_call_later(self.hass, flush_at - now, self._async_flush)
+
+    @callback
+    def handle_reread(self):
+        """The display line was redrawn with the shown value"""
+        self._last_read = dt_util.utcnow()
+        if self.hass is not None and self._display_read and self._flush_at is None:
+            self._refresh_last_read()
+
+    def _refresh_last_read(self) -> None:
+        """Publish last_read of an unchanged value, at most once per min interval"""
+        if time.monotonic() - self._last_write >= max(self._min_interval, LAST_READ_INTERVAL):
+            self._write_value()
+
+    def _is_significant(self, value) -> bool:
+        """Return True if value differs from the shown value by at least the deadband"""
+        if self._deadband <= 0:
+            return True
+        if not isinstance(value, (int, float)) or not isinstance(self._written_value, (int, float)):
+            return True
+        return abs(value - self._written_value) >= self._deadband
+
+    def _write_value(self) -> None:
+        """Write the latest value to the state machine"""
+        self._cancel_flush()
+        self._written_value = self.my_value
+        self._last_write = time.monotonic()
+        self.async_write_ha_state()
+
+    @callback
+    def _async_flush(self, _now) -> None:
+        """Write the value held back by the deadband or the min interval"""
+        self._flush_unsub = None
+        self._flush_at = None
+        if self.my_value != self._written_value:
+            self._write_value()
+
+    def _cancel_flush(self) -> None:
+        """Cancel a pending write"""
+        if self._flush_unsub is not None:
+            self._flush_unsub()
+            self._flush_unsub = None
+        self._flush_at = None
 
     @property
     def native_value(self) -> str:
         """Return the value of the last received telegram."""
         return self.my_value
 
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return when the value was read from the display."""
+        return {ATTR_LAST_READ: self._last_read}
+
     @property
     def native_unit_of_measurement(self) -> str | None:
         """Return the unit of measurement."""
@@ -0,0 +1,161 @@
+"""Services for the froeling integration."""
+import asyncio
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import CONF_CAN_BUS, DOMAIN, LOGGER
+from .history import HISTORY_SIZE
+from .menu import MENU_PAGES_BY_NAME, SENSOR_KEYS
+
+SERVICE_REFRESH = "refresh"
+SERVICE_HISTORY = "history"
+SERVICE_PROFILE = "profile"
+SERVICE_PARK = "park"
+SERVICE_UNPARK = "unpark"
+ATTR_SENSORS = "sensors"
+ATTR_SENSOR = "sensor"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_POINTS = "points"
+ATTR_DURATION = "duration"
+ATTR_PAGE = "page"
+
+REFRESH_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_SENSORS): vol.All(cv.ensure_list, [vol.In(SENSOR_KEYS)]),
+        vol.Optional(CONF_CAN_BUS): cv.string,
+    }
+)
+
+HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_SENSOR): vol.In(SENSOR_KEYS),
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_POINTS): vol.All(vol.Coerce(int), vol.Range(min=1, max=HISTORY_SIZE)),
+        vol.Optional(CONF_CAN_BUS): cv.string,
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=30): vol.All(vol.Coerce(float), vol.Range(min=1, max=600)),
+        vol.Optional(CONF_CAN_BUS): cv.string,
+    }
+)
+
+PARK_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_PAGE): vol.In(list(MENU_PAGES_BY_NAME)),
+        vol.Optional(ATTR_DURATION, default=300): vol.All(vol.Coerce(float), vol.Range(min=10, max=3600)),
+        vol.Optional(CONF_CAN_BUS): cv.string,
+    }
+)
+
+UNPARK_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_CAN_BUS): cv.string,
+    }
+)
+
+
+def get_frlng_com(hass: HomeAssistant, can_bus: str | None):
+    """Return the CAN communication of the boiler on can_bus
+
+    can_bus may be omitted when only one boiler is set up.
+    """
+    frlng_coms = list(hass.data.get(DOMAIN, {}).values())
+    if can_bus is not None:
+        frlng_coms = [frlng_com for frlng_com in frlng_coms if frlng_com.can_bus == can_bus]
+    if not frlng_coms:
+        raise HomeAssistantError("Fröling integration is not set up" + ("" if can_bus is None else " on " + can_bus))
+    if len(frlng_coms) > 1:
+        raise HomeAssistantError("More than one Fröling boiler is set up, select one with " + CONF_CAN_BUS)
+    return frlng_coms[0]
+
+
+async def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the froeling services."""
+    if hass.services.has_service(DOMAIN, SERVICE_REFRESH):
+        return
+
+    async def async_refresh(call: ServiceCall) -> ServiceResponse:
+        """Read the given sensors from the display right now."""
+        frlng_com = get_frlng_com(hass, call.data.get(CONF_CAN_BUS))
+        LOGGER.debug("Refresh requested for " + str(call.data[ATTR_SENSORS]))
+        try:
+            values = await frlng_com.async_refresh(call.data[ATTR_SENSORS])
+        except asyncio.TimeoutError as error:
+            raise HomeAssistantError("Timeout refreshing " + ", ".join(call.data[ATTR_SENSORS])) from error
+        return {ATTR_SENSORS: values}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REFRESH,
+        async_refresh,
+        schema=REFRESH_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def async_history(call: ServiceCall) -> ServiceResponse:
+        """Return the readings of a sensor kept in memory."""
+        frlng_com = get_frlng_com(hass, call.data.get(CONF_CAN_BUS))
+        start, end = (
+            dt_util.as_utc(call.data[attr]).timestamp() if attr in call.data else None
+            for attr in (ATTR_START, ATTR_END)
+        )
+        return frlng_com.get_history(call.data[ATTR_SENSOR], start, end, call.data.get(ATTR_POINTS))
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_HISTORY,
+        async_history,
+        schema=HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def async_profile(call: ServiceCall) -> ServiceResponse:
+        """Profile the CAN communication and write the results to the config directory."""
+        frlng_com = get_frlng_com(hass, call.data.get(CONF_CAN_BUS))
+        try:
+            return await frlng_com.async_profile(call.data[ATTR_DURATION])
+        except (RuntimeError, ValueError) as error:
+            raise HomeAssistantError("Profiling failed: " + str(error)) from error
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        async_profile,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def async_park(call: ServiceCall) -> None:
+        """Stay on a display page and read it with each redraw of the controller."""
+        frlng_com = get_frlng_com(hass, call.data.get(CONF_CAN_BUS))
+        frlng_com.async_park(MENU_PAGES_BY_NAME[call.data[ATTR_PAGE]], call.data[ATTR_DURATION])
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PARK,
+        async_park,
+        schema=PARK_SCHEMA,
+    )
+
+    async def async_unpark(call: ServiceCall) -> None:
+        """Continue the normal button sequence."""
+        get_frlng_com(hass, call.data.get(CONF_CAN_BUS)).async_unpark()
+
+    hass.services.async_register(DOMAIN, SERVICE_UNPARK, async_unpark, schema=UNPARK_SCHEMA)
+
+
+@callback
+def async_unload_services(hass: HomeAssistant) -> None:
+    """Remove the froeling services, after the last boiler was unloaded."""
+    for service in (SERVICE_REFRESH, SERVICE_HISTORY, SERVICE_PROFILE, SERVICE_PARK, SERVICE_UNPARK):
+        hass.services.async_remove(DOMAIN, service)
@@ -0,0 +1,129 @@
+"""Transmit queue of the Fröling CAN bus."""
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+
+import can
+
+from homeassistant.core import HomeAssistant
+
+from .const import LOGGER
+
+# max frames waiting for the TX thread, senders wait while it is full
+TX_QUEUE_SIZE = 8
+# timeout of a single send in the TX thread
+TX_SEND_TIMEOUT = 0.5
+# max time the event loop waits for a send, a hanging driver must not block the queue forever
+TX_SEND_WAIT = 2 * TX_SEND_TIMEOUT
+# retries after a failed send
+TX_RETRIES = 2
+TX_RETRY_DELAY = 0.05
+
+
+class FrlngCANTransmitter:
+    """Send frames from a bounded queue in a dedicated thread.
+
+    The blocking bus send never runs on the event loop. A full socket or
+    controller TX buffer only delays the callers of async_send.
+    """
+
+    def __init__(self, hass: HomeAssistant, name: str, get_bus: Callable[[], can.BusABC]) -> None:
+        """Initialize the transmitter, the TX task and thread are started with the first frame."""
+        self._hass = hass
+        self._name = name
+        self._get_bus = get_bus
+        self._queue: asyncio.Queue[tuple[can.Message, asyncio.Future]] = asyncio.Queue(TX_QUEUE_SIZE)
+        self._executor = None
+        self._task = None
+        self._current = None
+        self.sent = 0
+        self.errors = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.failed = 0
+        self.max_queued = 0
+        self.last_error = None
+
+    async def async_send(self, msg: can.Message) -> bool:
+        """Queue msg and wait until it is sent, returns False if sending failed
+
+        Waits while the queue is full, this is the backpressure toward the button sequences.
+        """
+        self._start()
+        future = self._hass.loop.create_future()
+        await self._queue.put((msg, future))
+        self.max_queued = max(self.max_queued, self._queue.qsize())
+        return await future
+
+    def _start(self) -> None:
+        """Start the TX thread and task"""
+        if self._task is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="froeling_tx_" + self._name)
+        self._task = self._hass.async_create_background_task(self._async_drain(), "froeling_tx_" + self._name)
+
+    async def _async_drain(self) -> None:
+        """The TX task, sends the queued frames one after the other"""
+        while True:
+            msg, self._current = await self._queue.get()
+            try:
+                sent = await self._async_transmit(msg)
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception("Unexpected error sending to " + self._name)
+                sent = False
+            if not self._current.done():
+                self._current.set_result(sent)
+            self._current = None
+
+    async def _async_transmit(self, msg: can.Message) -> bool:
+        """Send msg in the TX thread, retry on bus errors"""
+        loop = self._hass.loop
+        for attempt in range(TX_RETRIES + 1):
+            if attempt:
+                self.retries += 1
+                await asyncio.sleep(TX_RETRY_DELAY)
+            bus = self._get_bus()
+            if bus is None:
+                # closed while the bus is reopened
+                self.errors += 1
+                self.last_error = "Bus not open"
+                continue
+            try:
+                await asyncio.wait_for(
+                    loop.run_in_executor(self._executor, bus.send, msg, TX_SEND_TIMEOUT),
+                    TX_SEND_WAIT,
+                )
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                LOGGER.debug("Timeout sending to " + self._name)
+                continue
+            except (can.CanError, OSError) as error:
+                self.errors += 1
+                self.last_error = str(error)
+                LOGGER.debug("Failed to send to " + self._name + " Error:" + str(error))
+                continue
+            self.sent += 1
+            return True
+        self.failed += 1
+        LOGGER.warning("Giving up sending to " + self._name + " after " + str(TX_RETRIES + 1) + " attempts")
+        return False
+
+    async def async_stop(self) -> None:
+        """Stop the TX task and thread, queued frames are not sent"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        if self._current is not None and not self._current.done():
+            self._current.set_result(False)
+        self._current = None
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_result(False)
+        # waits for a send in progress, it is bounded by TX_SEND_TIMEOUT
+        await self._hass.async_add_executor_job(self._executor.shutdown)
+        self._executor = None
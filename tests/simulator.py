@@ -0,0 +1,241 @@
+"""Simulated Fröling boiler controller on the python-can virtual bus.
+
+The controller keeps a menu cursor like the real one, answers CMD_BUTTON
+frames by redrawing the display with CMD_DISPLAY frames after a configurable
+latency and sends its time with CMD_TIME frames. Tests can change the shown
+values, press buttons like a user at the boiler and show error screens.
+"""
+import heapq
+import itertools
+import random
+import threading
+import time
+
+import can
+
+CMD_TIME = 0x018
+CMD_DISPLAY = 0x021
+CMD_BUTTON = 0x02f
+
+# buttons of the display panel
+BUTTON_UP = 0x01
+BUTTON_LEFT = 0x02
+BUTTON_DOWN = 0x04
+BUTTON_RIGHT = 0x08
+BUTTON_NO_BUT = 0x00
+
+# HD44780 set DDRAM address command of each display row and the columns of a row
+LCD_ROW_ADDRESS = (0x80, 0xc0, 0x94, 0xd4)
+LCD_COLUMNS = 20
+# display codes of the chars which are not ASCII
+LCD_ENCODE = {"°": 0xdf, "ß": 0xe2, "ä": 0xe1, "ö": 0xef, "ü": 0xf5}
+
+DEFAULT_VALUES = {
+    "kessel_status": "Kessel in Betrieb",
+    "pufferladezust": "80%",
+    "abgastemp_ist": "180°",
+    "abgastemp_soll": "170°",
+    "kesseltemp_ist": "78°",
+    "kesseltempsoll": "80°",
+    "puffertmp_oben": "82°",
+    "puffertmp_mitte": "70°",
+    "puffertmp_unten": "50°",
+    "kesselrucklauft": "65°",
+    "rucklaufmischer": "40%",
+    "heizungspumpe1": "Ein",
+    "heizungspumpe2": "Aus",
+    "vorlauftmp2_ist": "45°",
+    "vorlauftmp2soll": "46°",
+    "aussentemperatur": "5°",
+    "geblase_ist": "1800U",
+    "stellmot_o_ist": "30%",
+    "stellmot_u_ist": "60%",
+    "sauerstoffwert": "7.5%",
+    "betriebsstd": "12345h",
+}
+
+# The menu of the controller as walked by the original fixed button sequence:
+# the main menu is a list, the cursor starts on "Pufferladezust." (0) with
+# Abgastemp. (-1) and Kesseltemp. (-2) above it and Kesselrücklauf (1),
+# Heizungspumpe 1/2 (2, 3), Außentemperatur (4), Gebläse (5), Stellmotor oben/unten (6, 7)
+# and Sauerstoffwert (8) below. BUTTON_RIGHT opens the details of an entry,
+# BUTTON_LEFT goes back to the entry and from the main menu back to "Pufferladezust.".
+# A node is (cursor position, details page open), the lines of its screen
+# are formatted with the current values.
+MENU_FIRST = -2
+MENU_LAST = 8
+MENU_SCREENS = {
+    (-2, True): ("Kesseltemp. ist {kesseltemp_ist}", "Kesseltempsoll {kesseltempsoll}"),
+    (-1, True): ("Abgastemp. ist {abgastemp_ist}", "Abgastemp.soll {abgastemp_soll}"),
+    (0, False): ("{kessel_status}", "Pufferladezust. {pufferladezust}"),
+    (0, True): ("Puffertmp. oben {puffertmp_oben}", "Puffertmp.mitte {puffertmp_mitte}",
+                "Puffertmp.unten {puffertmp_unten}"),
+    (1, True): ("Kesselrücklauft.{kesselrucklauft}", "Rücklaufmischer {rucklaufmischer}"),
+    (3, False): ("{kessel_status}", "Heizungspumpe 1 {heizungspumpe1}", "Heizungspumpe 2 {heizungspumpe2}"),
+    (3, True): ("Vorlauftmp2 ist {vorlauftmp2_ist}", "Vorlauftmp2soll {vorlauftmp2soll}"),
+    (5, False): ("{kessel_status}", "Außentemperatur {aussentemperatur}"),
+    (5, True): ("Gebläse IST {geblase_ist}",),
+    (6, True): ("Stellmot. o ist {stellmot_o_ist}",),
+    (7, True): ("Stellmot. u ist {stellmot_u_ist}",),
+    (8, False): ("{kessel_status}", "Betriebsstd. {betriebsstd}"),
+    (8, True): ("Sauerstoffwert {sauerstoffwert}",),
+}
+# the other entries of the main menu only show the boiler state
+MENU_STATUS_SCREEN = ("{kessel_status}",)
+
+
+class FrlngControllerSimulator:
+    """Display controller of a Fröling boiler, run in its own thread."""
+
+    def __init__(self, channel="test_can", latency=0.01, jitter=0.0, time_interval=1.0, seed=0,
+                 frame_interval=0.0, redraw_interval=None):
+        """Initialize the simulator, start() connects it to the virtual bus.
+
+        frame_interval paces the display frames of a redraw like the CAN bus and the controller do.
+        redraw_interval redraws the screen periodically without a button like the controller
+        does to show new values.
+        """
+        self.channel = channel
+        self.latency = latency
+        self.jitter = jitter
+        self.frame_interval = frame_interval
+        self.time_interval = time_interval
+        self.redraw_interval = redraw_interval
+        self.values = dict(DEFAULT_VALUES)
+        self.node = (0, False)
+        self.error_lines = None
+        # buttons received from the bus and number of redraws
+        self.buttons = []
+        self.redraws = 0
+        self._random = random.Random(seed)
+        self._events = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._bus = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """Connect to the bus and start the controller thread"""
+        self._bus = can.Bus(self.channel, interface="virtual")
+        self._schedule(0, self._send_time)
+        if self.redraw_interval:
+            self._schedule(self.redraw_interval, self._periodic_redraw)
+        self._thread = threading.Thread(target=self._run, name="froeling_simulator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the controller thread and disconnect"""
+        self._stop.set()
+        self._thread.join()
+        self._bus.shutdown()
+
+    def set_value(self, key, value):
+        """Change the text of a sensor value, it is shown with the next redraw"""
+        with self._lock:
+            self.values[key] = value
+
+    def press_user_button(self, button):
+        """Press and release a button at the boiler, the frames are sent to the bus"""
+        self._schedule(0, self._user_button, button)
+
+    def show_error(self, *lines):
+        """Show an error screen until it is left with BUTTON_LEFT"""
+        with self._lock:
+            self.error_lines = lines
+        self._schedule(0, self._redraw)
+
+    def screen(self):
+        """Lines of the current screen"""
+        with self._lock:
+            if self.error_lines is not None:
+                lines = list(self.error_lines)
+            else:
+                screen = MENU_SCREENS.get(self.node, MENU_STATUS_SCREEN)
+                lines = [line.format(**self.values) for line in screen]
+        return (lines + [""] * len(LCD_ROW_ADDRESS))[:len(LCD_ROW_ADDRESS)]
+
+    def _schedule(self, delay, action, *args):
+        """Run action in the controller thread after delay"""
+        with self._lock:
+            heapq.heappush(self._events, (time.monotonic() + delay, next(self._sequence), action, args))
+
+    def _run(self):
+        """The controller thread"""
+        while not self._stop.is_set():
+            with self._lock:
+                due = self._events[0][0] if self._events else None
+            timeout = 0.01 if due is None else min(max(due - time.monotonic(), 0), 0.01)
+            msg = self._bus.recv(timeout)
+            if msg is not None and msg.arbitration_id == CMD_BUTTON and msg.dlc:
+                self.buttons.append(msg.data[0])
+                self._button(msg.data[0])
+            while True:
+                with self._lock:
+                    if not self._events or self._events[0][0] > time.monotonic():
+                        break
+                    _, _, action, args = heapq.heappop(self._events)
+                action(*args)
+
+    def _button(self, button):
+        """Move the cursor and redraw the display after the latency"""
+        if button == BUTTON_NO_BUT:
+            return
+        with self._lock:
+            position, details = self.node
+            if self.error_lines is not None:
+                if button == BUTTON_LEFT:
+                    self.error_lines = None
+                    self.node = (0, False)
+            elif button == BUTTON_LEFT:
+                self.node = (position, False) if details else (0, False)
+            elif details:
+                pass
+            elif button == BUTTON_UP:
+                self.node = (max(position - 1, MENU_FIRST), False)
+            elif button == BUTTON_DOWN:
+                self.node = (min(position + 1, MENU_LAST), False)
+            elif button == BUTTON_RIGHT and (position, True) in MENU_SCREENS:
+                self.node = (position, True)
+        delay = max(self.latency + self._random.uniform(-self.jitter, self.jitter), 0)
+        self._schedule(delay, self._redraw)
+
+    def _user_button(self, button):
+        """Send a button like the display panel at the boiler does"""
+        self._bus.send(can.Message(arbitration_id=CMD_BUTTON, is_extended_id=False, data=[button]))
+        self._bus.send(can.Message(arbitration_id=CMD_BUTTON, is_extended_id=False,
+                                   data=[BUTTON_NO_BUT]))
+        self._button(button)
+
+    def _redraw(self):
+        """Send the current screen line by line"""
+        self.redraws += 1
+        for row, text in enumerate(self.screen()):
+            self._send_display([0x00, LCD_ROW_ADDRESS[row]])
+            for char in text[:LCD_COLUMNS].ljust(LCD_COLUMNS):
+                self._send_display([LCD_ENCODE[char] if char in LCD_ENCODE else ord(char)])
+
+    def _periodic_redraw(self):
+        """Redraw the screen, repeated every redraw_interval"""
+        self._redraw()
+        self._schedule(self.redraw_interval, self._periodic_redraw)
+
+    def _send_display(self, data):
+        """Send a display frame, paced by frame_interval"""
+        self._bus.send(can.Message(arbitration_id=CMD_DISPLAY, is_extended_id=False, data=data))
+        if self.frame_interval:
+            time.sleep(self.frame_interval)
+
+    def _send_time(self):
+        """Send the time of the controller, repeated every time_interval"""
+        now = time.localtime()
+        self._bus.send(can.Message(arbitration_id=CMD_TIME, is_extended_id=False,
+                                   data=[now.tm_hour, now.tm_min, now.tm_sec]))
+        self._schedule(self.time_interval, self._send_time)
@@ -0,0 +1,246 @@
+"""Benchmarks for the receive, decode and parse paths of the froeling heater integration.
+
+Results are collected per benchmark and written as JSON to the file given in
+FROELING_BENCHMARK_OUTPUT, so runs of different releases can be compared.
+Without it the benchmarks are skipped, the functional suite stays fast.
+FROELING_BENCHMARK_SCALE multiplies the number of iterations.
+"""
+import asyncio
+import json
+import os
+import statistics
+import time
+from unittest.mock import MagicMock
+
+import can
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.ha_froeling_euroturbo_40.const import (
+    CONF_ADAPTIVE_PACING,
+    CONF_CAN_BUS,
+    CONF_DEADBAND,
+    CONF_DECODE_IN_THREAD,
+    CONF_MIN_INTERVAL,
+    CONF_SENSOR_FILTERS,
+    DOMAIN,
+)
+from custom_components.ha_froeling_euroturbo_40.menu import SENSOR_KEYS
+from custom_components.ha_froeling_euroturbo_40.lcd import lcd_decode
+from custom_components.ha_froeling_euroturbo_40.rawcan import CAN_FRAME
+from custom_components.ha_froeling_euroturbo_40.sensor import FrlngCANCom
+
+from .simulator import FrlngControllerSimulator
+from .test_froeling_sensor import send_can_string
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("FROELING_BENCHMARK_OUTPUT"), reason="benchmarks run with FROELING_BENCHMARK_OUTPUT set"
+)
+
+SCALE = float(os.environ.get("FROELING_BENCHMARK_SCALE", "1"))
+DISPLAY_OFFSETS = [0x80, 0xc0, 0x94, 0xd4]
+SCREENS = [
+    ["Kessel in Betrieb   ", "Pufferladezust. {}% ", "Gebläse IST   {}U ", "Außentemperatur {}° "],
+    ["Puffertmp. oben {}° ", "Puffertmp.mitte {}° ", "Puffertmp.unten {}° ", "                    "],
+    ["Abgastemp. ist {}°  ", "Abgastemp. soll {}° ", "Sauerstoffwert {}%  ", "                    "],
+]
+LCD_CODES = {"°": 0xdf, "ß": 0xe2, "ä": 0xe1, "ü": 0xf5}
+
+
+def iterations(count):
+    return max(1, int(count * SCALE))
+
+
+def percentiles(samples):
+    """p50, p90 and p99 of samples in microseconds."""
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50_us": round(cuts[49] * 1e6, 2),
+        "p90_us": round(cuts[89] * 1e6, 2),
+        "p99_us": round(cuts[98] * 1e6, 2),
+    }
+
+
+def screen_frames(screen, value):
+    """CAN messages drawing a screen, like the display controller sends them."""
+    frames = []
+    for line, text in enumerate(screen):
+        text = text.format(value)[:20].ljust(20)
+        frames.append(can.Message(arbitration_id=0x021, is_extended_id=False, data=[0x00, DISPLAY_OFFSETS[line]]))
+        for char in text:
+            code = LCD_CODES.get(char, ord(char))
+            frames.append(can.Message(arbitration_id=0x021, is_extended_id=False, data=[code]))
+    return frames
+
+
+@pytest.fixture(scope="module")
+def benchmark_results():
+    """Collect the results and write them when all benchmarks are done."""
+    results = {}
+    yield results
+    output = os.environ.get("FROELING_BENCHMARK_OUTPUT")
+    if output:
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump({"scale": SCALE, "results": results}, file, indent=2, sort_keys=True)
+
+
+async def test_benchmark_decode(hass, benchmark_results):
+    """Throughput of the char conversion and line decoding."""
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting"}, MagicMock())
+    codes = list(range(256))
+    rounds = iterations(2000)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for code in codes:
+            frlng_com.conv_lcd_chars(code)
+    chars_elapsed = time.perf_counter() - start
+
+    line = bytes(b"Puffertmp. oben 82\xdf")
+    start = time.perf_counter()
+    for _ in range(rounds * 10):
+        lcd_decode(line)
+    lines_elapsed = time.perf_counter() - start
+
+    benchmark_results["decode"] = {
+        "chars_per_sec": round(rounds * len(codes) / chars_elapsed),
+        "lines_per_sec": round(rounds * 10 / lines_elapsed),
+    }
+
+
+async def test_benchmark_receive(hass, benchmark_results):
+    """Frames per second through can_msg_receive, can_frames_receive and handle_display_data."""
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting"}, MagicMock())
+    frames = [frame for value in range(10) for screen in SCREENS for frame in screen_frames(screen, value)]
+    rounds = iterations(200)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for frame in frames:
+            frlng_com.can_msg_receive(frame)
+    receive_elapsed = time.perf_counter() - start
+
+    raw_frames = b"".join(CAN_FRAME.pack(frame.arbitration_id, frame.dlc, bytes(frame.data)) for frame in frames)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        frlng_com.can_frames_receive(raw_frames)
+    raw_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for frame in frames:
+            frlng_com.handle_display_data(frame.dlc, frame.data)
+    display_elapsed = time.perf_counter() - start
+
+    benchmark_results["receive"] = {
+        "frames": rounds * len(frames),
+        "can_msg_receive_frames_per_sec": round(rounds * len(frames) / receive_elapsed),
+        "can_frames_receive_frames_per_sec": round(rounds * len(frames) / raw_elapsed),
+        "handle_display_data_frames_per_sec": round(rounds * len(frames) / display_elapsed),
+    }
+
+
+async def test_benchmark_parse(hass, benchmark_results):
+    """Latency of parse_lcd for changed screens and for an unchanged display."""
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting"}, MagicMock())
+    screens = [screen_frames(screen, value) for value in range(50) for screen in SCREENS]
+    rounds = iterations(20)
+
+    changed = []
+    unchanged = []
+    for _ in range(rounds):
+        for frames in screens:
+            for frame in frames:
+                frlng_com.handle_display_data(frame.dlc, frame.data)
+            start = time.perf_counter()
+            frlng_com.parse_lcd()
+            changed.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            frlng_com.parse_lcd()
+            unchanged.append(time.perf_counter() - start)
+
+    benchmark_results["parse_lcd_changed_screen"] = percentiles(changed)
+    benchmark_results["parse_lcd_idle"] = percentiles(unchanged)
+
+
+async def test_benchmark_end_to_end(hass, benchmark_results):
+    """Latency from the first display frame on the virtual bus to the state update."""
+    # every change is written at once
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_CAN_BUS: "unittesting"}, options={
+        CONF_SENSOR_FILTERS: {"pufferladezust": {CONF_DEADBAND: 0, CONF_MIN_INTERVAL: 0}}
+    })
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    test_can = can.interface.Bus("test_can", interface="virtual")
+    frlng_com = hass.data[DOMAIN][entry.entry_id]
+
+    updated = {}
+
+    def state_changed(event):
+        updated[event.data["entity_id"]] = time.perf_counter()
+
+    remove_listener = hass.bus.async_listen("state_changed", state_changed)
+    samples = []
+    for value in range(10, 10 + iterations(5)):
+        start = time.perf_counter()
+        send_can_string(test_can, 1, "Pufferladezust. " + str(value) + "% ")
+        entity_id = None
+        while entity_id is None or hass.states.get(entity_id).state != str(value):
+            await asyncio.sleep(0.005)
+            entity_id = er.async_get(hass).async_get_entity_id(
+                "sensor", DOMAIN, frlng_com._dev_id + "_pufferladezust"
+            )
+            if time.perf_counter() - start > 10:
+                pytest.fail("No state update within 10s")
+        samples.append(updated.get(entity_id, time.perf_counter()) - start)
+    remove_listener()
+
+    benchmark_results["end_to_end"] = {
+        "samples": len(samples),
+        "mean_ms": round(statistics.mean(samples) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+    }
+    test_can.shutdown()
+    await hass.config_entries.async_remove(entry.entry_id)
+
+
+@pytest.mark.parametrize(
+    ("latency", "frame_interval", "decode_in_thread"),
+    [(0.01, 0, False), (0.05, 0, False), (0.01, 0.0002, False), (0.01, 0.0002, True)],
+)
+async def test_benchmark_sweep(hass, benchmark_results, latency, frame_interval, decode_in_thread):
+    """Time of the first sweep over all pages of the simulated controller.
+
+    With frame_interval the display frames trickle in like from a real controller.
+    """
+    frlng_com = FrlngCANCom(
+        hass, {CONF_CAN_BUS: "unittesting_bench", CONF_DECODE_IN_THREAD: decode_in_thread, CONF_ADAPTIVE_PACING: True},
+        MagicMock(),
+    )
+    await hass.async_add_executor_job(frlng_com.init_can)
+    with FrlngControllerSimulator(
+        "test_can_bench", latency=latency, jitter=latency / 4, frame_interval=frame_interval
+    ) as simulator:
+        await frlng_com.can_start_update()
+        start = time.perf_counter()
+        while frlng_com.sweep_duration is None:
+            await asyncio.sleep(0.01)
+            if time.perf_counter() - start > 30:
+                pytest.fail("No sweep within 30s")
+        await frlng_com.can_stop_update()
+    assert all(frlng_com.get_value(key) is not None for key in SENSOR_KEYS)
+    name = "sweep_latency_" + str(int(latency * 1000)) + "ms"
+    if frame_interval:
+        name += "_paced"
+    if decode_in_thread:
+        name += "_decode_in_thread"
+    benchmark_results[name] = {
+        "sweep_s": frlng_com.sweep_duration,
+        "buttons": len([button for button in simulator.buttons if button]),
+        "redraws": simulator.redraws,
+        "button_round_trip_ms": frlng_com.button_round_trip,
+        "frames": frlng_com.received_frames,
+        "loop_callbacks": frlng_com.loop_callbacks,
+    }
@@ -0,0 +1,93 @@
+"""Test CAN capture recording and replay for froeling heater integration."""
+from unittest.mock import MagicMock
+
+import can
+import pytest
+
+from custom_components.ha_froeling_euroturbo_40 import capture
+from custom_components.ha_froeling_euroturbo_40.capture import (
+    CAPTURE_HEADER,
+    CAPTURE_RECORD,
+    FrlngCaptureReader,
+    FrlngCaptureWriter,
+    async_replay_capture,
+)
+from custom_components.ha_froeling_euroturbo_40.const import CONF_CAN_BUS, CONF_CAPTURE, CONF_DECODE_IN_THREAD
+from custom_components.ha_froeling_euroturbo_40.sensor import FrlngCANCom
+
+
+def display_frames(line_addr, text):
+    """Display frames writing text at line_addr."""
+    yield 0x021, bytes([0x00, line_addr])
+    for char in text:
+        yield 0x021, bytes(char, "ascii")
+
+
+def test_write_and_read(tmp_path):
+    """Test that records are read back like they were written."""
+    path = str(tmp_path / "test.cap")
+    writer = FrlngCaptureWriter(path)
+    writer.open()
+    writer.write(1.5, 0x021, 2, bytearray([0x00, 0x80]))
+    writer.write(1.75, 0x02f, 1, bytearray([0x04]))
+    writer.close()
+    # a record cut off while recording
+    with open(path, "ab") as file:
+        file.write(b"\x00" * 5)
+
+    with FrlngCaptureReader(path) as reader:
+        assert len(reader) == 2
+        assert list(reader) == [(1.5, 0x021, 2, b"\x00\x80"), (1.75, 0x02f, 1, b"\x04")]
+
+
+def test_rotate(tmp_path):
+    """Test that a full capture file is rotated instead of growing."""
+    path = str(tmp_path / "test.cap")
+    writer = FrlngCaptureWriter(path, max_bytes=CAPTURE_HEADER.size + 2 * CAPTURE_RECORD.size)
+    writer.open()
+    for timestamp in range(5):
+        writer.write(timestamp, 0x021, 1, bytearray([0x41]))
+    writer.close()
+    assert writer.records == 5
+    assert writer.rotations == 2
+
+    with FrlngCaptureReader(path + ".1") as reader:
+        assert [record[0] for record in reader] == [2, 3]
+    with FrlngCaptureReader(path) as reader:
+        assert [record[0] for record in reader] == [4]
+
+
+def test_queue_full(tmp_path, monkeypatch):
+    """Test that frames are dropped instead of blocking when the writer thread lags behind."""
+    monkeypatch.setattr(capture, "CAPTURE_QUEUE_SIZE", 1)
+    writer = FrlngCaptureWriter(str(tmp_path / "test.cap"))
+    writer.write(1.5, 0x021, 1, bytearray([0x41]))
+    writer.write(1.75, 0x021, 1, bytearray([0x42]))
+    assert writer.records == 1
+    assert writer.dropped == 1
+
+
+def test_reject_other_files(tmp_path):
+    """Test that files without capture header are rejected."""
+    path = tmp_path / "test.cap"
+    path.write_bytes(b"x" * (CAPTURE_HEADER.size + CAPTURE_RECORD.size))
+    with pytest.raises(ValueError):
+        FrlngCaptureReader(str(path))
+
+
+@pytest.mark.parametrize("decode_in_thread", [False, True])
+async def test_record_and_replay(hass, tmp_path, decode_in_thread):
+    """Test that recorded display traffic replays into the parser in both decode modes."""
+    hass.config.config_dir = str(tmp_path)
+    recorder = FrlngCANCom(hass, {CONF_CAN_BUS: "vcan0", CONF_CAPTURE: True}, MagicMock())
+    recorder._capture.open()
+    for timestamp, (arbitration_id, data) in enumerate(display_frames(0xc0, "Pufferladezust. 80% ")):
+        recorder.can_msg_receive(can.Message(timestamp=timestamp / 1000, arbitration_id=arbitration_id,
+                                             is_extended_id=False, data=data))
+    recorder._capture.close()
+
+    add_entities = MagicMock()
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "vcan0", CONF_DECODE_IN_THREAD: decode_in_thread}, add_entities)
+    replayed = await async_replay_capture(frlng_com, str(tmp_path / "froeling_vcan0.cap"), speed=None)
+    assert replayed == 21
+    assert frlng_com.get_value("pufferladezust") == 80
@@ -2,11 +2,22 @@
 
 import pytest
 
-from custom_components.ha_froeling_euroturbo_40.const import CONF_CAN_BUS, DEFAULT_TITLE, DOMAIN
+from custom_components.ha_froeling_euroturbo_40 import async_migrate_entry
+from custom_components.ha_froeling_euroturbo_40.const import (
+    CONF_ADAPTIVE_PACING,
+    CONF_CAN_BUS,
+    CONF_DEADBAND,
+    CONF_DEVICE_ID,
+    CONF_MIN_INTERVAL,
+    CONF_SENSOR_FILTERS,
+    DEFAULT_TITLE,
+    DOMAIN,
+)
 from homeassistant.config_entries import SOURCE_USER
 from homeassistant.const import CONF_NAME
 from homeassistant.core import HomeAssistant
 from homeassistant.data_entry_flow import FlowResultType
+from pytest_homeassistant_custom_component.common import MockConfigEntry
 
 VALID_CONFIG = {CONF_CAN_BUS: "can0"}
 VALID_LEGACY_CONFIG = {CONF_NAME: "Fröling", CONF_CAN_BUS: "can0"}
@@ -31,3 +42,83 @@ async def test_show_form(hass: HomeAssistant) -> None:
     assert result["type"] == FlowResultType.CREATE_ENTRY
     assert result["title"] == DEFAULT_TITLE
     assert result["data"][CONF_CAN_BUS] == VALID_CONFIG[CONF_CAN_BUS]
+    assert result["data"][CONF_DEVICE_ID] == "Froeling1"
+
+
+async def test_second_boiler(hass: HomeAssistant) -> None:
+    """Test that a second boiler gets its own device id."""
+    MockConfigEntry(domain=DOMAIN, data={**VALID_CONFIG, CONF_DEVICE_ID: "Froeling1"}, version=2).add_to_hass(hass)
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": SOURCE_USER}
+    )
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"],
+        {CONF_CAN_BUS: "can1"},
+    )
+
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert result["title"] == DEFAULT_TITLE + " can1"
+    assert result["data"][CONF_DEVICE_ID] == "Froeling2"
+
+
+async def test_migrate_entry(hass: HomeAssistant) -> None:
+    """Test that existing entries keep the device id of their unique ids."""
+    entry = MockConfigEntry(domain=DOMAIN, data=VALID_CONFIG, version=1)
+    entry.add_to_hass(hass)
+
+    assert await async_migrate_entry(hass, entry)
+    assert entry.version == 2
+    assert entry.data == {**VALID_CONFIG, CONF_DEVICE_ID: "Froeling1"}
+
+
+async def test_options_flow(hass: HomeAssistant) -> None:
+    """Test that the options can be changed."""
+    entry = MockConfigEntry(domain=DOMAIN, data=VALID_CONFIG)
+    entry.add_to_hass(hass)
+
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    assert result["type"] == FlowResultType.FORM
+    assert result["step_id"] == "init"
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        {CONF_ADAPTIVE_PACING: False},
+    )
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert entry.options[CONF_ADAPTIVE_PACING] is False
+
+
+async def test_options_flow_sensor_filter(hass: HomeAssistant) -> None:
+    """Test that the write filter of a sensor can be changed and reset."""
+    entry = MockConfigEntry(domain=DOMAIN, data=VALID_CONFIG, options={
+        CONF_SENSOR_FILTERS: {"geblase_ist": {CONF_DEADBAND: 100}}
+    })
+    entry.add_to_hass(hass)
+
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        {CONF_ADAPTIVE_PACING: True, "sensor": "puffertmp_oben"},
+    )
+    assert result["type"] == FlowResultType.FORM
+    assert result["step_id"] == "sensor"
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        {CONF_DEADBAND: 1, CONF_MIN_INTERVAL: 10},
+    )
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert entry.options[CONF_SENSOR_FILTERS] == {
+        "geblase_ist": {CONF_DEADBAND: 100},
+        "puffertmp_oben": {CONF_DEADBAND: 1, CONF_MIN_INTERVAL: 10},
+    }
+
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        {CONF_ADAPTIVE_PACING: True, "sensor": "geblase_ist"},
+    )
+    result = await hass.config_entries.options.async_configure(result["flow_id"], {})
+    assert entry.options[CONF_SENSOR_FILTERS] == {
+        "puffertmp_oben": {CONF_DEADBAND: 1, CONF_MIN_INTERVAL: 10},
+    }
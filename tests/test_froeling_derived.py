@@ -0,0 +1,89 @@
+"""Test the derived metrics of the froeling heater integration."""
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from custom_components.ha_froeling_euroturbo_40.const import CONF_BUFFER_VOLUME, CONF_CAN_BUS
+from custom_components.ha_froeling_euroturbo_40.derived import (
+    BUFFER_CHARGE_RATE,
+    BUFFER_ENERGY,
+    CHARGE_RATE_TIME_CONSTANT,
+    STATUS_DURATION,
+    FrlngDerivedMetrics,
+)
+from custom_components.ha_froeling_euroturbo_40.sensor import FrlngCANCom
+
+from .test_froeling_sensor import write_lcd_line
+
+
+def test_buffer_energy():
+    """Test the stored energy and the smoothed charge rate."""
+    metrics = FrlngDerivedMetrics(1000, 30)
+    assert metrics.update("puffertmp_oben", 80, 0) == ()
+    assert metrics.update("puffertmp_mitte", 60, 0) == ()
+    assert metrics.update("aussentemperatur", 5, 0) == ()
+    assert metrics.update("puffertmp_unten", 40, 0) == (BUFFER_ENERGY,)
+    # 1000 l at 60° mean, 30 K above empty
+    assert metrics.energy == pytest.approx(34.89)
+    assert metrics.charge_rate is None
+
+    # 3 K more in one layer within a screen, 1 K more on average
+    assert metrics.update("puffertmp_unten", 43, 0) == (BUFFER_ENERGY, BUFFER_CHARGE_RATE)
+    assert metrics.energy == pytest.approx(36.053)
+    assert metrics.charge_rate == pytest.approx(1.163 * 3600 / CHARGE_RATE_TIME_CONSTANT)
+    # the rate decays while the buffer stays the same
+    rate = metrics.charge_rate
+    metrics.update("puffertmp_unten", 43, CHARGE_RATE_TIME_CONSTANT)
+    assert metrics.charge_rate == pytest.approx(rate / 2.718281828)
+    # discharging is negative, a cold buffer is empty
+    for key in ("puffertmp_oben", "puffertmp_mitte", "puffertmp_unten"):
+        metrics.update(key, 20, 2 * CHARGE_RATE_TIME_CONSTANT)
+    assert metrics.energy == 0
+    assert metrics.charge_rate < 0
+
+
+def test_status_duration():
+    """Test the time spent in each kessel_status."""
+    metrics = FrlngDerivedMetrics(1000, 30)
+    assert metrics.status_duration is None
+    assert metrics.update("kessel_status", "Anheizen", 100) == (STATUS_DURATION,)
+    metrics.update("kessel_status", "Anheizen", 130)
+    assert metrics.status_duration == 30
+    metrics.update("kessel_status", "Kessel in Betrieb", 160)
+    metrics.update("kessel_status", "Kessel in Betrieb", 400)
+    assert metrics.status_duration == 240
+    metrics.update("kessel_status", "Anheizen", 500)
+    metrics.update("kessel_status", "Anheizen", 510)
+    assert metrics.status_durations() == {"Anheizen": 70, "Kessel in Betrieb": 340}
+
+
+async def test_derived_sensors(hass):
+    """Test that the derived sensors are written once per parsed screen."""
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting", CONF_BUFFER_VOLUME: 1000}, MagicMock())
+    entities = {entity.entity_description.key: entity for entity in frlng_com.create_derived_entities()}
+    for entity in entities.values():
+        entity.hass = hass
+        entity.entity_id = "sensor.test_" + entity.entity_description.key
+    with patch.object(entities[BUFFER_ENERGY], "async_write_ha_state") as write_energy, \
+            patch.object(entities[BUFFER_CHARGE_RATE], "async_write_ha_state") as write_rate, \
+            patch.object(entities[STATUS_DURATION], "async_write_ha_state") as write_status:
+        write_lcd_line(frlng_com, 0, "Puffertmp. oben 80° ")
+        write_lcd_line(frlng_com, 1, "Puffertmp.mitte 60° ")
+        write_lcd_line(frlng_com, 2, "Puffertmp.unten 40° ")
+        frlng_com.parse_lcd()
+        assert write_energy.call_count == 1
+        assert entities[BUFFER_ENERGY].native_value == 34.9
+        write_lcd_line(frlng_com, 1, "Puffertmp.mitte 63° ")
+        write_lcd_line(frlng_com, 2, "Puffertmp.unten 43° ")
+        frlng_com.parse_lcd()
+        assert write_energy.call_count == 2
+        assert write_rate.call_count == 1
+        assert entities[BUFFER_ENERGY].native_value == 37.2
+        assert entities[BUFFER_CHARGE_RATE].native_value > 0
+        write_status.assert_not_called()
+
+        write_lcd_line(frlng_com, 0, "Kessel in Betrieb   ")
+        frlng_com.parse_lcd()
+        assert write_status.call_count == 1
+        assert entities[STATUS_DURATION].native_value == 0
+        assert entities[STATUS_DURATION].extra_state_attributes == {"Kessel in Betrieb": 0}
@@ -0,0 +1,66 @@
+"""Test the in-memory history of the froeling heater integration."""
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+from custom_components.ha_froeling_euroturbo_40.const import CONF_CAN_BUS, DOMAIN
+from custom_components.ha_froeling_euroturbo_40.history import FrlngHistory, downsample
+from custom_components.ha_froeling_euroturbo_40.sensor import FrlngCANCom
+from custom_components.ha_froeling_euroturbo_40.services import async_setup_services
+
+from .test_froeling_sensor import write_lcd_line
+
+
+def test_ring_buffer_wraps():
+    """Test that the oldest readings are overwritten when the buffer is full."""
+    history = FrlngHistory(4)
+    for second in range(3):
+        history.append(second, second * 10)
+    assert len(history) == 3
+    assert list(history.window()[1]) == [0, 10, 20]
+    for second in range(3, 6):
+        history.append(second, second * 10)
+    assert len(history) == history.size == 4
+    times, values = history.window()
+    assert list(times) == [2, 3, 4, 5]
+    assert list(values) == [20, 30, 40, 50]
+    times, values = history.window(3, 4)
+    assert list(times) == [3, 4]
+    assert list(values) == [30, 40]
+
+
+def test_downsample():
+    """Test that buckets keep mean, min and max of their readings."""
+    times = list(range(10))
+    values = [1, 3, 2, 2, 5, 1, 0, 0, 4, 6]
+    assert downsample(times, values, 10) == {"timestamps": times, "values": values}
+    assert downsample(times, values, 4) == {
+        "timestamps": [0, 3, 6, 9],
+        "values": [2, 8 / 3, 4 / 3, 6],
+        "min": [1, 1, 0, 6],
+        "max": [3, 5, 4, 6],
+    }
+
+
+async def test_history_service(hass):
+    """Test that every parsed reading is kept, also unchanged ones."""
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting"}, MagicMock())
+    hass.data[DOMAIN] = {"entry_id": frlng_com}
+    await async_setup_services(hass)
+    clock = iter(range(1_700_000_000, 1_700_000_100, 10))
+    with patch("custom_components.ha_froeling_euroturbo_40.sensor.time.time", side_effect=lambda: next(clock)):
+        for text in ("Puffertmp. oben 80° ", "Puffertmp. oben 80° ", "Puffertmp. oben 82° ", "Kessel in Betrieb   "):
+            write_lcd_line(frlng_com, 0, text)
+            frlng_com.parse_lcd()
+
+    response = await hass.services.async_call(
+        DOMAIN, "history", {"sensor": "puffertmp_oben"}, blocking=True, return_response=True
+    )
+    assert response == {"timestamps": [1_700_000_000, 1_700_000_010, 1_700_000_020], "values": [80, 80, 82]}
+    response = await hass.services.async_call(
+        DOMAIN, "history",
+        {"sensor": "puffertmp_oben", "start": datetime.fromtimestamp(1_700_000_005, timezone.utc), "points": 1},
+        blocking=True, return_response=True,
+    )
+    assert response == {"timestamps": [1_700_000_010], "values": [81], "min": [80], "max": [82]}
+    # text values are not kept
+    assert frlng_com.get_history("kessel_status") == {"timestamps": [], "values": []}
@@ -0,0 +1,71 @@
+"""Test lcd display parsing for froeling heater integration."""
+import pytest
+
+from custom_components.ha_froeling_euroturbo_40.lcd import (
+    LCD_CHARSET,
+    LCD_DDRAM_INDEX,
+    LCD_LINE_IGNORED,
+    LCD_LINE_TEMPLATES,
+    lcd_decode,
+    parse_lcd_line,
+    parse_number,
+)
+from custom_components.ha_froeling_euroturbo_40.sensor import SENSOR_TYPES
+
+
+def test_template_per_sensor():
+    """Test that every sensor has a line template."""
+    assert sorted(key for key, _, _ in LCD_LINE_TEMPLATES) == sorted(desc.key for desc in SENSOR_TYPES)
+
+
+@pytest.mark.parametrize(
+    ("line", "expected"),
+    [
+        ("Pufferladezust. 80%", ("pufferladezust", 80, "%")),
+        ("Gebläse IST   1500U", ("geblase_ist", 1500, "U")),
+        ("Außentemperatur -1°", ("aussentemperatur", -1, "°")),
+        ("Puffertmp. oben 82°", ("puffertmp_oben", 82, "°")),
+        ("Puffertmp.mitte 72°", ("puffertmp_mitte", 72, "°")),
+        ("Kesseltempsoll  75°", ("kesseltempsoll", 75, "°")),
+        ("Vorlauftmp2 ist 45°", ("vorlauftmp2_ist", 45, "°")),
+        ("Sauerstoffwert 7.5%", ("sauerstoffwert", 7.5, "%")),
+        ("Betriebsstd. 12345", ("betriebsstd", 12345, "None")),
+        ("Heizungspumpe 1 Ein", ("heizungspumpe1", "Ein", "None")),
+        ("Heizungspumpe2  Aus", ("heizungspumpe2", "Aus", "None")),
+        ("Kessel in Betrieb  ", ("kessel_status", "Kessel in Betrieb", "None")),
+        ("Kesseltür ist offen", ("kessel_status", "Kesseltür ist offen", "None")),
+        ("                   ", LCD_LINE_IGNORED),
+        ("HEIZZEITEN 1       ", LCD_LINE_IGNORED),
+        ("Unbekannt 12°      ", None),
+    ],
+)
+def test_parse_lcd_line(line, expected):
+    """Test resolving display lines to key, value and unit."""
+    assert parse_lcd_line(line) == expected
+    if expected:
+        assert type(parse_lcd_line(line)[1]) is type(expected[1])
+
+
+def test_parse_number():
+    """Test converting displayed numbers."""
+    assert parse_number("80") == 80
+    assert parse_number("-1") == -1
+    assert parse_number("7.5") == 7.5
+    assert parse_number("1.2.3") == "1.2.3"
+
+
+def test_lcd_decode():
+    """Test the display charset translation."""
+    assert len(LCD_CHARSET) == 256
+    assert lcd_decode(bytes([0x41, 0xdf, 0xe1, 0xe2, 0xef, 0xf5])) == "A°äßöü"
+    assert lcd_decode(bytes([0x00, 0x01, 0x02])) == "ÄÖÜ"
+
+
+def test_ddram_index():
+    """Test the DDRAM address translation of the 20x4 display."""
+    assert LCD_DDRAM_INDEX[0x00] == 0
+    assert LCD_DDRAM_INDEX[0x40] == 20
+    assert LCD_DDRAM_INDEX[0x14] == 40
+    assert LCD_DDRAM_INDEX[0x54] == 60
+    assert LCD_DDRAM_INDEX[0x67] == 79
+    assert LCD_DDRAM_INDEX[0x28] == -1
@@ -0,0 +1,132 @@
+"""Test the menu polling schedule for froeling heater integration."""
+import pytest
+
+from custom_components.ha_froeling_euroturbo_40.menu import (
+    MENU_HOME,
+    MENU_PAGES,
+    MENU_PAGES_BY_NAME,
+    FrlngButtonCodes,
+    FrlngPollScheduler,
+    MENU_RESYNC,
+    is_burning,
+    menu_path,
+    page_from_sensors,
+    pages_for_sensors,
+)
+
+B = FrlngButtonCodes
+
+
+def visit_all(scheduler, now):
+    """Read all due pages, return the buttons and the pages in order."""
+    buttons = []
+    pages = []
+    while (visit := scheduler.next_visit(now)) is not None:
+        path, page = visit
+        buttons += path + [B.REFRESH_DISPLAY]
+        pages.append(page)
+        scheduler.page_visited(page, now)
+    buttons += scheduler.path_home()
+    return buttons, pages
+
+
+def test_menu_path():
+    """Test shortest paths in the menu graph."""
+    assert menu_path(MENU_HOME, MENU_HOME) == ()
+    assert menu_path(MENU_HOME, (-1, True)) == (B.BUTTON_UP, B.BUTTON_RIGHT)
+    assert menu_path((-2, True), (1, True)) == (B.BUTTON_LEFT, B.BUTTON_LEFT, B.BUTTON_DOWN, B.BUTTON_RIGHT)
+    assert menu_path((8, True), MENU_HOME) == (B.BUTTON_LEFT, B.BUTTON_LEFT)
+
+
+def test_first_round_visits_all_pages():
+    """Test that all pages are due at start and visited from the main menu."""
+    scheduler = FrlngPollScheduler()
+    assert scheduler.due_pages(0) == list(MENU_PAGES)
+    buttons, pages = visit_all(scheduler, 0)
+    assert buttons[:5] == [B.BUTTON_LEFT] * 4 + [B.REFRESH_DISPLAY]
+    assert sorted(page.name for page in pages) == sorted(page.name for page in MENU_PAGES)
+    # not more buttons than the old fixed sequence
+    assert len(buttons) - len(pages) <= 35
+    assert scheduler.node == MENU_HOME
+
+
+def test_hot_pages_are_refreshed_more_often():
+    """Test that only pages with a short interval are due after a round."""
+    scheduler = FrlngPollScheduler()
+    scheduler.set_burning(True)
+    visit_all(scheduler, 0)
+    assert scheduler.due_pages(5) == []
+    buttons, pages = visit_all(scheduler, 10)
+    assert {page.name for page in pages} == {"abgastemps", "geblaese", "sauerstoffwert"}
+    # menu is still in sync, no LEFTs to get back to the main menu
+    assert buttons == [
+        B.BUTTON_UP, B.BUTTON_RIGHT, B.REFRESH_DISPLAY,  # abgastemps
+        B.BUTTON_LEFT, B.BUTTON_LEFT,
+        B.BUTTON_DOWN, B.BUTTON_DOWN, B.BUTTON_DOWN, B.BUTTON_DOWN, B.BUTTON_DOWN,
+        B.BUTTON_RIGHT, B.REFRESH_DISPLAY,  # geblaese
+        B.BUTTON_LEFT, B.BUTTON_DOWN, B.BUTTON_DOWN, B.BUTTON_DOWN,
+        B.BUTTON_RIGHT, B.REFRESH_DISPLAY,  # sauerstoffwert
+        B.BUTTON_LEFT, B.BUTTON_LEFT,
+    ]
+
+
+def test_hot_pages_slow_unless_burning():
+    """Test that the hot pages fall back to their slow interval when the boiler does not burn."""
+    assert is_burning("Anheizen")
+    assert is_burning("Kessel in Betrieb")
+    assert not is_burning("Kessel aus")
+    assert not is_burning(None)
+    scheduler = FrlngPollScheduler()
+    visit_all(scheduler, 0)
+    assert scheduler.due_pages(10) == []
+    assert {page.name for page in scheduler.due_pages(30)} == {"hauptmenue", "kesseltemps"}
+    scheduler.set_burning(True)
+    assert {page.name for page in scheduler.due_pages(30)} == {
+        "hauptmenue", "abgastemps", "kesseltemps", "geblaese", "stellmotor_oben", "stellmotor_unten", "sauerstoffwert"}
+    scheduler.set_burning(False)
+    assert "sauerstoffwert" in {page.name for page in scheduler.due_pages(300)}
+
+
+def test_requested_pages_first():
+    """Test that requested pages are read before due pages."""
+    scheduler = FrlngPollScheduler()
+    scheduler.request_pages(pages_for_sensors(["puffertmp_unten", "sauerstoffwert"]))
+    _, page = scheduler.next_visit(0)
+    assert page == MENU_PAGES_BY_NAME["puffertemps"]
+    scheduler.page_visited(page, 0)
+    path, page = scheduler.next_visit(0)
+    assert page == MENU_PAGES_BY_NAME["sauerstoffwert"]
+    assert path == [B.BUTTON_LEFT] + [B.BUTTON_DOWN] * 8 + [B.BUTTON_RIGHT]
+    with pytest.raises(KeyError):
+        pages_for_sensors(["unknown"])
+
+
+def test_page_from_sensors():
+    """Test that the page left by a user is found from the sensors on the display."""
+    assert page_from_sensors(["kessel_status", "pufferladezust"]) == MENU_PAGES_BY_NAME["hauptmenue"]
+    assert page_from_sensors(
+        ["puffertmp_oben", "puffertmp_mitte", "puffertmp_unten"]
+    ) == MENU_PAGES_BY_NAME["puffertemps"]
+    # a part of a page or an unknown screen
+    assert page_from_sensors(["puffertmp_oben"]) is None
+    assert page_from_sensors([]) is None
+
+    scheduler = FrlngPollScheduler()
+    scheduler.page_detected(MENU_PAGES_BY_NAME["vorlauf"], 0)
+    assert scheduler.node == (3, True)
+    scheduler.page_visited(MENU_PAGES_BY_NAME["vorlauf"], 0)
+    path, page = scheduler.next_visit(0)
+    # continues from the page without resync
+    assert path[:len(MENU_RESYNC)] != list(MENU_RESYNC)
+    assert path[0] == B.BUTTON_LEFT
+
+
+def test_passive_sensors_not_scraped():
+    """Test that pages with only passive sensors are not due."""
+    scheduler = FrlngPollScheduler()
+    scheduler.set_passive_sensors(frozenset(("aussentemperatur", "geblase_ist", "pufferladezust")))
+    due = [page.name for page in scheduler.due_pages(0)]
+    assert "geblaese_menue" not in due
+    assert "geblaese" not in due
+    # the other sensor of the page is still read from the display
+    assert "hauptmenue" in due
@@ -0,0 +1,70 @@
+"""Test the passive decoding of the froeling heater integration."""
+import time
+from unittest.mock import MagicMock
+
+import can
+
+from custom_components.ha_froeling_euroturbo_40.const import CONF_CAN_BUS, CONF_DECODE_IN_THREAD, CONF_PASSIVE
+from custom_components.ha_froeling_euroturbo_40.passive import FrlngPassiveDecoder, FrlngPassiveField
+from custom_components.ha_froeling_euroturbo_40.sensor import FrlngCANCom
+
+from .test_froeling_sensor import wait_for_condition, write_lcd_line
+
+OUTSIDE_TEMP = FrlngPassiveField("aussentemperatur", 0x0c0, 2, signed=True)
+
+
+def test_frame_statistics():
+    """Test that the ids are ranked by payload changes."""
+    decoder = FrlngPassiveDecoder((OUTSIDE_TEMP, FrlngPassiveField("geblase_ist", 0x040, 0, 2, scale=10)))
+    for second in range(10):
+        decoder.frame(0x022, bytes([1, 2, 3]), second)
+        decoder.frame(0x040, bytes([0, 180, second % 2]), second)
+    assert decoder.frame(0x0c0, bytes([7, 7, 0xfb]), 10) == [("aussentemperatur", -5)]
+    assert decoder.frame(0x0c0, bytes([7, 7, 0xfb]), 11) == []
+    assert decoder.frame(0x0c0, bytes([7]), 12) == []
+
+    ranking = decoder.ranking()
+    assert [entry["arb_id"] for entry in ranking] == ["0x40", "0xc0", "0x22"]
+    assert ranking[0]["change_ratio"] == 1
+    assert ranking[0]["byte_changes"][:3] == [0, 0, 9]
+    assert ranking[0]["payloads"] == 2
+    assert ranking[0]["frame_rate"] == 1
+    assert ranking[2]["change_ratio"] == 0
+    assert decoder.keys == {"aussentemperatur", "geblase_ist"}
+    assert decoder.sensors(12, 60) == {"aussentemperatur", "geblase_ist"}
+    assert decoder.sensors(80, 60) == set()
+
+
+async def test_passive_mode(hass):
+    """Test that mapped sensors are read from the frames and their display lines are ignored."""
+    for decode_in_thread in (False, True):
+        frlng_com = FrlngCANCom(hass, {
+            CONF_CAN_BUS: "unittesting_passive", CONF_PASSIVE: True, CONF_DECODE_IN_THREAD: decode_in_thread
+        }, MagicMock())
+        frlng_com._passive = FrlngPassiveDecoder((OUTSIDE_TEMP,))
+        await hass.async_add_executor_job(frlng_com.init_can)
+        frlng_com.add_bus_to_reader()
+        with can.Bus("test_can_passive", interface="virtual") as board:
+            board.send(can.Message(arbitration_id=0x0c0, is_extended_id=False, data=[0, 0, 0xfb, 0]))
+            board.send(can.Message(arbitration_id=0x040, is_extended_id=False, data=[1]))
+            # both frames are counted, they may be handled in separate batches
+            await wait_for_condition(lambda: frlng_com.get_value("aussentemperatur") == -5
+                                     and frlng_com._passive.stats[0x040].frames == 1, timeout=5)
+        await frlng_com.can_stop_update()
+        assert frlng_com.unknown_frames == 0
+        statistics = frlng_com.passive_statistics()
+        assert {entry["arb_id"]: entry["frames"] for entry in statistics["ranking"]} == {
+            "0xc0": 1, "0x40": 1, "0x22": 0
+        }
+
+    # as the send loop does, the display is not scraped for the sensor
+    frlng_com._passive_sensors = frozenset(frlng_com._passive.sensors(time.monotonic(), 60))
+    assert await frlng_com.async_refresh(["aussentemperatur"]) == {"aussentemperatur": -5}
+    frlng_com._decode_in_thread = False
+    write_lcd_line(frlng_com, 0, "Außentemperatur 3°  ")
+    frlng_com.parse_lcd()
+    assert frlng_com.get_value("aussentemperatur") == -5
+    frlng_com._passive_sensors = frozenset()
+    write_lcd_line(frlng_com, 0, "Außentemperatur 3°  ")
+    frlng_com.parse_lcd()
+    assert frlng_com.get_value("aussentemperatur") == 3
@@ -0,0 +1,70 @@
+"""Test the raw SocketCAN receive engine of the froeling heater integration."""
+import asyncio
+import socket
+import struct
+from unittest.mock import MagicMock
+
+import can
+
+from custom_components.ha_froeling_euroturbo_40.const import CONF_CAN_BUS
+from custom_components.ha_froeling_euroturbo_40.rawcan import (
+    CAN_FRAME,
+    CAN_FILTER_MASK,
+    FrlngRawCANSocket,
+    iter_can_frames,
+    pack_can_filters,
+)
+from custom_components.ha_froeling_euroturbo_40.reader import FrlngCANReader
+from custom_components.ha_froeling_euroturbo_40.sensor import FrlngCANArbID, FrlngCANCom
+
+
+def raw_socket():
+    """Raw engine on one end of a datagram socket pair instead of a CAN socket."""
+    sock, peer = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    return FrlngRawCANSocket("can0", FrlngCANArbID, sock=sock), peer
+
+
+def test_pack_can_filters():
+    """Test the CAN_RAW_FILTER option."""
+    packed = pack_can_filters(FrlngCANArbID)
+    assert len(packed) == 8 * len(FrlngCANArbID)
+    assert struct.unpack_from("=II", packed) == (FrlngCANArbID.CMD_TIME, CAN_FILTER_MASK)
+
+
+def test_read_and_send_frames():
+    """Test that frames are read in batches and sent as can_frame structs."""
+    frlng_socket, peer = raw_socket()
+    assert frlng_socket.read_frames() == b""
+    peer.send(CAN_FRAME.pack(0x021, 2, bytes([0x00, 0x80])))
+    peer.send(CAN_FRAME.pack(0x021, 1, b"K"))
+    peer.send(b"too short")
+    frames = list(iter_can_frames(frlng_socket.read_frames()))
+    assert frames == [(0x021, 2, bytes([0x00, 0x80]) + bytes(6)), (0x021, 1, b"K" + bytes(7))]
+
+    frlng_socket.send(can.Message(arbitration_id=0x02f, is_extended_id=False, data=[0x08]))
+    assert CAN_FRAME.unpack(peer.recv(64)) == (0x02f, 1, b"\x08" + bytes(7))
+    frlng_socket.shutdown()
+    peer.close()
+
+
+async def test_reader_raw_socket(hass):
+    """Test display lines received through the shared reader and the raw engine."""
+    add_entities = MagicMock()
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "can0"}, add_entities)
+    frlng_socket, peer = raw_socket()
+    reader = FrlngCANReader(hass)
+    reader.add_bus(frlng_socket, frlng_com.can_frames_receive)
+
+    peer.send(CAN_FRAME.pack(0x021, 2, bytes([0x00, 0xc0])))
+    for char in b"Pufferladezust. 80% ":
+        peer.send(CAN_FRAME.pack(0x021, 1, bytes([char])))
+    for _ in range(50):
+        await asyncio.sleep(0.02)
+        if frlng_com.received_frames == 21:
+            break
+    frlng_com.parse_lcd()
+    assert frlng_com.get_value("pufferladezust") == 80
+
+    await hass.async_add_executor_job(reader.remove_bus, frlng_socket)
+    frlng_socket.shutdown()
+    peer.close()
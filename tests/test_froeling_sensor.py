@@ -1,8 +1,18 @@
 """Test sensor for froeling heater integration."""
-from pytest_homeassistant_custom_component.common import MockConfigEntry
-from custom_components.ha_froeling_euroturbo_40.const import (DOMAIN, CONF_CAN_BUS,)
-from custom_components.ha_froeling_euroturbo_40.sensor import FrlngButtonCodes
+from pytest_homeassistant_custom_component.common import (MockConfigEntry, async_fire_time_changed,
+                                                          mock_restore_cache_with_extra_data)
+from homeassistant.core import State
+from custom_components.ha_froeling_euroturbo_40.const import (DOMAIN, CONF_ADAPTIVE_PACING, CONF_CAN_BUS,
+                                                             CONF_DEVICE_ID, CONF_USER_IDLE, DATA_READER,)
+from custom_components.ha_froeling_euroturbo_40 import sensor
+from custom_components.ha_froeling_euroturbo_40.sensor import FrlngButtonCodes, FrlngCANCom
+from custom_components.ha_froeling_euroturbo_40.services import async_setup_services
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
+import pytest
+from unittest.mock import MagicMock, patch
 import asyncio
+import time
 import can
 
 def send_can_string(test_can, line, text):
@@ -33,6 +43,12 @@ def send_can_string(test_can, line, text):
     msg = can.Message(arbitration_id=0x021, is_extended_id=False, data=[0x00,display_offsets[line]])
     test_can.send(msg)
 
+def get_sensor_state(hass, key, dev_id="Froeling1"):
+    entity_id = er.async_get(hass).async_get_entity_id("sensor", DOMAIN, dev_id + "_" + key)
+    if entity_id is None:
+        return None
+    return hass.states.get(entity_id)
+
 async def test_sensor(hass):
     """Test sensor."""
     entry = MockConfigEntry(domain=DOMAIN, data={
@@ -59,13 +75,13 @@ async def test_sensor(hass):
     msg = await reader.get_message()
     while msg.data[0] != FrlngButtonCodes.BUTTON_RIGHT:
         msg = await reader.get_message()
-    state = hass.states.get("sensor.froling_euroturbo40_none_2")
+    state = get_sensor_state(hass, "pufferladezust")
     assert state
     assert state.state == "80"
-    state = hass.states.get("sensor.froling_euroturbo40_none_3")
+    state = get_sensor_state(hass, "geblase_ist")
     assert state
     assert state.state == "1500"
-    state = hass.states.get("sensor.froling_euroturbo40_temperature")
+    state = get_sensor_state(hass, "aussentemperatur")
     assert state
     assert state.state == "-1"
 
@@ -82,14 +98,14 @@ async def test_sensor(hass):
     msg = await reader.get_message()
     while msg.data[0] != FrlngButtonCodes.BUTTON_RIGHT:
         msg = await reader.get_message()
-    await asyncio.sleep(2.1)
-    state = hass.states.get("sensor.froling_euroturbo40_temperature_2") 
+    await wait_for_condition(lambda: get_sensor_state(hass, "puffertmp_unten").state == "62", timeout=5)
+    state = get_sensor_state(hass, "puffertmp_oben")
     assert state
     assert state.state == "82"
-    state = hass.states.get("sensor.froling_euroturbo40_temperature_3")
+    state = get_sensor_state(hass, "puffertmp_mitte")
     assert state
     assert state.state == "72"
-    state = hass.states.get("sensor.froling_euroturbo40_temperature_4")
+    state = get_sensor_state(hass, "puffertmp_unten")
     assert state
     assert state.state == "62"
     
@@ -108,7 +124,7 @@ async def test_sensor(hass):
     while msg.data[0] != FrlngButtonCodes.BUTTON_RIGHT:
         msg = await reader.get_message()
 
-    state = hass.states.get("sensor.froling_euroturbo40_none")
+    state = get_sensor_state(hass, "kessel_status")
     assert state
     assert state.state == "Kesseltür ist offen"
         
@@ -116,3 +132,455 @@ async def test_sensor(hass):
     notifier.stop()
     test_can.shutdown()
     await hass.config_entries.async_remove(entry.entry_id)
+
+async def test_sensor_states_written(hass):
+    """Test that the parsed lines are accepted as states of the real entities."""
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_CAN_BUS: "unittesting_states"})
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    frlng_com = hass.data[DOMAIN][entry.entry_id]
+    write_lcd_line(frlng_com, 0, "Rücklaufmischer 40% ")
+    write_lcd_line(frlng_com, 1, "Kesselrücklauft.65° ")
+    write_lcd_line(frlng_com, 2, "Heizungspumpe 1 Ein ")
+    frlng_com.parse_lcd()
+    state = get_sensor_state(hass, "rucklaufmischer")
+    assert state.state == "40"
+    assert state.attributes["unit_of_measurement"] == "%"
+    assert get_sensor_state(hass, "kesselrucklauft").state == "65"
+    assert get_sensor_state(hass, "heizungspumpe1").state == "Ein"
+    await hass.config_entries.async_remove(entry.entry_id)
+
+def write_lcd_line(frlng_com, line, text):
+    """Feed a display line directly into the receive handler."""
+    display_offsets = [0x80,0xc0,0x94,0xd4]
+    frlng_com.can_msg_receive(can.Message(arbitration_id=0x021, is_extended_id=False, data=[0x00,display_offsets[line]]))
+    lcd_codes = {'°': 0xdf, 'ß': 0xe2, 'ä': 0xe1, 'ü': 0xf5}
+    for char in text:
+        data = [lcd_codes[char]] if char in lcd_codes else bytes(char,"ascii")
+        frlng_com.can_msg_receive(can.Message(arbitration_id=0x021, is_extended_id=False, data=data))
+
+async def test_parse_only_dirty_lines(hass):
+    """Test that unchanged display lines are not parsed again."""
+    add_entities = MagicMock()
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting"}, add_entities)
+    frlng_com.create_sensor_entities()
+    write_lcd_line(frlng_com, 1, "Pufferladezust. 80% ")
+    frlng_com.parse_lcd()
+    assert frlng_com.get_value("pufferladezust") == 80
+    assert frlng_com._lcd_dirty == [False, False, False, False]
+
+    with patch.object(sensor.FrlngEntity, "handle_new_value") as dispatch:
+        frlng_com.parse_lcd()
+        # same content written again, line is dirty but text did not change
+        write_lcd_line(frlng_com, 1, "Pufferladezust. 80% ")
+        assert frlng_com._lcd_dirty[1]
+        frlng_com.parse_lcd()
+        dispatch.assert_not_called()
+        write_lcd_line(frlng_com, 1, "Pufferladezust. 85% ")
+        frlng_com.parse_lcd()
+        dispatch.assert_called_once()
+        assert dispatch.call_args[0] == (85, "%")
+
+async def test_screen_updates_batched(hass):
+    """Test that all values of one screen are applied in a single pass."""
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting"}, MagicMock())
+    entities = {entity.my_name: entity for entity in frlng_com.create_sensor_entities()}
+    write_lcd_line(frlng_com, 0, "Puffertmp. oben 82° ")
+    write_lcd_line(frlng_com, 1, "Pufferladezust. 80% ")
+    write_lcd_line(frlng_com, 2, "Kessel in Betrieb   ")
+    with patch.object(frlng_com, "apply_screen_updates") as apply:
+        frlng_com.parse_lcd()
+        apply.assert_called_once()
+        assert apply.call_args[0][0] == [
+            (entities["puffertmp_oben"], 82, "°"),
+            (entities["pufferladezust"], 80, "%"),
+            (entities["kessel_status"], "Kessel in Betrieb", "None"),
+        ]
+        # nothing changed, no pass at all
+        frlng_com.parse_lcd()
+        apply.assert_called_once()
+
+async def test_failing_entity_isolated(hass):
+    """Test that an entity failing to write does not stop the other lines of the screen."""
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting"}, MagicMock())
+    entities = {entity.my_name: entity for entity in frlng_com.create_sensor_entities()}
+    write_lcd_line(frlng_com, 0, "Puffertmp. oben 82° ")
+    write_lcd_line(frlng_com, 1, "Pufferladezust. 80% ")
+    with patch.object(entities["puffertmp_oben"], "handle_new_value", side_effect=ValueError("bad state")):
+        frlng_com.parse_lcd()
+    assert entities["pufferladezust"].native_value == 80
+
+async def test_wait_display_refresh(hass):
+    """Test that a complete redraw ends the wait before the timeout."""
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting"}, MagicMock())
+    frlng_com.start_display_refresh()
+    for line in range(4):
+        write_lcd_line(frlng_com, line, "Puffertmp. oben 82° ")
+    assert frlng_com._display_complete.is_set()
+    start = time.monotonic()
+    await frlng_com.wait_display_refresh()
+    assert time.monotonic() - start < 0.05
+
+    # partial redraw, wait until the display has settled
+    frlng_com.start_display_refresh()
+    write_lcd_line(frlng_com, 0, "Kessel in Betrieb   ")
+    start = time.monotonic()
+    await frlng_com.wait_display_refresh()
+    assert 0.1 <= time.monotonic() - start < 0.5
+
+async def test_adaptive_button_pacing(hass):
+    """Test that a button is released as soon as the display answers."""
+    assert not FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting"}, MagicMock())._adaptive_pacing
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting", CONF_ADAPTIVE_PACING: True}, MagicMock())
+    frlng_com._can = MagicMock()
+
+    def answer_press(msg, timeout=None):
+        # the display answers 20 ms after the press is on the bus
+        if msg.data[0] != FrlngButtonCodes.BUTTON_NO_BUT:
+            hass.loop.call_soon_threadsafe(hass.loop.call_later, 0.02, write_lcd_line, frlng_com, 0,
+                                           "Kessel in Betrieb   ")
+
+    frlng_com._can.send.side_effect = answer_press
+    start = time.monotonic()
+    await frlng_com.send_button(FrlngButtonCodes.BUTTON_DOWN)
+    assert time.monotonic() - start < 0.15 + 0.25
+    assert frlng_com._can.send.call_count == 2
+    assert 0 < frlng_com.button_round_trip < 100
+    assert frlng_com._button_echo_timeouts == 0
+
+    # an answer right away, the button is still hold down for the min time
+    release = MagicMock(side_effect=lambda msg, timeout=None: release.times.append(time.monotonic()))
+    release.times = []
+    frlng_com._can.send = release
+    hass.loop.call_soon(write_lcd_line, frlng_com, 0, "Kessel in Betrieb   ")
+    await frlng_com.send_button(FrlngButtonCodes.BUTTON_DOWN)
+    assert release.times[1] - release.times[0] >= sensor.BUTTON_MIN_PRESS_TIME
+
+    # only a redraw starting at the first row answers, no answer falls back to the fixed timing
+    hass.loop.call_later(0.02, write_lcd_line, frlng_com, 1, "Pufferladezust. 80% ")
+    await frlng_com.send_button(FrlngButtonCodes.BUTTON_DOWN)
+    assert frlng_com._button_echo_timeouts == 1
+    await frlng_com.transmitter.async_stop()
+
+async def test_display_out_of_range_address(hass):
+    """Test that chars for an invalid display address are dropped."""
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting"}, MagicMock())
+    frlng_com.can_msg_receive(can.Message(arbitration_id=0x021, is_extended_id=False, data=[0x01,0xf0]))
+    frlng_com.can_msg_receive(can.Message(arbitration_id=0x021, is_extended_id=False, data=b"X"))
+    assert frlng_com._lcd_invalid_addr == 1
+    assert frlng_com._lcd_buf == bytearray(b" " * 80)
+
+    write_lcd_line(frlng_com, 2, "Außentemperatur -1° ")
+    assert frlng_com._lcd_buf[40:60] == b"Au\xe2entemperatur -1\xdf "
+
+async def test_refresh_service(hass, monkeypatch):
+    """Test that the refresh service reads the requested page right away."""
+    monkeypatch.setattr(sensor, "BUTTON_PRESS_TIME", 0.001)
+    monkeypatch.setattr(sensor, "BUTTON_RELEASE_TIME", 0.001)
+    monkeypatch.setattr(sensor, "DISPLAY_REFRESH_TIMEOUT", 0.01)
+    add_entities = MagicMock()
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting"}, add_entities)
+    frlng_com._can = MagicMock()
+    pressed = []
+    frlng_com._can.send.side_effect = lambda msg, timeout=None: pressed.append(msg.data[0])
+    hass.data[DOMAIN] = {"entry_id": frlng_com}
+    await async_setup_services(hass)
+    # all pages read recently, the loop only serves the request
+    scheduler = frlng_com._scheduler
+    while (visit := scheduler.next_visit(time.monotonic())) is not None:
+        scheduler.page_visited(visit[1], time.monotonic())
+    scheduler.path_home()
+    write_lcd_line(frlng_com, 1, "Sauerstoffwert 7.5% ")
+    frlng_com._send_running = True
+    task = hass.async_create_task(frlng_com.send_loop())
+
+    response = await hass.services.async_call(
+        DOMAIN, "refresh", {"sensors": ["sauerstoffwert"]}, blocking=True, return_response=True
+    )
+    assert response == {"sensors": {"sauerstoffwert": 7.5}}
+    assert pressed[:18:2] == [FrlngButtonCodes.BUTTON_DOWN] * 8 + [FrlngButtonCodes.BUTTON_RIGHT]
+    frlng_com._send_running = False
+    await task
+    await frlng_com.transmitter.async_stop()
+
+async def test_diagnostic_sensors(hass):
+    """Test the counters of the diagnostic sensors."""
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting"}, MagicMock())
+    assert frlng_com.receive_callback_time is None
+    assert frlng_com.data_ages() == {}
+    frlng_com.can_msg_receive(can.Message(arbitration_id=0x123, is_extended_id=False, data=[1]))
+    frlng_com.can_msg_receive(can.Message(arbitration_id=0x0c0, is_extended_id=False, data=[1]))
+    assert frlng_com.unknown_frames == 1
+    assert frlng_com.unknown_arb_ids == {0x123}
+    assert frlng_com.received_frames == 2
+    assert frlng_com.receive_callback_time > 0
+    write_lcd_line(frlng_com, 0, "Pufferladezust. 80% ")
+    write_lcd_line(frlng_com, 1, "Unbekannte Zeile 12 ")
+    frlng_com.parse_lcd()
+    assert frlng_com.parse_failures == 1
+    assert frlng_com.last_unknown_line.strip() == "Unbekannte Zeile 12"
+    assert list(frlng_com.data_ages()) == ["pufferladezust"]
+    assert frlng_com.sample_display_frame_rate() > 0
+
+    entities = {
+        description.key: sensor.FrlngDiagnosticEntity(frlng_com, description)
+        for description in sensor.DIAGNOSTIC_SENSOR_TYPES
+    }
+    for entity in entities.values():
+        await entity.async_update()
+    assert entities["unknown_frames"].native_value == 1
+    assert entities["unknown_frames"].extra_state_attributes == {"arbitration_ids": ["0x123"]}
+    assert entities["parse_failures"].native_value == 1
+    assert entities["data_age"].native_value == 0
+    assert entities["sweep_duration"].native_value is None
+    assert entities["data_age"].entity_category == sensor.EntityCategory.DIAGNOSTIC
+    # the high churn diagnostics are disabled by default and their changing attributes are not recorded
+    assert not entities["data_age"].entity_registry_enabled_default
+    assert entities["parse_failures"].entity_registry_enabled_default
+    assert {"pufferladezust", "frames", "sent"} <= entities["data_age"]._unrecorded_attributes
+    assert "last_unknown_line" not in entities["parse_failures"]._unrecorded_attributes
+
+async def test_two_boilers(hass):
+    """Test two boilers on separate buses read by one shared reader."""
+    entries = [
+        MockConfigEntry(domain=DOMAIN, data={CONF_CAN_BUS: "unittesting", CONF_DEVICE_ID: "Froeling1"}, version=2),
+        MockConfigEntry(domain=DOMAIN, data={CONF_CAN_BUS: "unittesting2", CONF_DEVICE_ID: "Froeling2"}, version=2),
+    ]
+    for entry in entries:
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    assert set(hass.data[DOMAIN]) == {entry.entry_id for entry in entries}
+    assert hass.data[DATA_READER].bus_count == 2
+
+    test_can = can.interface.Bus('test_can', interface='virtual')
+    test_can2 = can.interface.Bus('test_can2', interface='virtual')
+    send_can_string(test_can, 1, "Pufferladezust. 40% ")
+    send_can_string(test_can2, 1, "Pufferladezust. 90% ")
+    for _ in range(40):
+        await asyncio.sleep(0.1)
+        state = get_sensor_state(hass, "pufferladezust")
+        state2 = get_sensor_state(hass, "pufferladezust", "Froeling2")
+        if state.state == "40" and state2.state == "90":
+            break
+    assert state.state == "40"
+    assert state2.state == "90"
+
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(
+            DOMAIN, "refresh", {"sensors": ["pufferladezust"]}, blocking=True, return_response=True
+        )
+
+    test_can.shutdown()
+    test_can2.shutdown()
+    await hass.config_entries.async_unload(entries[0].entry_id)
+    assert hass.services.has_service(DOMAIN, "refresh")
+    await hass.config_entries.async_unload(entries[1].entry_id)
+    assert hass.data[DOMAIN] == {}
+    # the services are removed with the last boiler
+    assert not hass.services.has_service(DOMAIN, "refresh")
+    assert not hass.services.has_service(DOMAIN, "unpark")
+    assert hass.data[DATA_READER].bus_count == 0
+
+async def test_sensor_write_filter(hass, freezer):
+    """Test deadband and min write interval of the state writes."""
+    def advance(seconds):
+        # time.monotonic of the entity and the loop time of its timers are frozen
+        freezer.tick(seconds)
+        async_fire_time_changed(hass)
+
+    entity = sensor.FrlngEntity("Froeling1", sensor.SENSORS["puffertmp_oben"], "puffertmp_oben", "°", None,
+                                deadband=2, min_interval=20)
+    entity.hass = hass
+    entity.entity_id = "sensor.test_puffertmp_oben"
+    with patch.object(entity, "async_write_ha_state") as write_state:
+        await entity.async_added_to_hass()
+        send = lambda value: entity.handle_new_value(value, "°")
+        # the first value is written at once
+        send(60)
+        assert write_state.call_count == 1
+        advance(20)
+        # flickering by one degree is not written
+        send(61)
+        send(60)
+        advance(30)
+        assert write_state.call_count == 1
+        # a small change is written after the interval
+        send(61)
+        advance(10)
+        assert write_state.call_count == 1
+        advance(10)
+        assert write_state.call_count == 2
+        # a big change is written at once, the next one not before the interval is over
+        advance(20)
+        send(70)
+        assert write_state.call_count == 3
+        send(80)
+        assert write_state.call_count == 3
+        send(81)
+        advance(10)
+        assert write_state.call_count == 3
+        advance(10)
+        assert write_state.call_count == 4
+        assert entity.native_value == 81
+        # values of a parked page are written at once
+        entity.handle_new_value(82, "°", True)
+        assert write_state.call_count == 5
+        await entity.async_will_remove_from_hass()
+
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting", "sensor_filters": {"geblase_ist": {"deadband": 10}}},
+                            MagicMock())
+    assert frlng_com.sensor_filter(sensor.SENSORS["geblase_ist"]) == (10, 30)
+    assert frlng_com.sensor_filter(sensor.SENSORS["kessel_status"]) == (0, 0)
+
+async def test_last_read_refreshed(hass):
+    """Test that last_read moves when an unchanged value is read again."""
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting"}, MagicMock())
+    entity = {entity.my_name: entity for entity in frlng_com.create_sensor_entities()}["puffertmp_oben"]
+    entity.hass = hass
+    entity.entity_id = "sensor.test_puffertmp_oben"
+    with patch.object(entity, "async_write_ha_state") as write_state:
+        write_lcd_line(frlng_com, 0, "Puffertmp. oben 82° ")
+        frlng_com.parse_lcd()
+        assert write_state.call_count == 1
+        # redrawn with the same text, last_read moves but is not written within the interval
+        old_read = entity._last_read = sensor.dt_util.utcnow() - sensor.timedelta(hours=1)
+        write_lcd_line(frlng_com, 0, "Puffertmp. oben 82° ")
+        frlng_com.parse_lcd()
+        assert entity.extra_state_attributes["last_read"] > old_read
+        assert write_state.call_count == 1
+        # after the interval the unchanged value is written with its last_read
+        entity._last_write -= sensor.LAST_READ_INTERVAL
+        write_lcd_line(frlng_com, 0, "Puffertmp. oben 82° ")
+        frlng_com.parse_lcd()
+        assert write_state.call_count == 2
+        # the same holds for a reading equal to the written value
+        entity.handle_new_value(82, "°")
+        assert write_state.call_count == 2
+        entity._last_write -= sensor.LAST_READ_INTERVAL
+        entity.handle_new_value(82, "°")
+        assert write_state.call_count == 3
+
+async def test_transmit_queue(hass, monkeypatch):
+    """Test that sending retries bus errors and never blocks the event loop."""
+    monkeypatch.setattr(sensor, "TX_ERROR_BACKOFF", 0.01)
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting"}, MagicMock())
+    frlng_com._can = MagicMock()
+    frlng_com._can.send.side_effect = [can.CanOperationError("Transmit buffer full"), None]
+    assert await frlng_com.transmitter.async_send(can.Message(arbitration_id=0x02f, data=[0x01]))
+    assert frlng_com.transmitter.errors == 1
+    assert frlng_com.transmitter.retries == 1
+    assert frlng_com.transmitter.sent == 1
+
+    # the bus is gone, the sequence is aborted
+    frlng_com._can.send.side_effect = can.CanOperationError("Network is down")
+    frlng_com._send_running = True
+    assert not await frlng_com.send_buttons([FrlngButtonCodes.BUTTON_DOWN, FrlngButtonCodes.BUTTON_DOWN])
+    assert frlng_com.transmitter.failed == 1
+
+    # a blocking send runs in the TX thread, the loop keeps running
+    frlng_com._can.send.side_effect = lambda msg, timeout=None: time.sleep(0.2)
+    send = hass.async_create_task(frlng_com.transmitter.async_send(can.Message(arbitration_id=0x02f, data=[0x01])))
+    start = time.monotonic()
+    await asyncio.sleep(0.01)
+    assert time.monotonic() - start < 0.1
+    assert await send
+    await frlng_com.transmitter.async_stop()
+
+async def test_restored_sensors(hass):
+    """Test that all sensors are there at startup with their last values."""
+    entity_id = er.async_get(hass).async_get_or_create(
+        "sensor", DOMAIN, "Froeling1_puffertmp_oben", suggested_object_id="puffer_oben"
+    ).entity_id
+    mock_restore_cache_with_extra_data(hass, [(
+        State(entity_id, "55", {"last_read": "2024-05-01T10:00:00+00:00"}),
+        {"native_value": 55, "native_unit_of_measurement": "°C"},
+    )])
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_CAN_BUS: "unittesting"})
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    for entity_description in sensor.SENSOR_TYPES:
+        assert get_sensor_state(hass, entity_description.key) is not None
+    state = hass.states.get(entity_id)
+    assert state.state == "55"
+    assert state.attributes["last_read"].isoformat() == "2024-05-01T10:00:00+00:00"
+    assert hass.data[DOMAIN][entry.entry_id].get_value("puffertmp_oben") is None
+
+    await hass.config_entries.async_unload(entry.entry_id)
+
+async def wait_for_condition(condition, timeout=2):
+    """Wait until condition() is true."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+
+async def test_bus_watchdog(hass, monkeypatch):
+    """Test that a silent or broken bus is reopened and the sensors are unavailable meanwhile."""
+    monkeypatch.setattr(sensor, "BUS_TIMEOUT", 0.2)
+    monkeypatch.setattr(sensor, "WATCHDOG_INTERVAL", 0.02)
+    monkeypatch.setattr(sensor, "RECONNECT_BACKOFF_MIN", 0.02)
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting"}, MagicMock())
+    entity = frlng_com.create_sensor_entities()[0]
+    # the interface is down at setup
+    with patch.object(sensor.can, "Bus", side_effect=OSError("Network is down")):
+        await hass.async_add_executor_job(frlng_com.init_can)
+    assert frlng_com._can is None
+    assert frlng_com.last_bus_error == "Network is down"
+    await frlng_com.can_start_update()
+    # no button sequences, only the watchdog
+    frlng_com._send_running = False
+    try:
+        await wait_for_condition(lambda: frlng_com._can is not None)
+        assert not entity.available
+        assert frlng_com.bus_reconnects == 1
+
+        controller = can.Bus("test_can", interface="virtual")
+        controller.send(can.Message(arbitration_id=0x018, is_extended_id=False, data=[0x12, 0x30]))
+        await wait_for_condition(lambda: frlng_com.bus_alive)
+        assert entity.available
+
+        # no frames, the controller was reset
+        await wait_for_condition(lambda: not frlng_com.bus_alive)
+        assert not entity.available
+        await wait_for_condition(lambda: frlng_com.bus_reconnects >= 2 and frlng_com._can is not None)
+
+        # receiving fails, the bus is reopened right away
+        controller.send(can.Message(arbitration_id=0x018, is_extended_id=False, data=[0x12, 0x31]))
+        await wait_for_condition(lambda: frlng_com.bus_alive)
+        reconnects = frlng_com.bus_reconnects
+        with patch.object(frlng_com._can, "recv", side_effect=can.CanOperationError("Bus off")):
+            await wait_for_condition(lambda: frlng_com.bus_reconnects > reconnects, timeout=0.15)
+        assert frlng_com.last_bus_error == "Bus off"
+        controller.shutdown()
+    finally:
+        await frlng_com.can_stop_update()
+    assert hass.data[DATA_READER].bus_count == 0
+
+async def test_user_button_press(hass):
+    """Test that only user presses pause polling and polling resumes on the page the user left."""
+    frlng_com = FrlngCANCom(hass, {CONF_CAN_BUS: "unittesting", CONF_USER_IDLE: 0.2}, MagicMock())
+    button = lambda code: can.Message(arbitration_id=0x02f, is_extended_id=False, data=[code])
+    # echo of our own press
+    frlng_com._own_buttons.append((FrlngButtonCodes.BUTTON_DOWN, time.monotonic()))
+    frlng_com.can_msg_receive(button(FrlngButtonCodes.BUTTON_DOWN))
+    assert frlng_com.user_presses == 0
+    assert not frlng_com._pause_buttonsseq
+
+    frlng_com.can_msg_receive(button(FrlngButtonCodes.BUTTON_RIGHT))
+    frlng_com.can_msg_receive(button(FrlngButtonCodes.BUTTON_NO_BUT))
+    assert frlng_com.user_presses == 2
+    assert frlng_com.last_user_activity is not None
+    write_lcd_line(frlng_com, 0, "Puffertmp. oben 82° ")
+    write_lcd_line(frlng_com, 1, "Puffertmp. mitte 70°")
+    write_lcd_line(frlng_com, 2, "Puffertmp. unten 50°")
+    frlng_com._send_running = True
+    start = time.monotonic()
+    assert not await frlng_com.send_buttons([FrlngButtonCodes.BUTTON_DOWN])
+    assert time.monotonic() - start >= 0.2
+    assert not frlng_com._pause_buttonsseq
+    assert frlng_com._scheduler.node == (0, True)
+    assert frlng_com.get_value("puffertmp_unten") == 50
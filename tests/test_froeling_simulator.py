@@ -0,0 +1,192 @@
+"""Test the polling loop against the simulated boiler controller."""
+import asyncio
+import json
+import os
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.ha_froeling_euroturbo_40.const import (
+    CONF_ADAPTIVE_PACING,
+    CONF_CAN_BUS,
+    CONF_DECODE_IN_THREAD,
+    CONF_USER_IDLE,
+    DOMAIN,
+)
+from custom_components.ha_froeling_euroturbo_40.diagnostics import async_get_config_entry_diagnostics
+from custom_components.ha_froeling_euroturbo_40.lcd import LCD_ROWS
+from custom_components.ha_froeling_euroturbo_40.menu import MENU_PAGES_BY_NAME, SENSOR_KEYS, FrlngButtonCodes
+from custom_components.ha_froeling_euroturbo_40.sensor import FrlngCANCom
+from custom_components.ha_froeling_euroturbo_40.services import async_setup_services
+
+from .simulator import FrlngControllerSimulator
+from .test_froeling_sensor import get_sensor_state
+
+
+@pytest.fixture(params=[False, True], ids=["loop", "thread"])
+async def frlng_com(hass, request):
+    """Communication on the virtual bus "test_can_sim", decoding in the event loop or the receive thread."""
+    frlng_com = FrlngCANCom(hass, {
+        CONF_CAN_BUS: "unittesting_sim", CONF_USER_IDLE: 0.3, CONF_DECODE_IN_THREAD: request.param,
+        CONF_ADAPTIVE_PACING: True,
+    }, MagicMock())
+    frlng_com.create_sensor_entities()
+    await hass.async_add_executor_job(frlng_com.init_can)
+    yield frlng_com
+    await frlng_com.can_stop_update()
+
+
+async def wait_for(condition, timeout=10):
+    """Wait until condition() is true."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_simulator_menu():
+    """Test the menu model of the simulator."""
+    simulator = FrlngControllerSimulator()
+    assert simulator.screen() == ["Kessel in Betrieb", "Pufferladezust. 80%", "", ""]
+    simulator._schedule = MagicMock()
+    simulator._button(FrlngButtonCodes.BUTTON_RIGHT)
+    assert simulator.screen()[0] == "Puffertmp. oben 82°"
+    assert simulator.screen()[1] == "Puffertmp.mitte 70°"
+    simulator._button(FrlngButtonCodes.BUTTON_DOWN)
+    assert simulator.node == (0, True)
+    simulator._button(FrlngButtonCodes.BUTTON_LEFT)
+    simulator._button(FrlngButtonCodes.BUTTON_UP)
+    simulator._button(FrlngButtonCodes.BUTTON_RIGHT)
+    assert simulator.screen()[:2] == ["Abgastemp. ist 180°", "Abgastemp.soll 170°"]
+    simulator.show_error("STÖRUNG", "Fühlerbruch")
+    simulator._button(FrlngButtonCodes.BUTTON_DOWN)
+    assert simulator.screen() == ["STÖRUNG", "Fühlerbruch", "", ""]
+    simulator._button(FrlngButtonCodes.BUTTON_LEFT)
+    assert simulator.node == (0, False)
+    assert simulator.error_lines is None
+
+
+async def test_sweep(hass, frlng_com):
+    """Test that one sweep reads all sensors from the simulated menu."""
+    with FrlngControllerSimulator("test_can_sim", latency=0.01, jitter=0.005) as simulator:
+        await frlng_com.can_start_update()
+        await wait_for(lambda: frlng_com.sweep_duration is not None)
+        assert {key: frlng_com.get_value(key) for key in SENSOR_KEYS} == {
+            "kessel_status": "Kessel in Betrieb", "pufferladezust": 80, "abgastemp_ist": 180,
+            "abgastemp_soll": 170, "kesseltemp_ist": 78, "kesseltempsoll": 80, "puffertmp_oben": 82,
+            "puffertmp_mitte": 70, "puffertmp_unten": 50, "kesselrucklauft": 65, "rucklaufmischer": 40,
+            "heizungspumpe1": "Ein", "heizungspumpe2": "Aus", "vorlauftmp2_ist": 45, "vorlauftmp2soll": 46,
+            "aussentemperatur": 5, "geblase_ist": 1800, "stellmot_o_ist": 30, "stellmot_u_ist": 60,
+            "sauerstoffwert": 7.5, "betriebsstd": 12345,
+        }
+        assert frlng_com.parse_failures == 0
+        assert frlng_com.user_presses == 0
+        # back in the main menu
+        await wait_for(lambda: simulator.node == (0, False))
+        assert frlng_com.button_round_trip is not None
+        if frlng_com._decode_in_thread:
+            # whatever the batching, a redraw wakes the event loop for its echo and each drawn row at most
+            assert frlng_com.loop_callbacks <= simulator.redraws * (LCD_ROWS + 1) + 10
+
+
+async def test_user_press_and_error_screen(hass, frlng_com):
+    """Test that polling continues on the page a user left and error screens are not parsed."""
+    with FrlngControllerSimulator("test_can_sim") as simulator:
+        await frlng_com.can_start_update()
+        await wait_for(lambda: frlng_com.sweep_duration is not None and simulator.node == (0, False))
+        simulator.set_value("puffertmp_oben", "85°")
+        simulator.press_user_button(FrlngButtonCodes.BUTTON_RIGHT)
+        await wait_for(lambda: frlng_com.user_presses >= 1)
+        # while the user is at the display a refresh fails at once instead of timing out
+        with pytest.raises(HomeAssistantError, match="Display in use"):
+            await frlng_com.async_refresh(["puffertmp_oben"])
+        await wait_for(lambda: not frlng_com.user_active)
+        sent = len(simulator.buttons)
+        # the display already shows the page, nothing is pressed
+        assert await frlng_com.async_refresh(["puffertmp_oben"]) == {"puffertmp_oben": 85}
+        assert len(simulator.buttons) == sent
+
+        simulator.show_error("STÖRUNG", "Fühlerbruch")
+        await wait_for(lambda: frlng_com.parse_failures == 2)
+        assert frlng_com.last_unknown_line.strip() == "Fühlerbruch"
+
+
+async def test_profile_and_diagnostics(hass, frlng_com, tmp_path):
+    """Test that the profile service times the receive path and shows up in the diagnostics."""
+    hass.config.config_dir = str(tmp_path)
+    hass.data[DOMAIN] = {"entry_id": frlng_com}
+    await async_setup_services(hass)
+    with FrlngControllerSimulator("test_can_sim"):
+        await frlng_com.can_start_update()
+        response = await hass.services.async_call(DOMAIN, "profile", {"duration": 1}, blocking=True,
+                                                  return_response=True)
+    assert response["timings"]["can_frame_receive"]["calls"] > 0
+    assert response["timings"]["send_button"]["calls"] > 0
+    assert "Profiled for" in open(response["files"]["summary"], encoding="utf-8").read()
+    assert os.path.exists(response["files"]["stats"])
+    # the wrappers are removed again
+    assert "can_frame_receive" not in vars(frlng_com)
+
+    entry = MagicMock(entry_id="entry_id", data={CONF_CAN_BUS: "unittesting_sim"}, options={})
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+    assert diagnostics["profile"] == response
+    assert diagnostics["communication"]["user_presses"]["value"] == 0
+    assert len(diagnostics["lcd"]["lines"]) == 4
+    json.dumps(diagnostics, default=str)
+
+
+async def test_park(hass, frlng_com):
+    """Test that a parked page is read with each redraw and no buttons are sent."""
+    hass.data[DOMAIN] = {"entry_id": frlng_com}
+    await async_setup_services(hass)
+    with FrlngControllerSimulator("test_can_sim", redraw_interval=0.1) as simulator:
+        await frlng_com.can_start_update()
+        await wait_for(lambda: frlng_com.sweep_duration is not None and simulator.node == (0, False))
+        await hass.services.async_call(DOMAIN, "park", {"page": "sauerstoffwert", "duration": 60}, blocking=True)
+        await wait_for(lambda: frlng_com.parked_page == "sauerstoffwert")
+        assert simulator.node == (8, True)
+        sent = len(simulator.buttons)
+        redraws = simulator.redraws
+        simulator.set_value("sauerstoffwert", "9.5%")
+        await wait_for(lambda: frlng_com.get_value("sauerstoffwert") == 9.5)
+        await wait_for(lambda: simulator.redraws >= redraws + 5)
+        assert len(simulator.buttons) == sent
+        assert frlng_com.parked_page == "sauerstoffwert"
+
+        # a user button ends parking, the sequence continues after the idle time
+        simulator.press_user_button(FrlngButtonCodes.BUTTON_LEFT)
+        await wait_for(lambda: frlng_com.parked_page is None and not frlng_com.user_active)
+        await frlng_com.async_refresh(["pufferladezust"])
+
+        # parking ends after its duration too
+        frlng_com.async_park(MENU_PAGES_BY_NAME["geblaese"], 0.5)
+        await wait_for(lambda: frlng_com.parked_page == "geblaese")
+        await wait_for(lambda: frlng_com.parked_page is None)
+        await hass.services.async_call(DOMAIN, "unpark", {}, blocking=True)
+        assert await frlng_com.async_refresh(["kesseltemp_ist"]) == {"kesseltemp_ist": 78}
+
+
+async def test_sweep_states(hass):
+    """Test a sweep end to end, the values are written to the real entities."""
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_CAN_BUS: "unittesting_sim"})
+    entry.add_to_hass(hass)
+    with FrlngControllerSimulator("test_can_sim"):
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        frlng_com = hass.data[DOMAIN][entry.entry_id]
+        # the default fixed button timing is slower than the adaptive one
+        await wait_for(lambda: frlng_com.sweep_duration is not None, timeout=30)
+        states = {key: get_sensor_state(hass, key).state for key in SENSOR_KEYS}
+        await hass.config_entries.async_unload(entry.entry_id)
+    assert states == {
+        "kessel_status": "Kessel in Betrieb", "pufferladezust": "80", "abgastemp_ist": "180",
+        "abgastemp_soll": "170", "kesseltemp_ist": "78", "kesseltempsoll": "80", "puffertmp_oben": "82",
+        "puffertmp_mitte": "70", "puffertmp_unten": "50", "kesselrucklauft": "65", "rucklaufmischer": "40",
+        "heizungspumpe1": "Ein", "heizungspumpe2": "Aus", "vorlauftmp2_ist": "45", "vorlauftmp2soll": "46",
+        "aussentemperatur": "5", "geblase_ist": "1800", "stellmot_o_ist": "30", "stellmot_u_ist": "60",
+        "sauerstoffwert": "7.5", "betriebsstd": "12345",
+    }